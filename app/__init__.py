@@ -2,24 +2,44 @@ from flask import Flask
 from flask_jwt_extended import JWTManager
 from app.core.config import config
 from app.core.database import init_db
-from app.models import User
-from app.core.database import db
+from app.core.response_cache import init_response_cache
+from app.core.security import register_jwt_callbacks
 
 def create_app(config_name):
     app = Flask(__name__)
     
     app.config.from_object(config[config_name])
+    # Lets worker processes spawned by CLI commands build the same app
+    app.config['CONFIG_NAME'] = config_name
     
     jwt = JWTManager(app)
+    register_jwt_callbacks(jwt)
     init_db(app)
+    init_response_cache(app)
     
-    from app.api import api
-    api.init_app(app)
+    from app.api import init_api
+    init_api(app)
     
-    from app.api import auth_bp, plans_bp, subscriptions_bp, users_bp
+    from app.api import analytics_bp, auth_bp, plans_bp, subscriptions_bp, users_bp
     app.register_blueprint(subscriptions_bp, url_prefix='/subscriptions')
     app.register_blueprint(plans_bp, url_prefix='/plans')
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(users_bp, url_prefix='/users')
+    app.register_blueprint(analytics_bp, url_prefix='/analytics')
+
+    from app.cli import register_commands
+    register_commands(app)
+
+    if app.config['EXPIRY_SWEEP_INTERVAL']:
+        from app.services.expiry_service import start_expiry_worker
+        start_expiry_worker(app, app.config['EXPIRY_SWEEP_INTERVAL'])
+
+    if app.config['HISTORY_WRITE_MODE'] == 'outbox' and app.config['HISTORY_OUTBOX_INTERVAL']:
+        from app.services.history_writer import start_history_outbox_worker
+        start_history_outbox_worker(app, app.config['HISTORY_OUTBOX_INTERVAL'])
+
+    if app.config['ANALYTICS_ROLLUP_INTERVAL']:
+        from app.services.analytics_service import start_analytics_worker
+        start_analytics_worker(app, app.config['ANALYTICS_ROLLUP_INTERVAL'])
     
     return app 
\ No newline at end of file
@@ -1,4 +1,5 @@
 from flask_restx import Api
+from app.api.analytics import analytics_bp, analytics_ns
 from app.api.auth import auth_bp, auth_ns
 from app.api.plans import plans_bp, plans_ns
 from app.api.subscriptions import subscriptions_bp, subscriptions_ns
@@ -14,19 +15,25 @@ authorizations = {
     }
 }
 
-api = Api(
-    title='Subscription Management API',
-    version='1.0',
-    description='A RESTful API for managing user subscriptions',
-    doc='/docs',
-    authorizations=authorizations,
-    security='Bearer Auth'
-)
+def init_api(app):
+    """Build the Api for `app` and register the namespaces.
 
+    The Swagger spec itself is only generated on the first request for it.
+    """
+    api = Api(
+        title='Subscription Management API',
+        version='1.0',
+        description='A RESTful API for managing user subscriptions',
+        doc=app.config['API_DOCS_PATH'] or False,
+        authorizations=authorizations,
+        security='Bearer Auth'
+    )
+    api.add_namespace(auth_ns)
+    api.add_namespace(plans_ns)
+    api.add_namespace(subscriptions_ns)
+    api.add_namespace(users_ns)
+    api.add_namespace(analytics_ns)
+    api.init_app(app)
+    return api
 
-api.add_namespace(auth_ns)
-api.add_namespace(plans_ns)
-api.add_namespace(subscriptions_ns)
-api.add_namespace(users_ns)
-
-__all__ = ['auth_bp', 'plans_bp', 'subscriptions_bp', 'users_bp', 'api'] 
\ No newline at end of file
+__all__ = ['analytics_bp', 'auth_bp', 'plans_bp', 'subscriptions_bp', 'users_bp', 'init_api']
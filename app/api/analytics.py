@@ -0,0 +1,39 @@
+from datetime import date, datetime, timedelta
+from flask import Blueprint, request
+from flask_restx import Namespace, Resource
+from app.services.analytics_service import analytics_service
+from app.schemas.serializers import json_response
+from app.core.security import admin_required
+
+
+analytics_bp = Blueprint('analytics', __name__)
+analytics_ns = Namespace('analytics', description='Revenue and churn analytics (admin only)')
+
+DEFAULT_RANGE_DAYS = 30
+
+
+def _date_arg(name: str, default: date) -> date:
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        analytics_ns.abort(400, error=f"Invalid {name}: expected YYYY-MM-DD")
+
+@analytics_ns.route('/daily')
+@analytics_ns.doc(security='Bearer Auth')
+@analytics_ns.param('start', 'First day, YYYY-MM-DD (default: 29 days before end)')
+@analytics_ns.param('end', 'Last day, YYYY-MM-DD (default: today, UTC)')
+@analytics_ns.param('plan_id', 'Restrict to one plan', type=int)
+class DailyAnalytics(Resource):
+    @analytics_ns.doc('get_daily_analytics')
+    @admin_required()
+    def get(self):
+        """Active subscribers, MRR, new subscriptions, plan changes, cancellations and revenue per day."""
+        end = _date_arg('end', datetime.utcnow().date())
+        start = _date_arg('start', end - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+        try:
+            return json_response(analytics_service.daily(start, end, plan_id=request.args.get('plan_id', type=int)))
+        except ValueError as err:
+            analytics_ns.abort(400, error=str(err))
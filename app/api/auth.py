@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
-from flask_restx import Namespace, Resource, fields, Api
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_restx import Namespace, Resource, fields
 from app.services.auth_service import AuthService
-from app.schemas.user_schema import UserCreateSchema, UserResponseSchema
+from app.core.passwords import HasherOverloadedError
+from app.schemas.user_schema import UserCreateSchema
+from app.schemas.serializers import serialize_user_summary
 from marshmallow import ValidationError
 
 
@@ -11,7 +13,6 @@ auth_ns = Namespace('auth', description='Authentication operations')
 
 
 auth_service = AuthService()
-user_schema = UserResponseSchema()
 
 # Define models for Swagger
 user_model = auth_ns.model('User', {
@@ -39,29 +40,12 @@ subscription_create_model = auth_ns.model('SubscriptionCreate', {
     'plan_id': fields.Integer(required=True, description='Plan ID')
 })
 
-authorizations = {
-    'Bearer Auth': {
-        'type': 'apiKey',
-        'in': 'header',
-        'name': 'Authorization',
-        'description': 'Add "Bearer <JWT token>" to authorize'
-    }
-}
-
-api = Api(
-    title='Subscription Management API',
-    version='1.0',
-    description='A RESTful API for managing user subscriptions',
-    doc='/docs',
-    authorizations=authorizations,
-    security='Bearer Auth'
-)
-
 @auth_ns.route('/register')
 class Register(Resource):
     @auth_ns.expect(register_model)
     @auth_ns.response(201, 'User created successfully', auth_response)
     @auth_ns.response(400, 'Validation error')
+    @auth_ns.response(503, 'Password hashing overloaded')
     def post(self):
         """Register a new user"""
         try:
@@ -71,19 +55,22 @@ class Register(Resource):
                 password=data['password']
             )
             return {
-                'user': user_schema.dump(user),
+                'user': serialize_user_summary(user),
                 'access_token': access_token
             }, 201
         except ValidationError as err:
             return {'error': err.messages}, 400
         except ValueError as err:
             return {'error': str(err)}, 400
+        except HasherOverloadedError as err:
+            return {'error': str(err)}, 503, {'Retry-After': '1'}
 
 @auth_ns.route('/login')
 class Login(Resource):
     @auth_ns.expect(login_model)
     @auth_ns.response(200, 'Login successful', auth_response)
     @auth_ns.response(401, 'Invalid credentials')
+    @auth_ns.response(503, 'Password hashing overloaded')
     def post(self):
         """Login user"""
         try:
@@ -92,10 +79,21 @@ class Login(Resource):
                 email=data['email'],
                 password=data['password']
             )
-            access_token = create_access_token(identity=str(user.id))
+            access_token = auth_service.create_token(user)
             return {
-                'user': user_schema.dump(user),
+                'user': serialize_user_summary(user),
                 'access_token': access_token
             }, 200
         except ValueError as err:
-            return {'error': str(err)}, 401 
\ No newline at end of file
+            return {'error': str(err)}, 401
+        except HasherOverloadedError as err:
+            return {'error': str(err)}, 503, {'Retry-After': '1'}
+
+@auth_ns.route('/logout')
+class Logout(Resource):
+    @auth_ns.response(200, 'All tokens revoked')
+    @jwt_required()
+    def post(self):
+        """Revoke every access token issued to the current user"""
+        auth_service.revoke_tokens(get_jwt_identity())
+        return {'message': 'Tokens revoked successfully'}, 200
@@ -1,10 +1,14 @@
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_restx import Namespace, Resource, fields
 from app.services.plan_service import PlanService
-from app.schemas.plan_schema import PlanCreateSchema, PlanResponseSchema
+from app.schemas.plan_schema import PlanCreateSchema
+from app.schemas.serializers import MAX_BATCH_IDS, json_response, parse_ids, serialize_batch, serialize_many, serialize_plan
 from marshmallow import ValidationError
-from app.models import User
+from app.core.security import admin_required
+from app.core.response_cache import PLANS_TAG, response_cache
+from app.services.plan_catalog import plan_catalog
+from app.core.etags import VersionConflictError, if_match_tags, not_modified, plan_etag, plan_list_etag, set_etag
 
 
 plans_bp = Blueprint('plans', __name__)
@@ -12,7 +16,6 @@ plans_ns = Namespace('plans', description='Subscription plan operations')
 
 
 plan_service = PlanService()
-plan_schema = PlanResponseSchema()
 
 
 plan_model = plans_ns.model('Plan', {
@@ -24,25 +27,38 @@ plan_model = plans_ns.model('Plan', {
     'created_at': fields.DateTime(readonly=True)
 })
 
+# The catalog version in the key lets other workers' plan edits through without a shared backend
+cached_plans = response_cache.cached(tags=(PLANS_TAG,), vary=lambda: plan_catalog.versioned()[0])
+
 @plans_ns.route('/')
 class PlanList(Resource):
     @plans_ns.doc('list_plans')
-    @plans_ns.marshal_list_with(plan_model)
+    @plans_ns.response(200, 'Success', [plan_model])
+    @plans_ns.response(304, 'Not modified')
+    @plans_ns.param(
+        'ids', f'Comma-separated plan ids (at most {MAX_BATCH_IDS}) to fetch in one call. '
+        'Returns {items, not_found} in request order.'
+    )
     @jwt_required()
+    @cached_plans
     def get(self):
-        plans = plan_service.get_all_plans()
-        return [plan_schema.dump(plan) for plan in plans]
+        if 'ids' in request.args:
+            try:
+                ids = parse_ids(request.args['ids'])
+            except ValueError as err:
+                plans_ns.abort(400, error=str(err))
+            return json_response(serialize_batch(serialize_plan, ids, plan_service.get_plans_by_ids(ids)))
+
+        catalog_version, plans = plan_service.get_versioned_plans()
+        etag = plan_list_etag(catalog_version)
+        return not_modified(etag) or set_etag(json_response(serialize_many(serialize_plan, plans)), etag)
     
 
     @plans_ns.doc('create_plan')
     @plans_ns.expect(plan_model)
-    @plans_ns.marshal_with(plan_model, code=201)
-    @jwt_required()
+    @plans_ns.response(201, 'Plan created', plan_model)
+    @admin_required()
     def post(self):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            plans_ns.abort(403, error="Admin privileges required")
         try:
             data = PlanCreateSchema().load(request.get_json())
             plan = plan_service.create_plan(
@@ -51,7 +67,7 @@ class PlanList(Resource):
                 duration_days=data['duration_days'],
                 features=data.get('features', {})
             )
-            return plan_schema.dump(plan), 201
+            return json_response(serialize_plan(plan), 201)
         except ValidationError as err:
             plans_ns.abort(400, error=err.messages)
         except ValueError as err:
@@ -61,29 +77,35 @@ class PlanList(Resource):
 @plans_ns.param('plan_id', 'The plan identifier')
 class Plan(Resource):
     @plans_ns.doc('get_plan')
-    @plans_ns.marshal_with(plan_model)
+    @plans_ns.response(200, 'Success', plan_model)
+    @plans_ns.response(304, 'Not modified')
     @jwt_required()
+    @cached_plans
     def get(self, plan_id):
         plan = plan_service.get_plan_by_id(plan_id)
         if not plan:
             plans_ns.abort(404, error="Plan not found")
-        return plan_schema.dump(plan)
+        etag = plan_etag(plan)
+        return not_modified(etag) or set_etag(json_response(serialize_plan(plan)), etag)
 
     @plans_ns.doc('update_plan')
     @plans_ns.expect(plan_model)
-    @plans_ns.marshal_with(plan_model)
-    @jwt_required()
+    @plans_ns.response(200, 'Success', plan_model)
+    @plans_ns.response(412, 'If-Match does not name the current version')
+    @admin_required()
     def put(self, plan_id):
         try:
             data = request.get_json()
-            plan = plan_service.update_plan(plan_id, **data)
-            return plan_schema.dump(plan)
+            plan = plan_service.update_plan(plan_id, expected_etags=if_match_tags(), **data)
+            return set_etag(json_response(serialize_plan(plan)), plan_etag(plan))
+        except VersionConflictError as err:
+            plans_ns.abort(412, error=str(err))
         except ValueError as err:
             plans_ns.abort(404, error=str(err))
 
     @plans_ns.doc('delete_plan')
     @plans_ns.response(204, 'Plan deleted')
-    @jwt_required()
+    @admin_required()
     def delete(self, plan_id):
         try:
             plan_service.delete_plan(plan_id)
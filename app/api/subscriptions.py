@@ -1,16 +1,35 @@
-from flask import Blueprint, request
+from flask import Blueprint, Response, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_restx import Namespace, Resource, fields
-from app.services.subscription_service import SubscriptionService
+from app.services.subscription_service import SubscriptionService, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.schemas.subscription_schema import (
     SubscriptionCreateSchema, 
-    SubscriptionResponseSchema, 
-    SubscriptionHistoryResponseSchema,
+    SubscriptionBulkCreateSchema,
     SubscriptionHistoryGroupedResponseSchema
 )
 from marshmallow import ValidationError
 from app.api.plans import plan_model
 from app.models.subscription import SubscriptionStatus
+from app.core.security import admin_required
+from app.core.response_cache import PLANS_TAG, response_cache
+from app.core.etags import VersionConflictError, if_match_tags, not_modified, set_etag, subscription_etag
+from app.services.history_writer import history_writer
+from app.services.plan_catalog import plan_catalog
+from app.schemas.serializers import (
+    DATETIME,
+    Field,
+    compile_serializer,
+    dumps,
+    MAX_BATCH_IDS,
+    json_response,
+    parse_ids,
+    serialize_batch,
+    serialize_current_subscription,
+    serialize_many,
+    serialize_subscription,
+    subscription_fields,
+    subscription_history_fields
+)
 from itertools import groupby
 
 
@@ -23,7 +42,6 @@ subscriptions_ns = Namespace(
 
 
 subscription_service = SubscriptionService()
-subscription_schema = SubscriptionResponseSchema()
 
 
 subscription_model = subscriptions_ns.model('Subscription', {
@@ -37,25 +55,97 @@ subscription_model = subscriptions_ns.model('Subscription', {
     'plan': fields.Nested(plan_model)
 })
 
+subscription_page_model = subscriptions_ns.model('SubscriptionPage', {
+    'items': fields.List(fields.Nested(subscription_model)),
+    'next_cursor': fields.String(description='Cursor for the next page, null on the last page')
+})
+
+current_subscription_model = subscriptions_ns.model('CurrentSubscription', {
+    'subscription_id': fields.Integer,
+    'plan_id': fields.Integer,
+    'end_date': fields.DateTime,
+    'plan': fields.Nested(plan_model)
+})
+
 subscription_create_model = subscriptions_ns.model('SubscriptionCreate', {
     'plan_id': fields.Integer(required=True, description='Plan ID')
 })
 
+subscription_bulk_item_model = subscriptions_ns.model('SubscriptionBulkItem', {
+    'user_id': fields.Integer(required=True, description='User ID'),
+    'plan_id': fields.Integer(required=True, description='Plan ID')
+})
+
+subscription_bulk_create_model = subscriptions_ns.model('SubscriptionBulkCreate', {
+    'items': fields.List(fields.Nested(subscription_bulk_item_model), required=True)
+})
+
+subscription_bulk_result_model = subscriptions_ns.model('SubscriptionBulkResult', {
+    'created': fields.Integer,
+    'failed': fields.Integer,
+    'results': fields.List(fields.Nested(subscriptions_ns.model('SubscriptionBulkItemResult', {
+        'index': fields.Integer(description='Position in the request items'),
+        'user_id': fields.Integer,
+        'plan_id': fields.Integer,
+        'status': fields.String(description="'created' or 'error'"),
+        'subscription_id': fields.Integer,
+        'error': fields.String
+    })))
+})
+
+def sparse_params(sparse):
+    """Document ?fields= and ?include= for a GET backed by `sparse`."""
+    def decorate(method):
+        method = subscriptions_ns.param(
+            'fields', f"Comma-separated fields to return, from: {', '.join(sparse.selectable)}"
+        )(method)
+        return subscriptions_ns.param(
+            'include', f"Comma-separated nested objects to embed, from: {', '.join(sparse.includes)}"
+        )(method)
+    return decorate
+
+
+def requested_fieldset(sparse):
+    try:
+        return sparse.parse(request.args.get('fields'), request.args.get('include'))
+    except ValueError as err:
+        subscriptions_ns.abort(400, error=str(err))
+
+
 @subscriptions_ns.route('/')
 @subscriptions_ns.doc(security='Bearer Auth')
 class SubscriptionList(Resource):
     @subscriptions_ns.doc('list_subscriptions')
-    @subscriptions_ns.marshal_list_with(subscription_model)
+    @subscriptions_ns.response(200, 'Success', [subscription_model])
+    @subscriptions_ns.param(
+        'ids', f'Comma-separated subscription ids (at most {MAX_BATCH_IDS}) to fetch in one call. '
+        'Returns {items, not_found} in request order; ids the user does not own count as not found.'
+    )
+    @sparse_params(subscription_fields)
     @jwt_required()
+    @response_cache.cached(tags=(PLANS_TAG,), per_user=True, vary=lambda: plan_catalog.versioned()[0])
     def get(self):
         current_user_id = get_jwt_identity()
-        subscriptions = subscription_service.get_user_subscriptions(current_user_id)
-        print(subscriptions, 'here subscription')
-        return [subscription_schema.dump(sub) for sub in subscriptions]
+        fieldset = requested_fieldset(subscription_fields)
+        serializer = subscription_fields.serializer(fieldset)
+        if 'ids' in request.args:
+            try:
+                ids = parse_ids(request.args['ids'])
+            except ValueError as err:
+                subscriptions_ns.abort(400, error=str(err))
+            found = subscription_service.get_subscriptions_by_ids(
+                ids, current_user_id, columns=subscription_fields.sources(fieldset)
+            )
+            return json_response(serialize_batch(serializer, ids, found))
+
+        subscriptions = subscription_service.get_user_subscriptions(
+            current_user_id, columns=subscription_fields.sources(fieldset)
+        )
+        return json_response(serialize_many(serializer, subscriptions))
 
     @subscriptions_ns.doc('create_subscription')
     @subscriptions_ns.expect(subscription_create_model)
-    @subscriptions_ns.marshal_with(subscription_model, code=201)
+    @subscriptions_ns.response(201, 'Subscription created', subscription_model)
     @jwt_required()
     def post(self):
         try:
@@ -65,18 +155,59 @@ class SubscriptionList(Resource):
                 user_id=current_user_id,
                 plan_id=data['plan_id']
             )
-            return subscription_schema.dump(subscription), 201
+            return json_response(serialize_subscription(subscription), 201)
         except ValidationError as err:
             subscriptions_ns.abort(400, error=err.messages)
         except ValueError as err:
             subscriptions_ns.abort(400, error=str(err))
 
+@subscriptions_ns.route('/current')
+@subscriptions_ns.doc(security='Bearer Auth')
+class CurrentSubscription(Resource):
+    @subscriptions_ns.doc('get_current_subscription')
+    @subscriptions_ns.response(200, 'Success', current_subscription_model)
+    @subscriptions_ns.response(404, 'No active subscription')
+    @jwt_required()
+    @response_cache.cached(tags=(PLANS_TAG,), per_user=True, vary=lambda: plan_catalog.versioned()[0])
+    def get(self):
+        """The current user's active subscription, without loading their subscription rows"""
+        current = subscription_service.get_current_subscription(get_jwt_identity())
+        if current is None:
+            subscriptions_ns.abort(404, error="No active subscription")
+        return json_response(serialize_current_subscription(current))
+
+@subscriptions_ns.route('/bulk')
+@subscriptions_ns.doc(security='Bearer Auth')
+class SubscriptionBulk(Resource):
+    @subscriptions_ns.doc('bulk_create_subscriptions')
+    @subscriptions_ns.expect(subscription_bulk_create_model)
+    @subscriptions_ns.response(200, 'Per-item provisioning results', subscription_bulk_result_model)
+    @admin_required()
+    def post(self):
+        try:
+            data = SubscriptionBulkCreateSchema().load(request.get_json())
+            results = subscription_service.bulk_create_subscriptions(data['items'])
+        except ValidationError as err:
+            subscriptions_ns.abort(400, error=err.messages)
+        except ValueError as err:
+            subscriptions_ns.abort(400, error=str(err))
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        return {
+            'created': created,
+            'failed': len(results) - created,
+            'results': results
+        }
+
 @subscriptions_ns.route('/status/<string:status>')
 @subscriptions_ns.param('status', 'Subscription status (active, cancelled, expired)')
+@subscriptions_ns.param('limit', f'Page size (max {MAX_PAGE_SIZE})', type=int, default=DEFAULT_PAGE_SIZE)
+@subscriptions_ns.param('cursor', 'next_cursor value from the previous page')
 @subscriptions_ns.doc(security='Bearer Auth')
 class SubscriptionByStatus(Resource):
     @subscriptions_ns.doc('get_subscriptions_by_status')
-    @subscriptions_ns.marshal_list_with(subscription_model)
+    @subscriptions_ns.response(200, 'Success', subscription_page_model)
+    @sparse_params(subscription_fields)
     @jwt_required()
     def get(self, status):
         try:
@@ -84,8 +215,17 @@ class SubscriptionByStatus(Resource):
             if status not in [s.value for s in SubscriptionStatus]:
                 subscriptions_ns.abort(400, error=f"Invalid status. Must be one of: {[s.value for s in SubscriptionStatus]}")
             
-            subscriptions = subscription_service.get_subscriptions_by_status(status)
-            return subscriptions
+            fieldset = requested_fieldset(subscription_fields)
+            subscriptions, next_cursor = subscription_service.get_subscriptions_by_status(
+                status,
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+                cursor=request.args.get('cursor'),
+                columns=subscription_fields.sources(fieldset)
+            )
+            return json_response({
+                'items': serialize_many(subscription_fields.serializer(fieldset), subscriptions),
+                'next_cursor': next_cursor
+            })
         except ValueError as err:
             subscriptions_ns.abort(400, error=str(err))
 
@@ -94,28 +234,53 @@ class SubscriptionByStatus(Resource):
 @subscriptions_ns.doc(security='Bearer Auth')
 class Subscription(Resource):
     @subscriptions_ns.doc('get_subscription')
-    @subscriptions_ns.marshal_with(subscription_model)
+    @subscriptions_ns.response(200, 'Success', subscription_model)
+    @subscriptions_ns.response(304, 'Not modified')
+    @sparse_params(subscription_fields)
     @jwt_required()
     def get(self, subscription_id):
-        subscription = subscription_service.get_subscription_by_id(subscription_id)
+        fieldset = requested_fieldset(subscription_fields)
+        variant = fieldset.tag if fieldset else None
+        if request.if_none_match:
+            # Answer revalidations from the version columns alone
+            stamp = subscription_service.get_subscription_version(subscription_id)
+            if not stamp:
+                subscriptions_ns.abort(404, error="Subscription not found")
+            response = not_modified(
+                subscription_etag(subscription_id, stamp.version, plan_catalog.get(stamp.plan_id), variant)
+            )
+            if response:
+                return response
+
+        subscription = subscription_service.get_subscription_by_id(
+            subscription_id, columns=subscription_fields.sources(fieldset)
+        )
         if not subscription:
             subscriptions_ns.abort(404, error="Subscription not found")
-        return subscription_schema.dump(subscription)
+        etag = subscription_etag(subscription.id, subscription.version, plan_catalog.get(subscription.plan_id), variant)
+        return set_etag(json_response(subscription_fields.serializer(fieldset)(subscription)), etag)
     
     @subscriptions_ns.doc('update_subscription')
     @subscriptions_ns.expect(subscription_model)
-    @subscriptions_ns.marshal_with(subscription_model)
+    @subscriptions_ns.response(200, 'Success', subscription_model)
+    @subscriptions_ns.response(409, 'Modified concurrently')
+    @subscriptions_ns.response(412, 'If-Match does not name the current version')
     @jwt_required()
     def put(self, subscription_id):
         current_user_id = get_jwt_identity()
+        expected_etags = if_match_tags()
         try:
             subscription = subscription_service.update_subscription(
                 subscription_id=subscription_id,
                 user_id=current_user_id,
                 status=request.json.get('status'),
-                plan_id=request.json.get('plan_id')
+                plan_id=request.json.get('plan_id'),
+                expected_etags=expected_etags
             )
-            return subscription_schema.dump(subscription)
+            etag = subscription_etag(subscription.id, subscription.version, plan_catalog.get(subscription.plan_id))
+            return set_etag(json_response(serialize_subscription(subscription)), etag)
+        except VersionConflictError as err:
+            subscriptions_ns.abort(409 if expected_etags is None else 412, error=str(err))
         except ValueError as err:
             subscriptions_ns.abort(404, error=str(err))
 
@@ -134,23 +299,38 @@ class Subscription(Resource):
 @subscriptions_ns.doc(security='Bearer Auth')
 class SubscriptionHistoryList(Resource):
     @jwt_required()
+    @response_cache.cached(per_user=True)
     @subscriptions_ns.doc('get_all_user_subscription_history')
+    @sparse_params(subscription_history_fields)
     def get(self):
         current_user_id = get_jwt_identity()
         service = SubscriptionService()
+        fieldset = requested_fieldset(subscription_history_fields)
         # Get pre-grouped history entries
-        grouped_history = service.get_all_user_subscription_history(user_id=current_user_id)
+        grouped_history = service.get_all_user_subscription_history(
+            user_id=current_user_id, columns=subscription_history_fields.sources(fieldset)
+        )
         
         if not grouped_history:
             return {'message': 'No subscription history found'}, 404
 
         # Serialize each group of entries
+        serializer = subscription_history_fields.serializer(fieldset)
         serialized_history = {
-            str(sub_id): SubscriptionHistoryResponseSchema(many=True).dump(entries)
+            str(sub_id): serialize_many(serializer, entries)
             for sub_id, entries in grouped_history.items()
         }
         
-        return {'subscriptions': serialized_history}
+        return json_response({'subscriptions': serialized_history})
+
+@subscriptions_ns.route('/history/outbox')
+@subscriptions_ns.doc(security='Bearer Auth')
+class SubscriptionHistoryOutbox(Resource):
+    @admin_required()
+    @subscriptions_ns.doc('get_history_outbox_lag')
+    def get(self):
+        """Pending history events, the age of the oldest one and this worker's drain counters."""
+        return json_response(history_writer.lag())
 
 @subscriptions_ns.route('/history/<int:subscription_id>')
 @subscriptions_ns.doc(security='Bearer Auth')
@@ -158,17 +338,111 @@ class SubscriptionHistoryList(Resource):
 class SubscriptionHistoryDetail(Resource):
     @jwt_required()
     @subscriptions_ns.doc('get_subscription_history')
+    @sparse_params(subscription_history_fields)
     def get(self, subscription_id):
         current_user_id = get_jwt_identity()
         service = SubscriptionService()
+        fieldset = requested_fieldset(subscription_history_fields)
 
-        subscription = service.get_subscription_by_id(subscription_id)
-        if not subscription or subscription.user_id != int(current_user_id):
+        # Ownership needs only the owner column, not the row
+        stamp = service.get_subscription_version(subscription_id)
+        if not stamp or stamp.user_id != int(current_user_id):
             return {'message': 'Subscription not found'}, 404
         
-        history_entries = service.get_subscription_history_by_id(subscription_id)
+        history_entries = service.get_subscription_history_by_id(
+            subscription_id, columns=subscription_history_fields.sources(fieldset)
+        )
         
         if not history_entries:
             return {'message': 'No history found for this subscription'}, 404
             
-        return SubscriptionHistoryResponseSchema(many=True).dump(history_entries) 
\ No newline at end of file
+        return json_response(serialize_many(subscription_history_fields.serializer(fieldset), history_entries))
+
+
+EXPORT_FORMATS = ('ndjson', 'json')
+EXPORT_FLUSH_ROWS = 500
+
+
+def _plan_name(plan_id):
+    plan = plan_catalog.get(plan_id) if plan_id is not None else None
+    return plan.name if plan else None
+
+
+serialize_history_export_row = compile_serializer('history_export_row', [
+    Field('id'),
+    Field('subscription_id'),
+    Field('user_id'),
+    Field('old_plan_id'),
+    Field('old_plan_name', _plan_name, source='old_plan_id'),
+    Field('new_plan_id'),
+    Field('new_plan_name', _plan_name, source='new_plan_id'),
+    Field('old_status'),
+    Field('new_status'),
+    Field('change_type'),
+    Field('changed_at', DATETIME),
+])
+
+
+def requested_export_format() -> str:
+    # Checked before the service opens its export cursors
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        subscriptions_ns.abort(400, error=f"Invalid format. Must be one of: {list(EXPORT_FORMATS)}")
+    return fmt
+
+
+def _history_export_response(rows, fmt):
+    """Serialize history rows one at a time into a streamed NDJSON or JSON-array body."""
+    separator = b'\n' if fmt == 'ndjson' else b','
+
+    def chunk(lines, continued):
+        if fmt == 'ndjson':
+            return separator.join(lines) + separator
+        return (separator if continued else b'') + separator.join(lines)
+
+    def generate():
+        buffer = []
+        continued = False
+        if fmt == 'json':
+            yield b'['
+        for row in rows:
+            buffer.append(dumps(serialize_history_export_row(row)))
+            # Hand the WSGI server a few hundred rows at a time rather than one write per row
+            if len(buffer) >= EXPORT_FLUSH_ROWS:
+                yield chunk(buffer, continued)
+                continued = True
+                buffer = []
+        if buffer:
+            yield chunk(buffer, continued)
+        if fmt == 'json':
+            yield b']'
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@subscriptions_ns.route('/history/export')
+@subscriptions_ns.doc(security='Bearer Auth')
+@subscriptions_ns.param('format', 'ndjson (default) or json', enum=list(EXPORT_FORMATS))
+class SubscriptionHistoryExport(Resource):
+    @jwt_required()
+    @subscriptions_ns.doc('export_user_subscription_history')
+    @subscriptions_ns.produces(['application/x-ndjson', 'application/json'])
+    def get(self):
+        """Stream the current user's full subscription history"""
+        fmt = requested_export_format()
+        rows = subscription_service.iter_subscription_history(user_id=get_jwt_identity())
+        return _history_export_response(rows, fmt)
+
+@subscriptions_ns.route('/history/export/all')
+@subscriptions_ns.doc(security='Bearer Auth')
+@subscriptions_ns.param('format', 'ndjson (default) or json', enum=list(EXPORT_FORMATS))
+@subscriptions_ns.param('user_id', 'Only export this user', type=int)
+class SubscriptionHistoryExportAll(Resource):
+    @admin_required()
+    @subscriptions_ns.doc('export_all_subscription_history')
+    @subscriptions_ns.produces(['application/x-ndjson', 'application/json'])
+    def get(self):
+        """Stream subscription history across all users (admin only)"""
+        fmt = requested_export_format()
+        rows = subscription_service.iter_subscription_history(user_id=request.args.get('user_id', type=int))
+        return _history_export_response(rows, fmt)
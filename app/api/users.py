@@ -16,7 +16,9 @@ user_model = users_ns.model('User', {
     'is_admin': fields.Boolean(description='Admin status'),
     'created_at': fields.DateTime(readonly=True),
     'subscription_count': fields.Integer(description='Number of subscriptions'),
-    'last_subscription_date': fields.DateTime(description='Date of last subscription')
+    'last_subscription_date': fields.DateTime(description='Date of last subscription'),
+    'active_plan_id': fields.Integer(description='Plan of the current active subscription'),
+    'lifetime_spend': fields.Float(description='Sum of plan prices over creates, plan changes and renewals')
 })
 
 @users_ns.route('/email/<string:email>')
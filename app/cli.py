@@ -0,0 +1,191 @@
+import sqlite3
+import time
+from datetime import timedelta
+import click
+from app.core.database import db, seed_admin
+from app.core.replicas import REPLICA_BIND_PREFIX
+from app.services.analytics_service import AnalyticsService
+from app.services.expiry_service import ExpiryService
+from app.services.history_archive import HistoryArchiveService
+from app.services.history_writer import history_writer
+from app.services.renewal_service import RenewalService, renew_in_parallel
+from app.services.subscription_stats import subscription_stats
+
+
+def register_commands(app):
+    @app.cli.command('seed-admin')
+    @click.option('--email', default=None, help='Defaults to ADMIN_EMAIL')
+    @click.option('--password', default=None, help='Defaults to ADMIN_PASSWORD')
+    def seed_admin_command(email, password):
+        """Create the admin user if it does not exist yet."""
+        email = email or app.config['ADMIN_EMAIL']
+        password = password or app.config['ADMIN_PASSWORD']
+        if not password:
+            raise click.ClickException("Set ADMIN_PASSWORD or pass --password")
+        if seed_admin(email, password):
+            click.echo(f"Created admin {email}")
+        else:
+            click.echo(f"Admin {email} already exists")
+
+    @app.cli.command('expire-subscriptions')
+    @click.option('--batch-size', type=int, default=None, help='Rows flipped per UPDATE')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches')
+    @click.option('--pause', type=float, default=None, help='Seconds to sleep between batches')
+    def expire_subscriptions(batch_size, max_batches, pause):
+        """Expire active subscriptions whose end_date has passed."""
+        service = ExpiryService(
+            batch_size=batch_size or app.config['EXPIRY_BATCH_SIZE'],
+            pause=app.config['EXPIRY_BATCH_PAUSE'] if pause is None else pause
+        )
+        report = service.expire_due_subscriptions(max_batches=max_batches)
+        click.echo(
+            f"Expired {report.expired} subscriptions in {report.batches} batches "
+            f"({report.elapsed:.2f}s, {report.rows_per_second:.0f} rows/sec)"
+        )
+
+    @app.cli.command('sync-sqlite-replicas')
+    def sync_sqlite_replicas():
+        """Copy a SQLite primary onto its SQLite replicas (local testing of replica routing)."""
+        primary_url = db.engines[None].url
+        if primary_url.get_backend_name() != 'sqlite':
+            raise click.ClickException("Only SQLite primaries can be synced; use real replication elsewhere")
+        for key, engine in db.engines.items():
+            if not key or not key.startswith(REPLICA_BIND_PREFIX):
+                continue
+            if engine.url.get_backend_name() != 'sqlite':
+                raise click.ClickException(f"Replica {key} is not SQLite")
+            engine.dispose()
+            with sqlite3.connect(primary_url.database) as source, sqlite3.connect(engine.url.database) as target:
+                source.backup(target)
+            click.echo(f"Copied {primary_url.database} -> {engine.url.database}")
+
+    @app.cli.command('rebuild-subscription-stats')
+    @click.option('--batch-size', type=int, default=1000, help='Users recomputed per transaction')
+    def rebuild_subscription_stats(batch_size):
+        """Backfill user_subscription_stats from subscriptions and history."""
+        rebuilt = subscription_stats.rebuild(batch_size=batch_size)
+        click.echo(f"Rebuilt subscription stats for {rebuilt} users")
+
+    @app.cli.command('check-current-subscriptions')
+    @click.option('--batch-size', type=int, default=1000, help='Users compared per query')
+    @click.option('--repair', is_flag=True, help='Rewrite mismatched summaries from the active subscription')
+    def check_current_subscriptions(batch_size, repair):
+        """Verify each user's current-subscription columns against their active subscription."""
+        report = subscription_stats.check_current(batch_size=batch_size, repair=repair)
+        click.echo(
+            f"Checked {report.checked} users in {report.elapsed:.2f}s: {report.mismatched} mismatched"
+            + (f", {report.repaired} repaired" if repair else "")
+        )
+        if report.sample:
+            click.echo(f"First mismatched users: {', '.join(map(str, report.sample))}")
+        if report.mismatched and not repair:
+            raise SystemExit(1)
+
+    @app.cli.command('archive-subscription-history')
+    @click.option('--older-than-days', type=int, default=None, help='Defaults to HISTORY_ARCHIVE_AFTER_DAYS')
+    @click.option('--batch-size', type=int, default=None, help='Rows moved per transaction')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches')
+    @click.option('--pause', type=float, default=None, help='Seconds to sleep between batches')
+    def archive_subscription_history(older_than_days, batch_size, max_batches, pause):
+        """Move history rows past the archive horizon into subscription_history_archive."""
+        service = HistoryArchiveService(
+            batch_size=batch_size or app.config['HISTORY_ARCHIVE_BATCH_SIZE'],
+            pause=app.config['HISTORY_ARCHIVE_BATCH_PAUSE'] if pause is None else pause
+        )
+        days = app.config['HISTORY_ARCHIVE_AFTER_DAYS'] if older_than_days is None else older_than_days
+        report = service.archive_older_than(days, max_batches=max_batches)
+        click.echo(
+            f"Archived {report.archived} history rows in {report.batches} batches "
+            f"({report.elapsed:.2f}s, {report.rows_per_second:.0f} rows/sec)"
+        )
+
+    def _analytics_service(batch_size, settle_seconds):
+        return AnalyticsService(
+            batch_size=batch_size or app.config['ANALYTICS_BATCH_SIZE'],
+            settle_seconds=app.config['ANALYTICS_SETTLE_SECONDS'] if settle_seconds is None else settle_seconds
+        )
+
+    def _echo_rollup(verb, report):
+        click.echo(
+            f"{verb} {report.rows} history rows in {report.batches} batches up to id {report.last_history_id} "
+            f"({report.elapsed:.2f}s, {report.rows_per_second:.0f} rows/sec)"
+        )
+
+    @app.cli.command('refresh-analytics')
+    @click.option('--batch-size', type=int, default=None, help='History rows folded per transaction')
+    @click.option('--settle-seconds', type=float, default=None, help='Leave history younger than this for later')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches')
+    def refresh_analytics(batch_size, settle_seconds, max_batches):
+        """Fold history added since the last run into the daily analytics rollups."""
+        report = _analytics_service(batch_size, settle_seconds).refresh(max_batches=max_batches)
+        _echo_rollup("Folded", report)
+
+    @app.cli.command('rebuild-analytics')
+    @click.option('--batch-size', type=int, default=None, help='History rows folded per transaction')
+    @click.option('--settle-seconds', type=float, default=None, help='Leave history younger than this for later')
+    def rebuild_analytics(batch_size, settle_seconds):
+        """Recompute the daily analytics rollups from all history."""
+        report = _analytics_service(batch_size, settle_seconds).rebuild()
+        _echo_rollup("Rebuilt rollups from", report)
+
+    @app.cli.command('drain-history-outbox')
+    @click.option('--batch-size', type=int, default=None, help='Defaults to HISTORY_OUTBOX_BATCH_SIZE')
+    @click.option('--follow', is_flag=True, help='Keep draining every HISTORY_OUTBOX_INTERVAL seconds')
+    def drain_history_outbox(batch_size, follow):
+        """Move pending history events from the outbox into subscription_history."""
+        while True:
+            report = history_writer.drain(batch_size=batch_size)
+            if report.drained or not follow:
+                lag = history_writer.lag()
+                click.echo(
+                    f"Drained {report.drained} history events in {report.batches} batches "
+                    f"({report.rows_per_second:.0f} rows/sec); {lag['pending']} pending, "
+                    f"{lag['lag_seconds']:.1f}s behind"
+                )
+            if not follow:
+                return
+            db.session.remove()
+            time.sleep(app.config['HISTORY_OUTBOX_INTERVAL'] or 1)
+
+    @app.cli.command('renew-subscriptions')
+    @click.option('--window-hours', type=float, default=None, help='Defaults to RENEWAL_WINDOW_HOURS')
+    @click.option('--workers', type=int, default=None, help='Worker processes; defaults to RENEWAL_WORKERS')
+    @click.option('--batch-size', type=int, default=None, help='Rows leased per claim')
+    @click.option('--lease-seconds', type=float, default=None, help='How long a claim holds its rows')
+    @click.option('--max-batches', type=int, default=None, help='Stop each worker after this many batches')
+    def renew_subscriptions(window_hours, workers, batch_size, lease_seconds, max_batches):
+        """Renew active subscriptions that end within the window, optionally across several processes."""
+        window = timedelta(hours=app.config['RENEWAL_WINDOW_HOURS'] if window_hours is None else window_hours)
+        workers = workers or app.config['RENEWAL_WORKERS']
+        batch_size = batch_size or app.config['RENEWAL_BATCH_SIZE']
+        lease_seconds = lease_seconds or app.config['RENEWAL_LEASE_SECONDS']
+
+        started = time.perf_counter()
+        if workers == 1:
+            report = RenewalService(batch_size=batch_size, lease_seconds=lease_seconds).renew_due(
+                window, max_batches=max_batches
+            )
+            reports = [{'renewed': report.renewed, 'batches': report.batches,
+                        'conflicts': report.conflicts, 'lost_leases': report.lost_leases}]
+        else:
+            reports = renew_in_parallel(app.config['CONFIG_NAME'], workers, window, batch_size,
+                                        lease_seconds, max_batches=max_batches)
+        elapsed = time.perf_counter() - started
+
+        failed = [report for report in reports if 'error' in report]
+        reports = [report for report in reports if 'error' not in report]
+        for index, report in enumerate(reports):
+            click.echo(
+                f"worker {report.get('worker', index)}: renewed {report['renewed']} in {report['batches']} batches, "
+                f"{report['conflicts']} lease conflicts, {report['lost_leases']} lost leases"
+            )
+        for report in failed:
+            click.echo(f"worker {report['worker']}: failed: {report['error']}", err=True)
+        renewed = sum(report['renewed'] for report in reports)
+        click.echo(
+            f"Renewed {renewed} subscriptions with {workers} workers in {elapsed:.2f}s "
+            f"({renewed / elapsed if elapsed else 0:.0f} rows/sec, "
+            f"{sum(report['conflicts'] for report in reports)} lease conflicts)"
+        )
+        if failed:
+            raise SystemExit(1)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -7,13 +8,86 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600)))
+    # Admin account created by `flask seed-admin`
+    ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@gmail.com')
+    ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
+    # Swagger UI path; empty disables the UI (the spec is still built lazily on first request)
+    API_DOCS_PATH = os.getenv('API_DOCS_PATH', '/docs')
+    # Seconds a worker may serve revocation checks from its cached token-version table
+    TOKEN_VERSION_CACHE_TTL = float(os.getenv('TOKEN_VERSION_CACHE_TTL', 5))
     BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    # Password hashing pool: concurrent hashes, extra waiters before failing fast, per-hash timeout
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    # Seconds between checks of the plan catalog version row
+    PLAN_CATALOG_CHECK_INTERVAL = float(os.getenv('PLAN_CATALOG_CHECK_INTERVAL', 1))
+    # Subscription expiry sweep; an interval of 0 disables the in-process worker
+    EXPIRY_SWEEP_INTERVAL = float(os.getenv('EXPIRY_SWEEP_INTERVAL', 0))
+    EXPIRY_BATCH_SIZE = int(os.getenv('EXPIRY_BATCH_SIZE', 1000))
+    EXPIRY_BATCH_PAUSE = float(os.getenv('EXPIRY_BATCH_PAUSE', 0))
+    # Renewal engine: subscriptions ending within the window are extended by their plan's duration
+    RENEWAL_WINDOW_HOURS = float(os.getenv('RENEWAL_WINDOW_HOURS', 24))
+    RENEWAL_BATCH_SIZE = int(os.getenv('RENEWAL_BATCH_SIZE', 200))
+    RENEWAL_LEASE_SECONDS = float(os.getenv('RENEWAL_LEASE_SECONDS', 60))
+    RENEWAL_WORKERS = int(os.getenv('RENEWAL_WORKERS', 1))
+    # History rows older than this many days move to subscription_history_archive
+    HISTORY_ARCHIVE_AFTER_DAYS = int(os.getenv('HISTORY_ARCHIVE_AFTER_DAYS', 180))
+    HISTORY_ARCHIVE_BATCH_SIZE = int(os.getenv('HISTORY_ARCHIVE_BATCH_SIZE', 1000))
+    HISTORY_ARCHIVE_BATCH_PAUSE = float(os.getenv('HISTORY_ARCHIVE_BATCH_PAUSE', 0))
+    # 'outbox' appends history events in the mutation's transaction and drains them in batches; 'sync' writes them directly
+    HISTORY_WRITE_MODE = os.getenv('HISTORY_WRITE_MODE', 'outbox')
+    # Seconds between drains by the in-process writer; 0 leaves draining to `flask drain-history-outbox`
+    HISTORY_OUTBOX_INTERVAL = float(os.getenv('HISTORY_OUTBOX_INTERVAL', 1))
+    HISTORY_OUTBOX_BATCH_SIZE = int(os.getenv('HISTORY_OUTBOX_BATCH_SIZE', 500))
+    HISTORY_OUTBOX_LAG_WARN_SECONDS = float(os.getenv('HISTORY_OUTBOX_LAG_WARN_SECONDS', 30))
+    # Daily analytics rollups; an interval of 0 disables the in-process aggregator
+    ANALYTICS_ROLLUP_INTERVAL = float(os.getenv('ANALYTICS_ROLLUP_INTERVAL', 0))
+    ANALYTICS_BATCH_SIZE = int(os.getenv('ANALYTICS_BATCH_SIZE', 5000))
+    # History younger than this is left for the next run, so late-committing transactions are not skipped
+    ANALYTICS_SETTLE_SECONDS = float(os.getenv('ANALYTICS_SETTLE_SECONDS', 30))
+    # Engine profile: 'tuned' applies the SQLite pragmas or server pool settings below, 'default' leaves the driver defaults
+    DB_ENGINE_PROFILE = os.getenv('DB_ENGINE_PROFILE', 'tuned')
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # Read replicas (comma-separated URLs); reads stay on the primary this long after a user's write
+    REPLICA_DATABASE_URLS = [url.strip() for url in os.getenv('REPLICA_DATABASE_URLS', '').split(',') if url.strip()]
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
+    # Replica pool; a size of 0 keeps the driver default
+    REPLICA_POOL_SIZE = int(os.getenv('REPLICA_POOL_SIZE', 0))
+    REPLICA_MAX_OVERFLOW = int(os.getenv('REPLICA_MAX_OVERFLOW', 10))
+    REPLICA_POOL_RECYCLE = int(os.getenv('REPLICA_POOL_RECYCLE', 1800))
+    # Web server processes serving this app; gunicorn reads the same variable for its default
+    WEB_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+    # Response cache: 'memory' (per process), 'sqlite' (shared by the workers of a host) or 'none'
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_USER_TTL = float(os.getenv('RESPONSE_CACHE_USER_TTL', 5))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 10000))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'subscription-api-response-cache.db'))
+    # Per-request SQL instrumentation: Server-Timing header, N+1 and slow-request logging
+    SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', 'true').lower() == 'true'
+    SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
 
 class DevelopmentConfig(Config):
     DEBUG = True
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///:memory:')
+    BCRYPT_LOG_ROUNDS = 4
+    # History is readable as soon as the mutation commits
+    HISTORY_WRITE_MODE = os.getenv('TEST_HISTORY_WRITE_MODE', 'sync')
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -1,26 +1,104 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event, update
+from sqlalchemy.engine import make_url
+from app.core.instrumentation import init_instrumentation
+from app.core.replicas import RoutingSession, init_replica_routing, replica_binds
 
 # Initialize SQLAlchemy
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Initialize Flask-Migrate
 migrate = Migrate()
 
-def seed_admin(app):
+def seed_admin(email, password):
+    """Create the admin user unless the email is taken. Runs from `flask seed-admin`, never at startup."""
     from app.models import User
-    with app.app_context():
-        admin_email = "admin@gmail.com"
-        admin_password = "Pass@123"
-        admin = User.query.filter_by(email=admin_email).first()
-        if not admin:
-            admin = User(email=admin_email, is_admin=True)
-            admin.set_password(admin_password)
-            db.session.add(admin)
-            db.session.commit()
+    if User.query.filter_by(email=email).first():
+        return False
+    admin = User(email=email, is_admin=True)
+    admin.set_password(password)
+    db.session.add(admin)
+    db.session.commit()
+    return True
+
+def increment_counter(model, column: str, **key):
+    """Add one to `column` of the row with primary key `key`, creating it at 1, in one statement.
+
+    An upsert, so concurrent first increments cannot both try to insert the row.
+    """
+    dialect = db.engine.dialect.name
+    table = model.__table__
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).values(**key, **{column: 1}).on_conflict_do_update(
+            index_elements=list(key), set_={column: table.c[column] + 1}
+        )
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).values(**key, **{column: 1}).on_duplicate_key_update(
+            {column: table.c[column] + 1}
+        )
+    else:
+        # No portable upsert; fall back to update-then-insert
+        result = db.session.execute(
+            update(table).where(*(table.c[name] == value for name, value in key.items()))
+            .values({column: table.c[column] + 1})
+        )
+        if not result.rowcount:
+            db.session.execute(table.insert().values(**key, **{column: 1}))
+        return
+    db.session.execute(statement)
+
+def engine_options(config) -> dict:
+    """Pool settings for server databases under the 'tuned' profile; SQLite is tuned per connection instead."""
+    if config['DB_ENGINE_PROFILE'] != 'tuned' or make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+
+def tune_sqlite(engine, config):
+    """Apply the SQLite pragmas on every new connection.
+
+    WAL lets readers proceed while a writer commits, and synchronous=NORMAL syncs
+    only at checkpoints, which is still durable against application crashes.
+    busy_timeout makes writers wait for the lock instead of failing immediately.
+    """
+    pragmas = [
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size={-config['SQLITE_CACHE_SIZE_KB']}"
+    ]
+    if engine.url.database not in (None, '', ':memory:'):
+        pragmas.insert(0, f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
 
 def init_db(app):
     """Initialize the database with the Flask app."""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(app.config), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}), **replica_binds(app.config)}
     db.init_app(app)
     migrate.init_app(app, db)
-    seed_admin(app) 
\ No newline at end of file
+    init_replica_routing(app)
+    with app.app_context():
+        if app.config['DB_ENGINE_PROFILE'] == 'tuned':
+            for engine in db.engines.values():
+                if engine.url.get_backend_name() == 'sqlite':
+                    tune_sqlite(engine, app.config)
+        init_instrumentation(app, db.engines.values())
@@ -0,0 +1,62 @@
+"""Strong ETags built from row and catalog version stamps.
+
+Tags are computed from version numbers alone, so a conditional GET can answer
+304 without loading or serializing the resource. A subscription's tag also
+carries the version of its embedded plan.
+"""
+from typing import FrozenSet, Optional
+from flask import Response, request
+
+
+class VersionConflictError(ValueError):
+    """The row changed since the version the client (or this request) last saw."""
+
+
+def plan_etag(plan) -> str:
+    return f"p{plan.id}.{plan.version}"
+
+
+def plan_list_etag(catalog_version: int) -> str:
+    return f"plans.{catalog_version}"
+
+
+def subscription_etag(subscription_id: int, version: int, plan, variant: Optional[str] = None) -> str:
+    """`variant` tells sparse representations (?fields=, ?include=) of the same version apart."""
+    plan_part = f"p{plan.id}.{plan.version}" if plan is not None else 'p0'
+    tag = f"s{subscription_id}.{version}-{plan_part}"
+    return f"{tag}-{variant}" if variant else tag
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    """A 304 response when If-None-Match already names `etag`, else None."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        set_etag(response, etag)
+        return response
+    return None
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    # Authenticated resources: browsers and proxies may store them but must revalidate
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def if_match_tags() -> Optional[FrozenSet[str]]:
+    """Strong entity tags named by If-Match; None when the header is absent or '*'."""
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    return frozenset(request.if_match.as_set())
+
+
+def matches_current(etag: str, expected: Optional[FrozenSet[str]]) -> bool:
+    """Whether If-Match tags (from if_match_tags) name the resource's current tag.
+
+    Tags compare whole, so a tag for another resource or plan never matches. The
+    sparse variants of the current tag (`<tag>-<variant>`) match too, since they
+    carry the same versions.
+    """
+    if expected is None:
+        return True
+    return any(tag == etag or tag.startswith(f"{etag}-") for tag in expected)
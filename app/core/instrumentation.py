@@ -0,0 +1,135 @@
+"""Per-request SQL instrumentation.
+
+Engine events count every statement issued while a request is being handled,
+together with its time and the rows it touched. After the request, the totals
+go out as a Server-Timing header. Statement shapes repeated at least
+SQL_N_PLUS_ONE_THRESHOLD times are flagged as suspected N+1 patterns. Slow or
+suspicious requests are logged as one structured JSON record.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_NAMED_PARAM = re.compile(r'(%\(\w+\)s|:\w+|\$\d+|%s)')
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so calls differing only in literals or IN-list length compare equal."""
+    sql = _WHITESPACE.sub(' ', statement).strip()
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NAMED_PARAM.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _PARAM_LIST.sub('(?)', sql)
+
+
+class RequestSQLStats:
+    __slots__ = ('started', 'queries', 'db_time', 'rows', 'shapes', 'shape_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.shapes = Counter()
+        self.shape_time = defaultdict(float)
+
+    def suspected_n_plus_one(self, threshold: int):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def _current_stats():
+    return g.get('_sql_stats') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    started = conn.info.get('_query_started')
+    if stats is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    shape = fingerprint(statement)
+    stats.queries += 1
+    stats.db_time += elapsed
+    stats.shapes[shape] += 1
+    stats.shape_time[shape] += elapsed
+    # rowcount is only meaningful for DML; selected rows are counted as ORM loads below
+    if cursor.rowcount and cursor.rowcount > 0 and not statement.lstrip().upper().startswith('SELECT'):
+        stats.rows += cursor.rowcount
+
+
+def _on_instance_load(target, context):
+    stats = _current_stats()
+    if stats is not None:
+        stats.rows += 1
+
+
+def instrument_engine(engine):
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_instrumentation(app, engines):
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+
+    for engine in engines:
+        instrument_engine(engine)
+    if not event.contains(Mapper, 'load', _on_instance_load):
+        event.listen(Mapper, 'load', _on_instance_load)
+
+    @app.before_request
+    def start_sql_stats():
+        g._sql_stats = RequestSQLStats()
+
+    @app.after_request
+    def report_sql_stats(response):
+        stats = g.pop('_sql_stats', None)
+        if stats is None:
+            return response
+
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_time * 1000
+        if app.config['SERVER_TIMING_HEADER']:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={db_ms:.2f};desc="{stats.queries} queries, {stats.rows} rows", app;dur={total_ms:.2f}'
+            )
+
+        suspects = stats.suspected_n_plus_one(app.config['SQL_N_PLUS_ONE_THRESHOLD'])
+        if suspects or total_ms >= app.config['SLOW_REQUEST_MS']:
+            slowest = sorted(stats.shape_time.items(), key=lambda item: item[1], reverse=True)[:5]
+            record = {
+                'event': 'slow_request' if total_ms >= app.config['SLOW_REQUEST_MS'] else 'suspected_n_plus_one',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(total_ms, 2),
+                'db_ms': round(db_ms, 2),
+                'queries': stats.queries,
+                'rows': stats.rows,
+                'n_plus_one': [{'sql': shape, 'count': count} for shape, count in suspects],
+                'slowest_sql': [
+                    {'sql': shape, 'count': stats.shapes[shape], 'ms': round(seconds * 1000, 2)}
+                    for shape, seconds in slowest
+                ]
+            }
+            logger.warning(json.dumps(record))
+        return response
@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import NamedTuple, Union
+import bcrypt
+from flask import current_app
+from werkzeug.security import check_password_hash
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+
+class HasherOverloadedError(RuntimeError):
+    """Raised instead of queueing when the hashing pool is saturated."""
+
+
+class _HashPool(NamedTuple):
+    executor: ThreadPoolExecutor
+    slots: threading.BoundedSemaphore
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool shared by the request workers.
+
+    bcrypt releases the GIL while hashing, so a small pool keeps login spikes
+    from monopolising the interpreter. At most PASSWORD_HASH_WORKERS hashes run
+    concurrently and PASSWORD_HASH_MAX_QUEUE more may wait; anything beyond
+    that fails fast with HasherOverloadedError. The calling request thread still
+    blocks until its hash is done (or PASSWORD_HASH_TIMEOUT passes): the pool
+    caps hashing concurrency and sheds excess load, it does not free the worker.
+    Each app gets its own pool, sized from its own config.
+
+    Hashes are stored as bcrypt modular-crypt strings ($2b$<cost>$...), which
+    carry their own cost. Werkzeug hashes and bytes values written by older
+    code are still verified and reported by needs_rehash().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _pool(self) -> _HashPool:
+        pool = current_app.extensions.get('password_hasher')
+        if pool is None:
+            with self._lock:
+                pool = current_app.extensions.get('password_hasher')
+                if pool is None:
+                    workers = current_app.config['PASSWORD_HASH_WORKERS']
+                    pool = _HashPool(
+                        ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash'),
+                        threading.BoundedSemaphore(workers + current_app.config['PASSWORD_HASH_MAX_QUEUE'])
+                    )
+                    current_app.extensions['password_hasher'] = pool
+        return pool
+
+    def _run(self, fn, *args):
+        pool = self._pool()
+        if not pool.slots.acquire(blocking=False):
+            raise HasherOverloadedError("Password hashing capacity exceeded, retry shortly")
+        try:
+            future = pool.executor.submit(fn, *args)
+        except Exception:
+            pool.slots.release()
+            raise
+        future.add_done_callback(lambda _: pool.slots.release())
+        try:
+            return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+        except TimeoutError:
+            raise HasherOverloadedError("Password hashing timed out, retry shortly")
+
+    @staticmethod
+    def _normalize(stored: Union[str, bytes]) -> str:
+        return stored.decode('utf-8') if isinstance(stored, bytes) else stored
+
+    def hash(self, password: str) -> str:
+        rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+        hashed = self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)))
+        return hashed.decode('utf-8')
+
+    def verify(self, password: str, stored: Union[str, bytes]) -> bool:
+        if not stored:
+            return False
+        stored = self._normalize(stored)
+        if stored.startswith(BCRYPT_PREFIXES):
+            return self._run(lambda: bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8')))
+        # Legacy werkzeug format (pbkdf2:/scrypt:)
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored: Union[str, bytes]) -> bool:
+        if isinstance(stored, bytes):
+            return True
+        if not stored or not stored.startswith(BCRYPT_PREFIXES):
+            return True
+        try:
+            cost = int(stored.split('$')[2])
+        except (IndexError, ValueError):
+            return True
+        return cost != current_app.config['BCRYPT_LOG_ROUNDS']
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,148 @@
+"""Primary/replica routing for read-only service methods.
+
+Replicas are configured with REPLICA_DATABASE_URLS and registered as the
+`replica_<n>` binds. Service methods decorated with @read_replica send their
+SELECTs to a replica, round-robin. Everything else goes to the primary:
+undecorated code, writes, and flushes.
+
+Reads stay on the primary for the rest of a session that has written. They also
+stay there for REPLICA_STICKY_SECONDS after a request committed a write. The
+deadline goes back to the client in the `replica_sticky_until` cookie, so the
+window holds on whichever worker serves the next request. Clients that drop
+cookies fall back to a per-process window keyed by JWT identity, which only
+covers the worker that took the write.
+"""
+import functools
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+REPLICA_BIND_PREFIX = 'replica_'
+STICKY_COOKIE = 'replica_sticky_until'
+_STICKY_PRUNE_SIZE = 10000
+
+_route: ContextVar[str] = ContextVar('db_route', default=PRIMARY)
+_round_robin = itertools.count()
+
+
+def replica_binds(config) -> dict:
+    """SQLALCHEMY_BINDS entries for the configured replicas."""
+    options = {'pool_pre_ping': True, 'pool_recycle': config['REPLICA_POOL_RECYCLE']}
+    if config['REPLICA_POOL_SIZE']:
+        options['pool_size'] = config['REPLICA_POOL_SIZE']
+        options['max_overflow'] = config['REPLICA_MAX_OVERFLOW']
+    return {
+        f"{REPLICA_BIND_PREFIX}{index}": dict(options, url=url)
+        for index, url in enumerate(config['REPLICA_DATABASE_URLS'])
+    }
+
+
+def _request_identity():
+    if not has_request_context():
+        return None
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # no JWT verified for this request
+        return None
+
+
+def _sticky_deadlines() -> dict:
+    return current_app.extensions.setdefault('replica_sticky', {})
+
+
+def _recently_wrote(identity) -> bool:
+    deadline = _sticky_deadlines().get(identity)
+    return deadline is not None and deadline > time.monotonic()
+
+
+def _client_recently_wrote() -> bool:
+    """True while the request carries an unexpired sticky cookie from an earlier write."""
+    if not has_request_context():
+        return False
+    try:
+        deadline = float(request.cookies.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    # A deadline further out than one window was not set by us; ignore it
+    return now < deadline <= now + current_app.config['REPLICA_STICKY_SECONDS']
+
+
+def _mark_write(identity):
+    deadlines = _sticky_deadlines()
+    now = time.monotonic()
+    if len(deadlines) >= _STICKY_PRUNE_SIZE:
+        for key in [key for key, deadline in deadlines.items() if deadline <= now]:
+            deadlines.pop(key, None)
+    deadlines[identity] = now + current_app.config['REPLICA_STICKY_SECONDS']
+
+
+class RoutingSession(Session):
+    def _replica_engines(self):
+        return [engine for key, engine in self._db.engines.items()
+                if key and key.startswith(REPLICA_BIND_PREFIX)]
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['wrote'] = True
+            elif _route.get() == REPLICA and not self.info.get('wrote'):
+                replicas = self._replica_engines()
+                identity = _request_identity()
+                if replicas and not _client_recently_wrote() and (identity is None or not _recently_wrote(identity)):
+                    return replicas[next(_round_robin) % len(replicas)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _record_committed_write(session):
+    if session.info.get('wrote') and has_request_context():
+        g.replica_sticky_until = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+        identity = _request_identity()
+        if identity is not None:
+            _mark_write(identity)
+
+
+def init_replica_routing(app):
+    if not app.config['REPLICA_DATABASE_URLS']:
+        return
+
+    @app.after_request
+    def set_sticky_cookie(response):
+        deadline = g.pop('replica_sticky_until', None)
+        if deadline is not None:
+            response.set_cookie(STICKY_COOKIE, f"{deadline:.3f}", max_age=math.ceil(app.config['REPLICA_STICKY_SECONDS']),
+                                httponly=True, samesite='Lax')
+        return response
+
+
+@contextmanager
+def use_route(route: str):
+    token = _route.set(route)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def primary():
+    """Force the block onto the primary, e.g. for version checks inside a replica read."""
+    return use_route(PRIMARY)
+
+
+def read_replica(fn):
+    """Route the reads of a read-only service method to a replica."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with use_route(REPLICA):
+            return fn(*args, **kwargs)
+    return wrapper
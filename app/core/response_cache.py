@@ -0,0 +1,324 @@
+"""Cache of encoded GET responses for hot read endpoints.
+
+Entries are keyed by route, query string, the caller's identity for per-user
+resources, and the current generation of each tag the resource depends on.
+Invalidating a tag (`plans`, `user:<id>`) bumps its generation, so every key
+built from the old generation stops matching and ages out of the LRU/TTL.
+Services queue their tags with invalidate_on_commit(); the generations move
+once the transaction commits, never before.
+
+Backends:
+    memory  per-process OrderedDict, LRU-bounded by entries and bytes; tag
+            generations are kept only for tags with live entries
+    sqlite  one file shared by all workers on a host, FIFO-bounded by entries
+    none    caching disabled
+"""
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from flask import Response, current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.database import db
+
+logger = logging.getLogger(__name__)
+
+PLANS_TAG = 'plans'
+_PENDING_TAGS_KEY = 'response_cache_tags'
+_CACHED_HEADERS = ('ETag', 'Cache-Control')
+
+Entry = Tuple[bytes, Dict[str, str]]
+
+
+def user_tag(user_id) -> str:
+    return f"user:{int(user_id)}"
+
+
+class MemoryBackend:
+    """Per-process LRU of entries plus the generations of the tags they depend on.
+
+    Generations come from one clock, so a tag never returns to an earlier value.
+    Tags with no live entries are pruned once they outnumber the tags in use; a
+    pruned or never-bumped tag reads as the clock at the last prune, which is
+    past every generation an in-flight request could have built its key from.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, size, entry, tags)
+        self._generations: Dict[str, int] = {}
+        self._refs: Dict[str, int] = {}  # tag -> live entries keyed on it
+        self._clock = 0
+        self._floor = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return item[2]
+
+    def set(self, key: str, entry: Entry, ttl: float, tags: Tuple[str, ...] = ()):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + ttl, size, entry, tags)
+            self._bytes += size
+            for tag in tags:
+                self._refs[tag] = self._refs.get(tag, 0) + 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: str):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1]
+            for tag in item[3]:
+                if self._refs[tag] == 1:
+                    del self._refs[tag]
+                else:
+                    self._refs[tag] -= 1
+
+    def generations(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._generations.get(tag, self._floor) for tag in tags)
+
+    def bump(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._clock += 1
+                self._generations[tag] = self._clock
+            if len(self._generations) > max(self.max_entries, 2 * len(self._refs)):
+                self._prune_generations()
+
+    def _prune_generations(self):
+        # Live tags keep their generation, including the ones still at the old floor
+        kept = {tag: self._generations.get(tag, self._floor) for tag in self._refs}
+        # generations() reads without the lock, so move the floor before dropping any tag
+        self._floor = self._clock
+        self._generations = kept
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._refs.clear()
+            self._bytes = 0
+            self._prune_generations()
+
+
+class SQLiteBackend:
+    """Cache file shared by the workers of one host; entries evicted oldest-stored first."""
+
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not cross a fork, so they are keyed by pid as well as thread
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'key TEXT PRIMARY KEY, body BLOB NOT NULL, headers TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, stored_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_stored ON response_cache (stored_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS response_cache_generations (tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Entry]:
+        row = self._conn().execute(
+            'SELECT body, headers FROM response_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set(self, key: str, entry: Entry, ttl: float, tags: Tuple[str, ...] = ()):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO response_cache (key, body, headers, expires_at, stored_at) VALUES (?, ?, ?, ?, ?)',
+            (key, entry[0], json.dumps(entry[1]), now + ttl, now)
+        )
+        self._sets += 1
+        if self._sets % self.EVICT_EVERY == 0:
+            conn.execute('DELETE FROM response_cache WHERE expires_at <= ?', (now,))
+            conn.execute(
+                'DELETE FROM response_cache WHERE key IN ('
+                'SELECT key FROM response_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def generations(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        conn = self._conn()
+        result = []
+        for tag in tags:
+            row = conn.execute('SELECT generation FROM response_cache_generations WHERE tag = ?', (tag,)).fetchone()
+            result.append(row[0] if row else 0)
+        return tuple(result)
+
+    def bump(self, tags: Iterable[str]):
+        self._conn().executemany(
+            'INSERT INTO response_cache_generations (tag, generation) VALUES (?, 1) '
+            'ON CONFLICT(tag) DO UPDATE SET generation = generation + 1',
+            [(tag,) for tag in tags]
+        )
+
+    def clear(self):
+        self._conn().execute('DELETE FROM response_cache')
+
+
+def init_response_cache(app):
+    # Each worker only sees its own invalidations, so per-user entries go stale across workers
+    if app.config['RESPONSE_CACHE_BACKEND'] == 'memory' and app.config['WEB_WORKERS'] > 1:
+        logger.warning(
+            "RESPONSE_CACHE_BACKEND=memory with %d workers: per-user responses can lag a user's own writes "
+            "by up to RESPONSE_CACHE_USER_TTL (%gs) on other workers. Use RESPONSE_CACHE_BACKEND=sqlite.",
+            app.config['WEB_WORKERS'], app.config['RESPONSE_CACHE_USER_TTL']
+        )
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _state(self) -> dict:
+        state = current_app.extensions.get('response_cache')
+        if state is None:
+            with self._lock:
+                state = current_app.extensions.get('response_cache')
+                if state is None:
+                    state = {
+                        'backend': self._create_backend(current_app.config),
+                        'counters': {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0},
+                        'lock': threading.Lock()
+                    }
+                    current_app.extensions['response_cache'] = state
+        return state
+
+    @staticmethod
+    def _create_backend(config):
+        kind = config['RESPONSE_CACHE_BACKEND']
+        if kind == 'memory':
+            return MemoryBackend(config['RESPONSE_CACHE_MAX_ENTRIES'], config['RESPONSE_CACHE_MAX_BYTES'])
+        if kind == 'sqlite':
+            return SQLiteBackend(config['RESPONSE_CACHE_PATH'], config['RESPONSE_CACHE_MAX_ENTRIES'])
+        if kind == 'none':
+            return None
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {kind!r}")
+
+    def _count(self, state: dict, counter: str, amount: int = 1):
+        with state['lock']:
+            state['counters'][counter] += amount
+
+    def stats(self) -> Dict[str, int]:
+        state = self._state()
+        with state['lock']:
+            return dict(state['counters'])
+
+    def cached(self, tags: Iterable[str] = (), per_user: bool = False,
+               vary: Optional[Callable[[], object]] = None, ttl: Optional[float] = None):
+        """Cache 200 responses of a GET resource method that returns a Response.
+
+        per_user keys the entry by JWT identity, ties it to the user's tag and keeps
+        it for RESPONSE_CACHE_USER_TTL instead of RESPONSE_CACHE_TTL. `vary` adds a
+        cheap value (such as the plan catalog version) to the key.
+        """
+        static_tags = tuple(tags)
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                state = self._state()
+                backend = state['backend']
+                if backend is None:
+                    return fn(*args, **kwargs)
+
+                scope = get_jwt_identity() if per_user else '*'
+                entry_tags = static_tags + ((user_tag(scope),) if per_user else ())
+                key = '|'.join((
+                    request.path,
+                    '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True))),
+                    str(scope),
+                    str(vary()) if vary else '',
+                    ','.join(map(str, backend.generations(entry_tags)))
+                ))
+
+                entry = backend.get(key)
+                if entry is not None:
+                    self._count(state, 'hits')
+                    body, headers = entry
+                    etag = headers.get('ETag')
+                    if etag and request.if_none_match.contains(etag.strip('"')):
+                        response = Response(status=304, headers=headers)
+                    else:
+                        response = Response(body, headers=headers, mimetype='application/json')
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count(state, 'misses')
+                response = fn(*args, **kwargs)
+                if isinstance(response, Response) and response.status_code == 200 and not response.is_streamed:
+                    headers = {name: response.headers[name] for name in _CACHED_HEADERS if name in response.headers}
+                    if ttl is not None:
+                        entry_ttl = ttl
+                    else:
+                        entry_ttl = current_app.config['RESPONSE_CACHE_USER_TTL' if per_user else 'RESPONSE_CACHE_TTL']
+                    backend.set(key, (response.get_data(), headers), entry_ttl, entry_tags)
+                    self._count(state, 'stores')
+                    response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags: str):
+        state = self._state()
+        if state['backend'] is not None and tags:
+            state['backend'].bump(tags)
+            self._count(state, 'invalidations', len(tags))
+
+    def invalidate_on_commit(self, *tags: str):
+        """Invalidate `tags` once the current transaction commits; dropped on rollback."""
+        db.session.info.setdefault(_PENDING_TAGS_KEY, set()).update(tags)
+
+    def clear(self):
+        backend = self._state()['backend']
+        if backend is not None:
+            backend.clear()
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    tags = session.info.pop(_PENDING_TAGS_KEY, None)
+    if tags:
+        response_cache.invalidate(*sorted(tags))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_TAGS_KEY, None)
@@ -0,0 +1,87 @@
+import threading
+import time
+from functools import wraps
+from typing import Dict
+from flask import current_app
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_restx import abort
+from sqlalchemy import select
+from app.core.database import db, increment_counter
+from app.models import TokenVersion
+
+ADMIN_CLAIM = 'is_admin'
+TOKEN_VERSION_CLAIM = 'tv'
+
+
+class TokenVersionCache:
+    """Process-local copy of user_token_versions, reloaded every TOKEN_VERSION_CACHE_TTL seconds.
+
+    The table only holds rows for users whose tokens were revoked at least once,
+    so it is loaded whole; users without a row are at version 0.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _versions(self) -> Dict[int, int]:
+        state = current_app.extensions.get('token_versions')
+        ttl = current_app.config['TOKEN_VERSION_CACHE_TTL']
+        if state is not None and time.monotonic() - state[1] < ttl:
+            return state[0]
+
+        with self._lock:
+            state = current_app.extensions.get('token_versions')
+            if state is None or time.monotonic() - state[1] >= ttl:
+                versions = dict(db.session.execute(select(TokenVersion.user_id, TokenVersion.version)).all())
+                state = (versions, time.monotonic())
+                current_app.extensions['token_versions'] = state
+            return state[0]
+
+    def get(self, user_id) -> int:
+        return self._versions().get(int(user_id), 0)
+
+    def current(self, user_id) -> int:
+        """Read the version straight from the database, for issuing tokens."""
+        row = db.session.get(TokenVersion, int(user_id))
+        return row.version if row else 0
+
+    def bump(self, user_id):
+        """Increment the user's token version inside the caller's transaction."""
+        increment_counter(TokenVersion, 'version', user_id=int(user_id))
+
+    def invalidate(self):
+        current_app.extensions.pop('token_versions', None)
+
+    def is_revoked(self, user_id, token_version: int) -> bool:
+        """True when a token predates the user's current version.
+
+        A token newer than the cached version was issued from the database after a
+        bump this worker has not seen yet, so the cache is reloaded, not the token rejected.
+        """
+        cached = self.get(user_id)
+        if token_version > cached:
+            self.invalidate()
+            cached = self.get(user_id)
+        return token_version < cached
+
+
+token_versions = TokenVersionCache()
+
+
+def register_jwt_callbacks(jwt):
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        return token_versions.is_revoked(jwt_payload['sub'], jwt_payload.get(TOKEN_VERSION_CLAIM, 0))
+
+
+def admin_required():
+    """Like jwt_required(), but also demands the admin claim embedded at login."""
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verify_jwt_in_request()
+            if not get_jwt().get(ADMIN_CLAIM):
+                abort(403, error="Admin privileges required")
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
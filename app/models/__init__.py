@@ -2,5 +2,12 @@ from app.models.user import User
 from app.models.plan import SubscriptionPlan
 from app.models.subscription import Subscription
 from app.models.subscription_history import SubscriptionHistory
+from app.models.subscription_history_archive import SubscriptionHistoryArchive
+from app.models.history_outbox import HistoryOutbox
+from app.models.catalog_version import CatalogVersion
+from app.models.token_version import TokenVersion
+from app.models.user_subscription_stats import UserSubscriptionStats
+from app.models.daily_plan_stats import DailyPlanStats
+from app.models.rollup_watermark import RollupWatermark
 
-__all__ = ['User', 'SubscriptionPlan', 'Subscription', 'SubscriptionHistory'] 
\ No newline at end of file
+__all__ = ['User', 'SubscriptionPlan', 'Subscription', 'SubscriptionHistory', 'SubscriptionHistoryArchive', 'HistoryOutbox', 'CatalogVersion', 'TokenVersion', 'UserSubscriptionStats', 'DailyPlanStats', 'RollupWatermark'] 
\ No newline at end of file
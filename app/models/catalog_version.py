@@ -0,0 +1,8 @@
+from app.core.database import db
+
+class CatalogVersion(db.Model):
+    """Monotonic version counters that let worker processes detect catalog writes."""
+    __tablename__ = 'catalog_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,20 @@
+from app.core.database import db
+
+class DailyPlanStats(db.Model):
+    """Per-day, per-plan subscription movements, folded in from subscription history."""
+    __tablename__ = 'daily_plan_stats'
+    
+    day = db.Column(db.Date, primary_key=True)
+    # No foreign key: rollups outlive deleted plans
+    plan_id = db.Column(db.Integer, primary_key=True)
+    new_subscriptions = db.Column(db.Integer, nullable=False, default=0)
+    reactivations = db.Column(db.Integer, nullable=False, default=0)
+    renewals = db.Column(db.Integer, nullable=False, default=0)
+    upgrades = db.Column(db.Integer, nullable=False, default=0)  # Moves onto this plan from a cheaper one
+    downgrades = db.Column(db.Integer, nullable=False, default=0)  # Moves onto this plan from a dearer one
+    cancellations = db.Column(db.Integer, nullable=False, default=0)
+    expirations = db.Column(db.Integer, nullable=False, default=0)
+    deactivations = db.Column(db.Integer, nullable=False, default=0)  # Other moves out of 'active'
+    # Net change in active subscribers; summed over earlier days it gives the active count
+    active_delta = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
@@ -0,0 +1,19 @@
+from app.core.database import db
+
+class HistoryOutbox(db.Model):
+    """History events waiting to be copied into subscription_history in batches.
+
+    Only the primary key is indexed, so appending an event inside a mutation's
+    transaction costs one cheap insert.
+    """
+    __tablename__ = 'subscription_history_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    old_plan_id = db.Column(db.Integer, nullable=True)
+    new_plan_id = db.Column(db.Integer, nullable=True)
+    old_status = db.Column(db.String(20), nullable=True)
+    new_status = db.Column(db.String(20), nullable=True)
+    change_type = db.Column(db.String(20), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
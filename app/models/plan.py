@@ -10,5 +10,9 @@ class SubscriptionPlan(db.Model):
     duration_days = db.Column(db.Integer, nullable=False)
     features = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every ORM update; backs ETags and If-Match
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
-    subscriptions = db.relationship('Subscription', back_populates='plan', lazy='dynamic') 
\ No newline at end of file
+    subscriptions = db.relationship('Subscription', back_populates='plan', lazy='dynamic')
+    
+    __mapper_args__ = {'version_id_col': version} 
\ No newline at end of file
@@ -0,0 +1,9 @@
+from app.core.database import db
+
+class RollupWatermark(db.Model):
+    """Highest subscription_history id an incremental rollup has folded in."""
+    __tablename__ = 'rollup_watermarks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    last_history_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
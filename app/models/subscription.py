@@ -7,6 +7,9 @@ class SubscriptionStatus(Enum):
     CANCELLED = 'cancelled'
     EXPIRED = 'expired'
 
+# Partial unique index allowing at most one active subscription per user
+ONE_ACTIVE_PER_USER_INDEX = 'uq_subscription_user_active'
+
 class Subscription(db.Model):
     __tablename__ = 'subscriptions'
     
@@ -17,13 +20,26 @@ class Subscription(db.Model):
     start_date = db.Column(db.DateTime, nullable=False, index=True)
     end_date = db.Column(db.DateTime, nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every ORM update (and by hand in bulk UPDATEs); backs ETags and If-Match
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Set while a renewal worker holds the row; a lapsed lease can be claimed by another worker
+    lease_token = db.Column(db.String(32), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
     user = db.relationship('User', back_populates='subscriptions')
     plan = db.relationship('SubscriptionPlan', back_populates='subscriptions')
     
+    __mapper_args__ = {'version_id_col': version}
+    
     __table_args__ = (
         db.Index('idx_subscription_status_dates', 'status', 'start_date', 'end_date'),
+        db.Index('idx_subscription_status_created', 'status', 'created_at', 'id'),
+        db.Index(
+            ONE_ACTIVE_PER_USER_INDEX, 'user_id', unique=True,
+            sqlite_where=db.text("status = 'active'"),
+            postgresql_where=db.text("status = 'active'")
+        ),
     )
     
     @property
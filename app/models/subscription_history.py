@@ -11,8 +11,10 @@ class SubscriptionHistory(db.Model):
     new_plan_id = db.Column(db.Integer, db.ForeignKey('subscription_plans.id'), nullable=True)
     old_status = db.Column(db.String(20), nullable=True)
     new_status = db.Column(db.String(20), nullable=True)
-    change_type = db.Column(db.String(20), nullable=False)  # 'create', 'upgrade', 'downgrade', 'cancel'
+    change_type = db.Column(db.String(20), nullable=False)  # 'create', 'upgrade', 'downgrade', 'cancel', 'expire', 'renew'
     changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # When the row itself was inserted; outbox drains insert it well after changed_at
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
 
     subscription = db.relationship('Subscription', backref='history', lazy='joined')
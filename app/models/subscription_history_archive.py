@@ -0,0 +1,27 @@
+from app.core.database import db
+
+class SubscriptionHistoryArchive(db.Model):
+    """History rows moved out of subscription_history once they pass the archive horizon.
+
+    Rows keep their original ids. Only the two indexes the history reads walk are
+    kept, and there are no plan or user foreign keys to check on insert.
+    """
+    __tablename__ = 'subscription_history_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscriptions.id'), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    old_plan_id = db.Column(db.Integer, nullable=True)
+    new_plan_id = db.Column(db.Integer, nullable=True)
+    old_status = db.Column(db.String(20), nullable=True)
+    new_status = db.Column(db.String(20), nullable=True)
+    change_type = db.Column(db.String(20), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
+    recorded_at = db.Column(db.DateTime, nullable=False)
+
+    subscription = db.relationship('Subscription')
+    
+    __table_args__ = (
+        db.Index('idx_subscription_history_archive_sub_date', 'subscription_id', 'changed_at'),
+        db.Index('idx_subscription_history_archive_user_sub_date', 'user_id', 'subscription_id', 'changed_at'),
+    )
@@ -0,0 +1,8 @@
+from app.core.database import db
+
+class TokenVersion(db.Model):
+    """Per-user token generation; access tokens carrying an older version are rejected."""
+    __tablename__ = 'user_token_versions'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
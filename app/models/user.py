@@ -1,6 +1,6 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.core.database import db
+from app.core.passwords import password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -16,7 +16,7 @@ class User(db.Model):
     subscriptions = db.relationship('Subscription', back_populates='user', lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password) 
\ No newline at end of file
+        return password_hasher.verify(password, self.password_hash) 
\ No newline at end of file
@@ -0,0 +1,14 @@
+from app.core.database import db
+
+class UserSubscriptionStats(db.Model):
+    """Per-user subscription summary, maintained by the subscription write paths."""
+    __tablename__ = 'user_subscription_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    subscription_count = db.Column(db.Integer, nullable=False, default=0)
+    last_subscription_date = db.Column(db.DateTime)
+    active_subscription_id = db.Column(db.Integer, db.ForeignKey('subscriptions.id'), index=True)
+    active_plan_id = db.Column(db.Integer, db.ForeignKey('subscription_plans.id'))
+    active_end_date = db.Column(db.DateTime)
+    # Sum of plan prices over billing events: create, upgrade, downgrade and renew
+    lifetime_spend = db.Column(db.Float, nullable=False, default=0)
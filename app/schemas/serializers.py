@@ -0,0 +1,245 @@
+"""Compiled response serializers.
+
+Each response shape is compiled once, at import, into a flat function that reads
+attributes straight into a dict, so a list response costs one function call per
+row instead of a marshmallow dump followed by a flask-restx marshal. Datetimes are
+formatted with isoformat(), matching what both of those produced. The flask-restx
+models stay in app/api for the Swagger documentation only.
+
+Subscription and history shapes also come in sparse variants chosen with
+?fields= and ?include=, compiled on first use per field set.
+"""
+import json
+import threading
+import zlib
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from flask import Response
+from app.services.plan_catalog import plan_catalog
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+RAW = 'raw'
+DATETIME = 'datetime'
+FLOAT = 'float'
+MAPPING = 'mapping'
+
+
+class Field(NamedTuple):
+    key: str
+    kind: object = RAW  # RAW, DATETIME, FLOAT, MAPPING or a callable applied to the source value
+    source: Optional[str] = None  # attribute path, defaults to key
+
+
+def compile_serializer(name: str, spec: Iterable[Field]) -> Callable[[object], Dict]:
+    namespace = {}
+    items = []
+    for index, field in enumerate(spec):
+        value = f"obj.{field.source or field.key}"
+        if field.kind == RAW:
+            expr = value
+        elif field.kind == DATETIME:
+            expr = f"(None if (_v := {value}) is None else _v.isoformat())"
+        elif field.kind == FLOAT:
+            expr = f"(None if (_v := {value}) is None else float(_v))"
+        elif field.kind == MAPPING:
+            expr = f"(None if (_v := {value}) is None else dict(_v))"
+        elif callable(field.kind):
+            namespace[f"_fn{index}"] = field.kind
+            expr = f"_fn{index}({value})"
+        else:
+            raise ValueError(f"Unknown field kind {field.kind!r}")
+        items.append(f"        {field.key!r}: {expr},")
+
+    source = "\n".join([f"def serialize_{name}(obj):", "    return {", *items, "    }"])
+    exec(compile(source, f"<serializer {name}>", "exec"), namespace)
+    return namespace[f"serialize_{name}"]
+
+
+if orjson is not None:
+    def dumps(payload) -> bytes:
+        return orjson.dumps(payload)
+else:
+    _encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+    def dumps(payload) -> bytes:
+        return _encode(payload).encode('utf-8')
+
+
+def json_response(payload, status: int = 200, headers: Optional[Dict] = None) -> Response:
+    return Response(dumps(payload), status=status, headers=headers, mimetype='application/json')
+
+
+serialize_plan = compile_serializer('plan', [
+    Field('id'),
+    Field('name'),
+    Field('price', FLOAT),
+    Field('duration_days'),
+    Field('features', MAPPING),
+    Field('created_at', DATETIME),
+])
+
+_plan_payloads: Dict[int, tuple] = {}
+
+
+def plan_payload(plan_id) -> Optional[Dict]:
+    """Serialized plan from the catalog, reused across rows until the snapshot changes."""
+    snapshot = plan_catalog.get(plan_id) if plan_id is not None else None
+    if snapshot is None:
+        return None
+    cached = _plan_payloads.get(snapshot.id)
+    if cached is None or cached[0] is not snapshot:
+        cached = (snapshot, serialize_plan(snapshot))
+        _plan_payloads[snapshot.id] = cached
+    return cached[1]
+
+
+class Fieldset(NamedTuple):
+    """Payload keys picked with ?fields= and ?include=."""
+    keys: FrozenSet[str]
+    # Canonical query form, used to tell representations apart in ETags
+    key: str
+
+    @property
+    def tag(self) -> str:
+        return f"{zlib.crc32(self.key.encode('utf-8')):08x}"
+
+
+def _split(value: str) -> List[str]:
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class SparseSerializer:
+    """A compiled serializer and the sparse variants of it that clients can ask for.
+
+    `?fields=` picks scalar keys from the default payload or from `extra` keys
+    that are only served on request. `?include=` names the nested objects to
+    embed; each include maps to one or more keys of the spec. Without either
+    parameter the full default payload is served. With only `fields`, nothing
+    is embedded. With only `include`, every default scalar is kept. `id` is
+    always part of the payload.
+    """
+
+    def __init__(self, name: str, spec: Iterable[Field], includes: Dict[str, Tuple[str, ...]],
+                 extra: Iterable[Field] = ()):
+        self.name = name
+        self.spec = tuple(spec)
+        self.extra = tuple(extra)
+        self.includes = includes
+        nested = {key for keys in includes.values() for key in keys}
+        self.scalars = tuple(field.key for field in self.spec if field.key not in nested)
+        self.selectable = self.scalars + tuple(field.key for field in self.extra)
+        self.full = compile_serializer(name, self.spec)
+        self._variants: Dict[FrozenSet[str], Callable[[object], Dict]] = {}
+        self._lock = threading.Lock()
+
+    def parse(self, fields: Optional[str], include: Optional[str]) -> Optional[Fieldset]:
+        """The Fieldset named by raw ?fields= and ?include= values; None for the default payload."""
+        if fields is None and include is None:
+            return None
+        picked = _split(fields) if fields is not None else list(self.scalars)
+        unknown = sorted(set(picked) - set(self.selectable))
+        if unknown:
+            raise ValueError(f"Unknown fields {unknown}. Must be among: {list(self.selectable)}")
+        included = _split(include) if include is not None else []
+        unknown = sorted(set(included) - set(self.includes))
+        if unknown:
+            raise ValueError(f"Unknown include {unknown}. Must be among: {list(self.includes)}")
+        picked = set(picked) | {'id'}
+        keys = frozenset(picked) | {key for name in included for key in self.includes[name]}
+        return Fieldset(keys, f"fields={','.join(sorted(picked))};include={','.join(sorted(set(included)))}")
+
+    def _fields(self, fieldset: Fieldset) -> List[Field]:
+        return [field for field in self.spec + self.extra if field.key in fieldset.keys]
+
+    def serializer(self, fieldset: Optional[Fieldset]) -> Callable[[object], Dict]:
+        if fieldset is None:
+            return self.full
+        compiled = self._variants.get(fieldset.keys)
+        if compiled is None:
+            # Bounded by the number of key subsets; each is a small function
+            compiled = compile_serializer(f"{self.name}_sparse", self._fields(fieldset))
+            with self._lock:
+                self._variants.setdefault(fieldset.keys, compiled)
+        return compiled
+
+    def sources(self, fieldset: Optional[Fieldset]) -> Optional[FrozenSet[str]]:
+        """Model attributes the payload reads, so queries can load only those; None for all of them."""
+        if fieldset is None:
+            return None
+        return frozenset(field.source or field.key for field in self._fields(fieldset))
+
+
+subscription_fields = SparseSerializer('subscription', [
+    Field('id'),
+    Field('user_id'),
+    Field('plan_id'),
+    Field('status'),
+    Field('start_date', DATETIME),
+    Field('end_date', DATETIME),
+    Field('created_at', DATETIME),
+    Field('plan', plan_payload, source='plan_id'),
+], includes={'plan': ('plan',)})
+serialize_subscription = subscription_fields.full
+
+# Rows of user_subscription_stats, the per-user index of the active subscription
+serialize_current_subscription = compile_serializer('current_subscription', [
+    Field('subscription_id', source='active_subscription_id'),
+    Field('plan_id', source='active_plan_id'),
+    Field('end_date', DATETIME, source='active_end_date'),
+    Field('plan', plan_payload, source='active_plan_id'),
+])
+
+subscription_history_fields = SparseSerializer('subscription_history', [
+    Field('id'),
+    Field('subscription_id'),
+    Field('user_id'),
+    Field('old_plan', plan_payload, source='old_plan_id'),
+    Field('new_plan', plan_payload, source='new_plan_id'),
+    Field('old_status'),
+    Field('new_status'),
+    Field('change_type'),
+    Field('changed_at', DATETIME),
+    Field('subscription', lambda subscription: {
+        'id': subscription.id,
+        'plan': plan_payload(subscription.plan_id)
+    }, source='subscription'),
+], includes={'plan': ('old_plan', 'new_plan'), 'subscription': ('subscription',)},
+    extra=[Field('old_plan_id'), Field('new_plan_id')])
+serialize_subscription_history = subscription_history_fields.full
+
+serialize_user_summary = compile_serializer('user_summary', [
+    Field('id'),
+    Field('email'),
+    Field('created_at', DATETIME),
+])
+
+
+def serialize_many(serializer: Callable[[object], Dict], objs: Iterable) -> List[Dict]:
+    return [serializer(obj) for obj in objs]
+
+
+MAX_BATCH_IDS = 100
+
+
+def parse_ids(raw: str, limit: int = MAX_BATCH_IDS) -> List[int]:
+    """Ids from a comma-separated ?ids= value, in request order."""
+    try:
+        ids = [int(part) for part in _split(raw)]
+    except ValueError:
+        raise ValueError("ids must be comma-separated integers")
+    if not ids:
+        raise ValueError("ids must name at least one id")
+    if len(ids) > limit:
+        raise ValueError(f"At most {limit} ids per request")
+    return ids
+
+
+def serialize_batch(serializer: Callable[[object], Dict], ids: List[int], found: Dict[int, object]) -> Dict:
+    """One item per requested id, in request order; ids not in `found` get a not-found marker."""
+    return {
+        'items': [serializer(found[i]) if i in found else {'id': i, 'error': 'not_found'} for i in ids],
+        'not_found': [i for i in ids if i not in found]
+    }
@@ -4,6 +4,13 @@ from app.schemas.plan_schema import PlanResponseSchema
 class SubscriptionCreateSchema(Schema):
     plan_id = fields.Int(required=True)
 
+class SubscriptionBulkItemSchema(Schema):
+    user_id = fields.Int(required=True)
+    plan_id = fields.Int(required=True)
+
+class SubscriptionBulkCreateSchema(Schema):
+    items = fields.List(fields.Nested(SubscriptionBulkItemSchema), required=True, validate=validate.Length(min=1))
+
 class SubscriptionResponseSchema(Schema):
     id = fields.Int(dump_only=True)
     user_id = fields.Int(dump_only=True)
@@ -0,0 +1,306 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import takewhile
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from app.models import DailyPlanStats, RollupWatermark, Subscription, SubscriptionHistory, SubscriptionHistoryArchive
+from app.core.database import db
+from app.core.replicas import read_replica
+from app.services.plan_catalog import plan_catalog
+from app.services.subscription_stats import BILLING_CHANGE_TYPES
+from app.services.unit_of_work import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'daily_plan_stats'
+COUNTERS = ('new_subscriptions', 'reactivations', 'renewals', 'upgrades', 'downgrades', 'cancellations',
+            'expirations', 'deactivations', 'active_delta', 'revenue')
+MAX_RANGE_DAYS = 366
+# MRR normalizes each plan's price to a 30-day month
+MRR_PERIOD_DAYS = 30
+
+_daily = DailyPlanStats.__table__
+
+
+class RollupConflictError(RuntimeError):
+    """Another aggregator advanced the watermark while this batch was being folded in."""
+
+
+@dataclass
+class RollupReport:
+    rows: int = 0
+    batches: int = 0
+    last_history_id: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class AnalyticsService:
+    """Folds subscription history into daily_plan_stats past a stored high-water mark.
+
+    Each batch reads the history rows after the watermark in id order, adds their
+    movements to the (day, plan) rollups and advances the watermark, all in one
+    transaction. Rows inserted less than `settle_seconds` ago are left for the
+    next run, so a transaction that took a lower id but commits late is not
+    skipped, as long as it commits within `settle_seconds` of its insert. Age is
+    measured on recorded_at, not changed_at: outbox drains insert rows long after
+    the change, and concurrent drainers can commit their id ranges out of order. Plan
+    changes are assumed to apply to active subscriptions, and revenue is priced at
+    the plans' current prices.
+    """
+
+    def __init__(self, batch_size: int = 5000, settle_seconds: float = 30.0):
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+
+    def _watermark(self) -> int:
+        last_id = db.session.execute(
+            select(RollupWatermark.last_history_id).where(RollupWatermark.name == ROLLUP_NAME)
+        ).scalar()
+        if last_id is None:
+            db.session.execute(insert(RollupWatermark).values(name=ROLLUP_NAME, last_history_id=0))
+            last_id = 0
+        return last_id
+
+    def _pending(self, after_id: int) -> List:
+        def fetch(history):
+            return db.session.execute(
+                select(
+                    history.id,
+                    history.changed_at,
+                    history.recorded_at,
+                    history.change_type,
+                    history.old_plan_id,
+                    history.new_plan_id,
+                    history.old_status,
+                    history.new_status,
+                    Subscription.plan_id.label('current_plan_id')
+                )
+                .outerjoin(Subscription, Subscription.id == history.subscription_id)
+                .where(history.id > after_id)
+                .order_by(history.id)
+                .limit(self.batch_size)
+            ).all()
+
+        # Archival normally trails the watermark by months; reading both keeps a fresh rebuild complete
+        rows = fetch(SubscriptionHistory) + fetch(SubscriptionHistoryArchive)
+        return sorted(rows, key=lambda row: row.id)[:self.batch_size]
+
+    @staticmethod
+    def _price(plan_id) -> float:
+        plan = plan_catalog.get(plan_id) if plan_id is not None else None
+        return plan.price if plan else 0.0
+
+    def _fold(self, rows) -> Dict[Tuple[date, int], Dict[str, float]]:
+        totals: Dict[Tuple[date, int], Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+        for row in rows:
+            day = row.changed_at.date()
+            kind = row.change_type
+            # Status-only rows carry no plan ids; the subscription's plan stands in
+            old_plan = row.old_plan_id or row.new_plan_id or row.current_plan_id
+            new_plan = row.new_plan_id or old_plan
+            was_active = row.old_status == 'active' if row.old_status is not None else kind != 'create'
+            is_active = row.new_status == 'active' if row.new_status is not None else True
+
+            def add(plan_id, **deltas):
+                if plan_id is None:
+                    return
+                bucket = totals[(day, plan_id)]
+                for counter, delta in deltas.items():
+                    bucket[counter] += delta
+
+            if was_active:
+                add(old_plan, active_delta=-1)
+            if is_active:
+                add(new_plan, active_delta=1)
+
+            if kind == 'create':
+                add(new_plan, new_subscriptions=1)
+            elif kind in ('upgrade', 'downgrade'):
+                add(new_plan, **{f"{kind}s": 1})
+            elif kind == 'expire':
+                add(old_plan, expirations=1)
+            elif kind == 'renew':
+                add(new_plan, renewals=1)
+            elif was_active and not is_active:
+                add(old_plan, **{'cancellations' if kind == 'cancel' else 'deactivations': 1})
+            elif is_active and not was_active:
+                add(new_plan, reactivations=1)
+
+            if kind in BILLING_CHANGE_TYPES:
+                add(new_plan, revenue=self._price(new_plan))
+        return totals
+
+    def _apply(self, totals: Dict[Tuple[date, int], Dict[str, float]]):
+        params = [
+            {'b_day': day, 'b_plan_id': plan_id, **{f"b_{counter}": value for counter, value in deltas.items()}}
+            for (day, plan_id), deltas in totals.items()
+        ]
+        result = db.session.execute(
+            update(_daily)
+            .where(_daily.c.day == bindparam('b_day'), _daily.c.plan_id == bindparam('b_plan_id'))
+            .values({counter: _daily.c[counter] + bindparam(f"b_{counter}") for counter in COUNTERS}),
+            params
+        )
+        if result.rowcount == len(params):
+            return
+
+        existing = set(db.session.execute(
+            select(_daily.c.day, _daily.c.plan_id).where(
+                _daily.c.day.in_({day for day, _ in totals}),
+                _daily.c.plan_id.in_({plan_id for _, plan_id in totals})
+            )
+        ).tuples())
+        missing = [
+            {'day': day, 'plan_id': plan_id, **deltas}
+            for (day, plan_id), deltas in totals.items() if (day, plan_id) not in existing
+        ]
+        if missing:
+            db.session.execute(insert(_daily), missing)
+
+    def refresh_batch(self, cutoff: datetime) -> Tuple[int, int]:
+        """Fold in one batch of settled history; returns (rows folded, new watermark)."""
+        with unit_of_work():
+            last_id = self._watermark()
+            rows = list(takewhile(lambda row: row.recorded_at <= cutoff, self._pending(last_id)))
+            if not rows:
+                return 0, last_id
+            self._apply(self._fold(rows))
+            advanced = db.session.execute(
+                update(RollupWatermark)
+                .where(RollupWatermark.name == ROLLUP_NAME, RollupWatermark.last_history_id == last_id)
+                .values(last_history_id=rows[-1].id, updated_at=datetime.utcnow())
+            )
+            if advanced.rowcount != 1:
+                raise RollupConflictError("Rollup watermark moved during refresh")
+        return len(rows), rows[-1].id
+
+    def refresh(self, now: Optional[datetime] = None, max_batches: Optional[int] = None) -> RollupReport:
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.settle_seconds)
+        report = RollupReport()
+        started = time.perf_counter()
+
+        while max_batches is None or report.batches < max_batches:
+            folded, report.last_history_id = self.refresh_batch(cutoff)
+            if not folded:
+                break
+            report.rows += folded
+            report.batches += 1
+
+        report.elapsed = time.perf_counter() - started
+        if report.rows:
+            logger.info(
+                "Folded %d history rows into daily rollups in %d batches (%.0f rows/sec)",
+                report.rows, report.batches, report.rows_per_second
+            )
+        return report
+
+    def rebuild(self, now: Optional[datetime] = None) -> RollupReport:
+        """Drop the rollups and watermark, then fold in all history (hot and archived) again."""
+        with unit_of_work():
+            db.session.execute(delete(_daily))
+            db.session.execute(delete(RollupWatermark).where(RollupWatermark.name == ROLLUP_NAME))
+        return self.refresh(now=now)
+
+    @staticmethod
+    def _mrr(plan, subscribers: int) -> float:
+        # Plans without a positive duration (legacy or hand-inserted rows) have no monthly rate
+        if plan is None or (plan.duration_days or 0) <= 0:
+            return 0.0
+        return round(subscribers * plan.price * MRR_PERIOD_DAYS / plan.duration_days, 2)
+
+    @read_replica
+    def daily(self, start: date, end: date, plan_id: Optional[int] = None) -> Dict:
+        """Per-day totals and per-plan breakdown between start and end inclusive."""
+        if end < start:
+            raise ValueError("end must not be before start")
+        if (end - start).days >= MAX_RANGE_DAYS:
+            raise ValueError(f"At most {MAX_RANGE_DAYS} days per request")
+
+        plan_filter = (_daily.c.plan_id == plan_id,) if plan_id is not None else ()
+        active = defaultdict(int, db.session.execute(
+            select(_daily.c.plan_id, func.sum(_daily.c.active_delta))
+            .where(_daily.c.day < start, *plan_filter)
+            .group_by(_daily.c.plan_id)
+        ).tuples().all())
+        by_day = defaultdict(dict)
+        for row in db.session.execute(
+            select(_daily).where(_daily.c.day.between(start, end), *plan_filter)
+            .order_by(_daily.c.day, _daily.c.plan_id)
+        ):
+            by_day[row.day][row.plan_id] = row
+        watermark = db.session.execute(
+            select(RollupWatermark.last_history_id, RollupWatermark.updated_at)
+            .where(RollupWatermark.name == ROLLUP_NAME)
+        ).first()
+
+        days = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            totals = dict.fromkeys(COUNTERS, 0)
+            totals.pop('active_delta')
+            plans = []
+            for pid in sorted(set(active) | set(by_day[day])):
+                row = by_day[day].get(pid)
+                active[pid] += row.active_delta if row is not None else 0
+                if not active[pid] and row is None:
+                    continue
+                entry = {
+                    'plan_id': pid,
+                    'active_subscribers': active[pid],
+                    'mrr': self._mrr(plan_catalog.get(pid), active[pid])
+                }
+                for counter in totals:
+                    entry[counter] = getattr(row, counter) if row is not None else 0
+                    totals[counter] += entry[counter]
+                plans.append(entry)
+            days.append({
+                'day': day.isoformat(),
+                'active_subscribers': sum(entry['active_subscribers'] for entry in plans),
+                'mrr': round(sum(entry['mrr'] for entry in plans), 2),
+                **totals,
+                'revenue': round(totals['revenue'], 2),
+                'plans': plans
+            })
+
+        return {
+            'days': days,
+            'last_history_id': watermark.last_history_id if watermark else 0,
+            'refreshed_at': watermark.updated_at.isoformat() if watermark and watermark.updated_at else None
+        }
+
+
+analytics_service = AnalyticsService()
+
+
+def start_analytics_worker(app, interval: float) -> threading.Thread:
+    """Refresh the rollups every `interval` seconds on a daemon thread."""
+    service = AnalyticsService(
+        batch_size=app.config['ANALYTICS_BATCH_SIZE'],
+        settle_seconds=app.config['ANALYTICS_SETTLE_SECONDS']
+    )
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    service.refresh()
+                except RollupConflictError:
+                    logger.info("Skipped rollup refresh: another aggregator is running")
+                except Exception:
+                    logger.exception("Analytics rollup refresh failed")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=run, name='analytics-rollup', daemon=True)
+    thread.start()
+    return thread
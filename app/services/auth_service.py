@@ -1,20 +1,43 @@
-from typing import Tuple, Optional
-import bcrypt
+from typing import Tuple, Optional, Union
 from flask_jwt_extended import create_access_token
 from app.repositories.user_repository import UserRepository
 from app.models.user import User
 from app.core.database import db
+from app.core.passwords import password_hasher
+from app.core.security import token_versions, ADMIN_CLAIM, TOKEN_VERSION_CLAIM
 
 
 class AuthService:
     def __init__(self):
         self.user_repository = UserRepository()
 
-    def _hash_password(self, password: str) -> bytes:
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    def _hash_password(self, password: str) -> str:
+        return password_hasher.hash(password)
 
-    def _check_password(self, password: str, hashed: bytes) -> bool:
-        return bcrypt.checkpw(password.encode('utf-8'), hashed)
+    def _check_password(self, password: str, hashed: Union[str, bytes]) -> bool:
+        return password_hasher.verify(password, hashed)
+
+    def _rehash_if_needed(self, user: User, password: str):
+        # Upgrade legacy formats and stale bcrypt costs while the plaintext is at hand
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = self._hash_password(password)
+            self.user_repository.update(user)
+
+    def create_token(self, user: User) -> str:
+        # Role and revocation state ride in the token so authorization needs no user lookup
+        return create_access_token(
+            identity=str(user.id),
+            additional_claims={
+                ADMIN_CLAIM: bool(user.is_admin),
+                TOKEN_VERSION_CLAIM: token_versions.current(user.id)
+            }
+        )
+
+    def revoke_tokens(self, user_id):
+        """Invalidate every access token issued to the user so far."""
+        token_versions.bump(user_id)
+        db.session.commit()
+        token_versions.invalidate()
 
     def register_user(self, email: str, password: str) -> Tuple[User, str]:
         # Check if user already exists
@@ -23,7 +46,7 @@ class AuthService:
 
         password_hash = self._hash_password(password)
         user = self.user_repository.create(email, password_hash)
-        access_token = create_access_token(identity=str(user.id))
+        access_token = self.create_token(user)
         
         return user, access_token
 
@@ -33,13 +56,15 @@ class AuthService:
         if not user or not self._check_password(password, user.password_hash):
             return None, None
 
-        access_token = create_access_token(identity=str(user.id))
+        self._rehash_if_needed(user, password)
+        access_token = self.create_token(user)
         return user, access_token
 
     def authenticate_user(self, email, password):
         user = self.user_repository.get_by_email(email)
         if not user or not self._check_password(password, user.password_hash):
             raise ValueError("Invalid email or password")
+        self._rehash_if_needed(user, password)
         return user
 
     def get_user_by_id(self, user_id):
@@ -53,9 +78,16 @@ class AuthService:
         if 'password' in kwargs:
             kwargs['password_hash'] = self._hash_password(kwargs.pop('password'))
 
+        # Tokens carry the admin claim, so a role change must retire them
+        role_changed = 'is_admin' in kwargs and bool(kwargs['is_admin']) != bool(user.is_admin)
+
         for key, value in kwargs.items():
             if hasattr(user, key):
                 setattr(user, key, value)
 
+        if role_changed:
+            token_versions.bump(user.id)
         db.session.commit()
+        if role_changed:
+            token_versions.invalidate()
         return user 
\ No newline at end of file
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, update
+from app.models import Subscription
+from app.models.subscription import SubscriptionStatus
+from app.core.database import db
+from app.core.response_cache import response_cache, user_tag
+from app.services.history_writer import history_writer
+from app.services.subscription_stats import subscription_stats
+from app.services.unit_of_work import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExpiryReport:
+    expired: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.expired / self.elapsed if self.elapsed else 0.0
+
+
+class ExpiryService:
+    """Moves active subscriptions past their end_date to expired in bounded chunks."""
+
+    def __init__(self, batch_size: int = 1000, pause: float = 0.0):
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def _due_ids(self, now: datetime):
+        # start_date <= end_date <= now always holds for lapsed rows; filtering on
+        # both lets the lookup range-scan idx_subscription_status_dates.
+        return (
+            select(Subscription.id)
+            .where(
+                Subscription.status == SubscriptionStatus.ACTIVE.value,
+                Subscription.start_date <= now,
+                Subscription.end_date <= now
+            )
+            .limit(self.batch_size)
+            .scalar_subquery()
+        )
+
+    def expire_batch(self, now: datetime) -> int:
+        with unit_of_work():
+            rows = db.session.execute(
+                update(Subscription)
+                .where(
+                    Subscription.id.in_(self._due_ids(now)),
+                    Subscription.status == SubscriptionStatus.ACTIVE.value
+                )
+                .values(status=SubscriptionStatus.EXPIRED.value, version=Subscription.version + 1)
+                .returning(Subscription.id, Subscription.user_id, Subscription.plan_id),
+                execution_options={'synchronize_session': False}
+            ).all()
+
+            if rows:
+                history_writer.record([
+                    {
+                        'subscription_id': row.id,
+                        'user_id': row.user_id,
+                        'old_plan_id': row.plan_id,
+                        'new_plan_id': row.plan_id,
+                        'old_status': SubscriptionStatus.ACTIVE.value,
+                        'new_status': SubscriptionStatus.EXPIRED.value,
+                        'change_type': 'expire',
+                        'changed_at': now
+                    }
+                    for row in rows
+                ])
+                subscription_stats.record_deactivated([row.id for row in rows])
+                response_cache.invalidate_on_commit(*{user_tag(row.user_id) for row in rows})
+        return len(rows)
+
+    def expire_due_subscriptions(self, now: Optional[datetime] = None, max_batches: Optional[int] = None) -> ExpiryReport:
+        now = now or datetime.utcnow()
+        report = ExpiryReport()
+        started = time.perf_counter()
+
+        while max_batches is None or report.batches < max_batches:
+            expired = self.expire_batch(now)
+            if not expired:
+                break
+            report.expired += expired
+            report.batches += 1
+            if self.pause:
+                # Give API writers a window on the lock between chunks
+                time.sleep(self.pause)
+
+        report.elapsed = time.perf_counter() - started
+        if report.expired:
+            logger.info(
+                "Expired %d subscriptions in %d batches (%.0f rows/sec)",
+                report.expired, report.batches, report.rows_per_second
+            )
+        return report
+
+
+def start_expiry_worker(app, interval: float) -> threading.Thread:
+    """Run the expiry sweep every `interval` seconds on a daemon thread."""
+    service = ExpiryService(
+        batch_size=app.config['EXPIRY_BATCH_SIZE'],
+        pause=app.config['EXPIRY_BATCH_PAUSE']
+    )
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    service.expire_due_subscriptions()
+                except Exception:
+                    logger.exception("Subscription expiry sweep failed")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=run, name='subscription-expiry', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,80 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, insert, select
+from app.models import SubscriptionHistory, SubscriptionHistoryArchive
+from app.core.database import db
+from app.services.unit_of_work import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = ('id', 'subscription_id', 'user_id', 'old_plan_id', 'new_plan_id',
+                    'old_status', 'new_status', 'change_type', 'changed_at', 'recorded_at')
+
+
+@dataclass
+class ArchiveReport:
+    archived: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.archived / self.elapsed if self.elapsed else 0.0
+
+
+class HistoryArchiveService:
+    """Moves subscription_history rows older than the horizon into subscription_history_archive.
+
+    Each batch copies and deletes up to `batch_size` of the oldest rows in one short
+    transaction, so writers recording new history only wait for a single batch.
+    """
+
+    def __init__(self, batch_size: int = 1000, pause: float = 0.0):
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def archive_batch(self, cutoff: datetime) -> int:
+        with unit_of_work():
+            ids = db.session.execute(
+                select(SubscriptionHistory.id)
+                .where(SubscriptionHistory.changed_at < cutoff)
+                .order_by(SubscriptionHistory.changed_at, SubscriptionHistory.id)
+                .limit(self.batch_size)
+            ).scalars().all()
+            if ids:
+                db.session.execute(insert(SubscriptionHistoryArchive).from_select(
+                    ARCHIVED_COLUMNS,
+                    select(*(getattr(SubscriptionHistory, column) for column in ARCHIVED_COLUMNS))
+                    .where(SubscriptionHistory.id.in_(ids))
+                ))
+                db.session.execute(
+                    delete(SubscriptionHistory).where(SubscriptionHistory.id.in_(ids)),
+                    execution_options={'synchronize_session': False}
+                )
+        return len(ids)
+
+    def archive_older_than(self, days: int, now: Optional[datetime] = None,
+                           max_batches: Optional[int] = None) -> ArchiveReport:
+        cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+        report = ArchiveReport()
+        started = time.perf_counter()
+
+        while max_batches is None or report.batches < max_batches:
+            archived = self.archive_batch(cutoff)
+            if not archived:
+                break
+            report.archived += archived
+            report.batches += 1
+            if self.pause:
+                time.sleep(self.pause)
+
+        report.elapsed = time.perf_counter() - started
+        if report.archived:
+            logger.info(
+                "Archived %d history rows older than %s in %d batches (%.0f rows/sec)",
+                report.archived, cutoff.isoformat(), report.batches, report.rows_per_second
+            )
+        return report
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+from app.models import HistoryOutbox, SubscriptionHistory
+from app.core.database import db
+from app.core.response_cache import response_cache, user_tag
+from app.services.unit_of_work import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+SYNC = 'sync'
+OUTBOX = 'outbox'
+EVENT_COLUMNS = ('subscription_id', 'user_id', 'old_plan_id', 'new_plan_id',
+                 'old_status', 'new_status', 'change_type', 'changed_at')
+
+
+@dataclass
+class DrainReport:
+    drained: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.drained / self.elapsed if self.elapsed else 0.0
+
+
+class HistoryWriter:
+    """Records subscription history events, directly or through the outbox.
+
+    In 'outbox' mode (HISTORY_WRITE_MODE) mutations append events to
+    subscription_history_outbox inside their own transaction, and drain() later
+    moves them into subscription_history with multi-row inserts. An event is
+    therefore never lost or recorded for a rolled-back change, but history reads
+    trail writes by the drain interval. 'sync' mode inserts into
+    subscription_history directly, for tests and single-process tools.
+
+    Each drain batch claims its events with DELETE ... RETURNING, so concurrent
+    drainers never copy an event twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def record(self, events: Iterable[Dict]):
+        """Append history events in the caller's transaction; missing changed_at defaults to now."""
+        now = datetime.utcnow()
+        rows = [{column: event.get(column) for column in EVENT_COLUMNS} for event in events]
+        if not rows:
+            return
+        for row in rows:
+            row['changed_at'] = row['changed_at'] or now
+        target = HistoryOutbox if current_app.config['HISTORY_WRITE_MODE'] == OUTBOX else SubscriptionHistory
+        db.session.execute(insert(target), rows)
+
+    def drain_batch(self, batch_size: int) -> int:
+        with unit_of_work():
+            claimed = db.session.execute(
+                delete(HistoryOutbox)
+                .where(HistoryOutbox.id.in_(
+                    select(HistoryOutbox.id).order_by(HistoryOutbox.id).limit(batch_size).scalar_subquery()
+                ))
+                .returning(HistoryOutbox.id, *(getattr(HistoryOutbox, column) for column in EVENT_COLUMNS)),
+                execution_options={'synchronize_session': False}
+            ).all()
+            if claimed:
+                # RETURNING order is unspecified; history ids should follow event order
+                db.session.execute(insert(SubscriptionHistory), [
+                    {column: getattr(row, column) for column in EVENT_COLUMNS}
+                    for row in sorted(claimed, key=lambda row: row.id)
+                ])
+                # The mutations invalidated their users' cached history before the rows landed here
+                response_cache.invalidate_on_commit(*{user_tag(row.user_id) for row in claimed})
+        if claimed:
+            self._note_drained(len(claimed))
+        return len(claimed)
+
+    def drain(self, batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> DrainReport:
+        batch_size = batch_size or current_app.config['HISTORY_OUTBOX_BATCH_SIZE']
+        report = DrainReport()
+        started = time.perf_counter()
+        while max_batches is None or report.batches < max_batches:
+            drained = self.drain_batch(batch_size)
+            if not drained:
+                break
+            report.drained += drained
+            report.batches += 1
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _counters(self) -> Dict:
+        counters = current_app.extensions.get('history_outbox')
+        if counters is None:
+            with self._lock:
+                counters = current_app.extensions.setdefault(
+                    'history_outbox', {'drained': 0, 'batches': 0, 'last_drain_at': None}
+                )
+        return counters
+
+    def _note_drained(self, count: int):
+        counters = self._counters()
+        with self._lock:
+            counters['drained'] += count
+            counters['batches'] += 1
+            counters['last_drain_at'] = datetime.utcnow()
+
+    def lag(self) -> Dict:
+        """Pending events, age of the oldest one, and this process's drain counters."""
+        pending, oldest = db.session.execute(
+            select(func.count(HistoryOutbox.id), func.min(HistoryOutbox.changed_at))
+        ).one()
+        counters = self._counters()
+        with self._lock:
+            last_drain_at = counters['last_drain_at']
+            drained, batches = counters['drained'], counters['batches']
+        return {
+            'mode': current_app.config['HISTORY_WRITE_MODE'],
+            'pending': pending,
+            'oldest_pending_at': oldest.isoformat() if oldest else None,
+            'lag_seconds': round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0,
+            'drained': drained,
+            'batches': batches,
+            'last_drain_at': last_drain_at.isoformat() if last_drain_at else None
+        }
+
+
+history_writer = HistoryWriter()
+
+
+def start_history_outbox_worker(app, interval: float) -> threading.Thread:
+    """Drain the outbox every `interval` seconds on a daemon thread."""
+    warn_after = app.config['HISTORY_OUTBOX_LAG_WARN_SECONDS']
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    history_writer.drain()
+                    if warn_after:
+                        lag = history_writer.lag()
+                        if lag['lag_seconds'] > warn_after:
+                            logger.warning("History outbox is %.1fs behind (%d events pending)",
+                                           lag['lag_seconds'], lag['pending'])
+                except Exception:
+                    logger.exception("History outbox drain failed")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=run, name='history-outbox', daemon=True)
+    thread.start()
+    return thread
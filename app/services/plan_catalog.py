@@ -0,0 +1,112 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+from flask import current_app
+from sqlalchemy import select
+from app.models import SubscriptionPlan, CatalogVersion
+from app.core.database import db, increment_counter
+from app.core.replicas import primary
+
+CATALOG_NAME = 'plans'
+
+
+@dataclass(frozen=True)
+class PlanSnapshot:
+    id: int
+    name: str
+    price: float
+    duration_days: int
+    features: Mapping
+    created_at: Optional[datetime]
+    version: int
+
+    @classmethod
+    def from_model(cls, plan: SubscriptionPlan) -> 'PlanSnapshot':
+        return cls(
+            id=plan.id,
+            name=plan.name,
+            price=plan.price,
+            duration_days=plan.duration_days,
+            features=MappingProxyType(dict(plan.features or {})),
+            created_at=plan.created_at,
+            version=plan.version
+        )
+
+
+class _CatalogState(NamedTuple):
+    version: int
+    by_id: Dict[int, PlanSnapshot]
+    ordered: Tuple[PlanSnapshot, ...]
+    checked_at: float
+
+
+class PlanCatalog:
+    """Process-local cache of plan snapshots, reloaded when the catalog version in the DB moves.
+
+    The version row is only consulted once per PLAN_CATALOG_CHECK_INTERVAL seconds, so
+    lookups in between never touch the database. Writes in this process invalidate
+    immediately; other processes pick them up on their next version check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _state(self) -> _CatalogState:
+        state = current_app.extensions.get('plan_catalog')
+        interval = current_app.config['PLAN_CATALOG_CHECK_INTERVAL']
+        if state is not None and time.monotonic() - state.checked_at < interval:
+            return state
+
+        with self._lock:
+            state = current_app.extensions.get('plan_catalog')
+            now = time.monotonic()
+            if state is not None and now - state.checked_at < interval:
+                return state
+
+            # Always from the primary: a lagging replica could pair a new version with old rows
+            with primary():
+                version = self.current_version()
+                if state is not None and state.version == version:
+                    state = state._replace(checked_at=now)
+                else:
+                    # Version is read before the plans, so a concurrent write can only make
+                    # the snapshot newer than its version and trigger one extra reload.
+                    plans = tuple(
+                        PlanSnapshot.from_model(plan)
+                        for plan in SubscriptionPlan.query.order_by(SubscriptionPlan.id).all()
+                    )
+                    state = _CatalogState(version, {plan.id: plan for plan in plans}, plans, now)
+            current_app.extensions['plan_catalog'] = state
+            return state
+
+    def current_version(self) -> int:
+        return db.session.execute(
+            select(CatalogVersion.version).where(CatalogVersion.name == CATALOG_NAME)
+        ).scalar() or 0
+
+    def versioned(self) -> Tuple[int, Tuple[PlanSnapshot, ...]]:
+        """All plans together with the catalog version they were loaded at."""
+        state = self._state()
+        return state.version, state.ordered
+
+    def all(self) -> Tuple[PlanSnapshot, ...]:
+        return self._state().ordered
+
+    def get(self, plan_id) -> Optional[PlanSnapshot]:
+        try:
+            return self._state().by_id.get(int(plan_id))
+        except (TypeError, ValueError):
+            return None
+
+    def bump(self):
+        """Increment the catalog version inside the caller's transaction."""
+        increment_counter(CatalogVersion, 'version', name=CATALOG_NAME)
+
+    def invalidate(self):
+        current_app.extensions.pop('plan_catalog', None)
+
+
+plan_catalog = PlanCatalog()
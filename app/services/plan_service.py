@@ -1,9 +1,16 @@
+from sqlalchemy.orm.exc import StaleDataError
 from app.models import SubscriptionPlan
 from app.core.database import db
+from app.core.etags import VersionConflictError, matches_current, plan_etag
+from app.core.response_cache import PLANS_TAG, response_cache
+from app.services.plan_catalog import plan_catalog
 
 class PlanService:
     def get_all_plans(self):
-        return SubscriptionPlan.query.all()
+        return plan_catalog.all()
+
+    def get_versioned_plans(self):
+        return plan_catalog.versioned()
 
     def create_plan(self, name, price, duration_days, features=None):
         plan = SubscriptionPlan(
@@ -13,28 +20,56 @@ class PlanService:
             features=features or {}
         )
         db.session.add(plan)
+        plan_catalog.bump()
+        response_cache.invalidate_on_commit(PLANS_TAG)
         db.session.commit()
+        plan_catalog.invalidate()
         return plan
 
     def get_plan_by_id(self, plan_id):
+        return plan_catalog.get(plan_id)
+
+    def get_plans_by_ids(self, plan_ids):
+        """Catalog snapshots for the known ids among `plan_ids`, keyed by id."""
+        found = {}
+        for plan_id in plan_ids:
+            plan = plan_catalog.get(plan_id)
+            if plan is not None:
+                found[plan.id] = plan
+        return found
+
+    def _get_plan_model(self, plan_id):
         return SubscriptionPlan.query.get(int(plan_id))
 
-    def update_plan(self, plan_id, **kwargs):
-        plan = self.get_plan_by_id(plan_id)
+    def update_plan(self, plan_id, expected_etags=None, **kwargs):
+        plan = self._get_plan_model(plan_id)
         if not plan:
             raise ValueError("Plan not found")
+        if not matches_current(plan_etag(plan), expected_etags):
+            raise VersionConflictError("Plan has been modified")
         
         for key, value in kwargs.items():
-            if hasattr(plan, key):
+            if hasattr(plan, key) and key not in ('id', 'version'):
                 setattr(plan, key, value)
         
-        db.session.commit()
+        plan_catalog.bump()
+        response_cache.invalidate_on_commit(PLANS_TAG)
+        try:
+            # The UPDATE is guarded by the loaded version, so a concurrent change fails here
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            raise VersionConflictError("Plan has been modified")
+        plan_catalog.invalidate()
         return plan
 
     def delete_plan(self, plan_id):
-        plan = self.get_plan_by_id(plan_id)
+        plan = self._get_plan_model(plan_id)
         if not plan:
             raise ValueError("Plan not found")
         
         db.session.delete(plan)
-        db.session.commit() 
\ No newline at end of file
+        plan_catalog.bump()
+        response_cache.invalidate_on_commit(PLANS_TAG)
+        db.session.commit()
+        plan_catalog.invalidate()
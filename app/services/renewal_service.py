@@ -0,0 +1,260 @@
+import logging
+import multiprocessing
+import queue
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import case, or_, select, update
+from app.models import Subscription
+from app.models.subscription import SubscriptionStatus
+from app.core.database import db
+from app.core.response_cache import response_cache, user_tag
+from app.services.history_writer import history_writer
+from app.services.plan_catalog import plan_catalog
+from app.services.subscription_stats import subscription_stats
+from app.services.unit_of_work import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RenewalReport:
+    renewed: int = 0
+    batches: int = 0
+    # Candidates another worker claimed between our read and our claim
+    conflicts: int = 0
+    # Claimed rows whose lease lapsed, or that stopped being active, before the renewal committed
+    lost_leases: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.renewed / self.elapsed if self.elapsed else 0.0
+
+
+class RenewalService:
+    """Extends active subscriptions that end within the renewal window by their plan's duration.
+
+    Workers share the due rows through leases. A worker reads a batch of
+    unleased candidates through idx_subscription_status_dates, then claims them
+    with a conditional UPDATE that only takes rows whose lease is free or lapsed,
+    and commits the claim. A second transaction renews only the rows that still
+    carry its token, records 'renew' history, charges the renewal in the user
+    summary and clears the lease. Any number of processes can run this against
+    one database without renewing a row twice. A lapsed subscription is renewed
+    from now rather than from its old end date.
+
+    Rows that would still be due after this pass stay leased until the run ends,
+    so no worker claims them again in the same run: renewals whose new end date
+    is still inside the window (plans shorter than the window) and rows whose
+    plan is missing from the catalog. Their leases run to the window end at the
+    latest, in case the worker dies before releasing them.
+    """
+
+    def __init__(self, batch_size: int = 200, lease_seconds: float = 60.0):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.token = uuid.uuid4().hex
+
+    def _lease_free(self, now: datetime):
+        return or_(Subscription.lease_expires_at.is_(None), Subscription.lease_expires_at < now)
+
+    def claim_batch(self, window_end: datetime) -> tuple:
+        """Lease up to batch_size due subscriptions; returns (claimed rows, conflicts)."""
+        now = datetime.utcnow()
+        due = (
+            Subscription.status == SubscriptionStatus.ACTIVE.value,
+            # start_date <= end_date, so both bounds range-scan the status index
+            Subscription.start_date <= window_end,
+            Subscription.end_date <= window_end,
+            self._lease_free(now)
+        )
+        with unit_of_work():
+            candidates = db.session.execute(
+                select(Subscription.id).where(*due).limit(self.batch_size)
+                # Postgres hands concurrent workers disjoint candidates; SQLite ignores this
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not candidates:
+                return [], 0
+            # Re-check the whole condition: another worker may have renewed and
+            # released a candidate since it was read
+            claimed = db.session.execute(
+                update(Subscription)
+                .where(Subscription.id.in_(candidates), *due)
+                .values(lease_token=self.token, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+                .returning(Subscription.id, Subscription.user_id, Subscription.plan_id, Subscription.end_date),
+                execution_options={'synchronize_session': False}
+            ).all()
+        return claimed, len(candidates) - len(claimed)
+
+    def renew_claimed(self, claimed, window_end: datetime) -> tuple:
+        """Renew the claimed rows still leased to us.
+
+        Returns (renewed count, unpriced ids, still-due ids); both id lists stay
+        leased to us until the run releases them.
+        """
+        now = datetime.utcnow()
+        new_end_dates = {}
+        for row in claimed:
+            plan = plan_catalog.get(row.plan_id)
+            if plan is not None:
+                new_end_dates[row.id] = max(row.end_date, now) + timedelta(days=plan.duration_days)
+        hold_until = max(window_end, now + timedelta(seconds=self.lease_seconds))
+        # Rows without a plan in the catalog wait for a later run
+        unpriced = [row.id for row in claimed if row.id not in new_end_dates]
+        # Renewals that land inside the window again must not be claimed twice in this run
+        still_due = [row_id for row_id, end_date in new_end_dates.items() if end_date <= window_end]
+        keep_lease = Subscription.id.in_(still_due)
+
+        with unit_of_work():
+            renewed = db.session.execute(
+                update(Subscription)
+                .where(
+                    Subscription.id.in_(list(new_end_dates)),
+                    Subscription.lease_token == self.token,
+                    Subscription.status == SubscriptionStatus.ACTIVE.value
+                )
+                .values(
+                    end_date=case(new_end_dates, value=Subscription.id),
+                    version=Subscription.version + 1,
+                    lease_token=case((keep_lease, self.token), else_=None),
+                    lease_expires_at=case((keep_lease, hold_until), else_=None)
+                )
+                .returning(Subscription.id, Subscription.user_id, Subscription.plan_id),
+                execution_options={'synchronize_session': False}
+            ).all() if new_end_dates else []
+            if unpriced:
+                db.session.execute(
+                    update(Subscription)
+                    .where(Subscription.id.in_(unpriced), Subscription.lease_token == self.token)
+                    .values(lease_expires_at=hold_until),
+                    execution_options={'synchronize_session': False}
+                )
+            if renewed:
+                history_writer.record([
+                    {
+                        'subscription_id': row.id,
+                        'user_id': row.user_id,
+                        'old_plan_id': row.plan_id,
+                        'new_plan_id': row.plan_id,
+                        'old_status': SubscriptionStatus.ACTIVE.value,
+                        'new_status': SubscriptionStatus.ACTIVE.value,
+                        'change_type': 'renew',
+                        'changed_at': now
+                    }
+                    for row in renewed
+                ])
+                subscription_stats.record_renewed(
+                    {
+                        'user_id': row.user_id,
+                        'subscription_id': row.id,
+                        'end_date': new_end_dates[row.id],
+                        'price': plan_catalog.get(row.plan_id).price
+                    }
+                    for row in renewed
+                )
+                response_cache.invalidate_on_commit(*{user_tag(row.user_id) for row in renewed})
+        return len(renewed), unpriced, still_due
+
+    def release(self, ids):
+        """Clear our leases on `ids`, in batches."""
+        ids = list(ids)
+        for i in range(0, len(ids), self.batch_size):
+            with unit_of_work():
+                db.session.execute(
+                    update(Subscription)
+                    .where(Subscription.id.in_(ids[i:i + self.batch_size]), Subscription.lease_token == self.token)
+                    .values(lease_token=None, lease_expires_at=None),
+                    execution_options={'synchronize_session': False}
+                )
+
+    def renew_due(self, window: timedelta, now: Optional[datetime] = None,
+                  max_batches: Optional[int] = None) -> RenewalReport:
+        window_end = (now or datetime.utcnow()) + window
+        report = RenewalReport()
+        started = time.perf_counter()
+
+        held = set()
+        try:
+            while max_batches is None or report.batches < max_batches:
+                claimed, conflicts = self.claim_batch(window_end)
+                report.conflicts += conflicts
+                if not claimed:
+                    if conflicts:
+                        # Every candidate went to another worker; read a fresh batch
+                        continue
+                    break
+                renewed, unpriced, still_due = self.renew_claimed(claimed, window_end)
+                held.update(unpriced, still_due)
+                report.renewed += renewed
+                # Unpriced rows were kept back on purpose, not lost
+                report.lost_leases += len(claimed) - renewed - len(unpriced)
+                report.batches += 1
+        finally:
+            self.release(held)
+
+        report.elapsed = time.perf_counter() - started
+        if report.renewed:
+            logger.info(
+                "Renewed %d subscriptions in %d batches (%.0f rows/sec, %d lease conflicts)",
+                report.renewed, report.batches, report.rows_per_second, report.conflicts
+            )
+        return report
+
+
+def _renewal_process(index: int, config_name: str, options: Dict, results):
+    # Always report back, or the parent waits on the queue for a report that never comes
+    try:
+        from app import create_app
+        app = create_app(config_name)
+        with app.app_context():
+            try:
+                service = RenewalService(batch_size=options['batch_size'], lease_seconds=options['lease_seconds'])
+                report = service.renew_due(options['window'], max_batches=options['max_batches'])
+            finally:
+                db.session.remove()
+        results.put(dict(asdict(report), worker=index))
+    except Exception as err:
+        logger.exception("Renewal worker %d failed", index)
+        results.put({'worker': index, 'error': f"{type(err).__name__}: {err}"})
+
+
+def renew_in_parallel(config_name: str, workers: int, window: timedelta, batch_size: int,
+                      lease_seconds: float, max_batches: Optional[int] = None,
+                      poll_seconds: float = 1.0) -> List[Dict]:
+    """Run renew_due in `workers` fresh processes against the same database.
+
+    Returns one dict per worker, in worker order: a RenewalReport as a dict, or
+    {'worker', 'error'} for a worker that raised or died without reporting.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    options = {'window': window, 'batch_size': batch_size, 'lease_seconds': lease_seconds, 'max_batches': max_batches}
+    processes = [
+        context.Process(target=_renewal_process, args=(index, config_name, options, results), name=f"renewal-{index}")
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    reports: Dict[int, Dict] = {}
+    while len(reports) < workers:
+        exited = [index for index, process in enumerate(processes) if process.exitcode is not None]
+        try:
+            report = results.get(timeout=poll_seconds)
+        except queue.Empty:
+            # A worker flushes its report before exiting, so one that had already
+            # exited before a whole empty poll died without reporting
+            for index in exited:
+                if index not in reports:
+                    reports[index] = {
+                        'worker': index, 'error': f"exited with code {processes[index].exitcode} without a report"
+                    }
+            continue
+        reports[report['worker']] = report
+    for process in processes:
+        process.join()
+    return [reports[index] for index in range(workers)]
@@ -1,113 +1,260 @@
+import base64
+import binascii
+import logging
 from datetime import datetime, timedelta
-from app.models import Subscription, SubscriptionPlan, User, SubscriptionHistory
+from app.models import Subscription, SubscriptionPlan, User, SubscriptionHistory, SubscriptionHistoryArchive
+from app.models.subscription import ONE_ACTIVE_PER_USER_INDEX
 from app.core.database import db
-from sqlalchemy import desc, and_
-from sqlalchemy.orm import joinedload, contains_eager
-from typing import Dict, List
+from app.core.replicas import read_replica
+from app.core.etags import VersionConflictError, matches_current, subscription_etag
+from app.core.response_cache import response_cache, user_tag
+from app.services.history_writer import history_writer
+from app.services.plan_catalog import plan_catalog
+from app.services.subscription_stats import subscription_stats
+from app.services.unit_of_work import unit_of_work
+from sqlalchemy import desc, and_, or_, insert, select
+from sqlalchemy.orm import contains_eager, lazyload, load_only
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+from heapq import merge
 from itertools import groupby
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+BULK_CHUNK_SIZE = 1000
+MAX_BULK_ITEMS = 50000
+EXPORT_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+# History payloads take plans from the catalog by id, so the model's joined
+# user and plan relationships are only loaded if something touches them
+_HISTORY_SKIPPED_JOINS = (
+    lazyload(SubscriptionHistory.user),
+    lazyload(SubscriptionHistory.old_plan),
+    lazyload(SubscriptionHistory.new_plan)
+)
+# Columns sparse reads always load: subscriptions keep the key and the version
+# the mapper checks, history keeps what the reads order, group and merge on
+_SUBSCRIPTION_REQUIRED = ('id', 'version')
+_HISTORY_REQUIRED = ('id', 'subscription_id', 'change_type', 'changed_at')
+
+
+def _load_only(model, columns: FrozenSet[str], required: Tuple[str, ...] = ()):
+    """Load only the named column attributes of `model`; relationship names are left to the caller."""
+    names = (set(columns) | set(required)) & set(model.__table__.columns.keys())
+    return load_only(*(getattr(model, name) for name in sorted(names)))
+
+
+def _violates_one_active(err: IntegrityError) -> bool:
+    # PostgreSQL names the index; SQLite only names the indexed column
+    message = str(err.orig)
+    return ONE_ACTIVE_PER_USER_INDEX in message or 'subscriptions.user_id' in message
+
+
+def _encode_cursor(subscription: Subscription) -> str:
+    raw = f"{subscription.created_at.isoformat()}|{subscription.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, subscription_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(subscription_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
 class SubscriptionService:
-    def get_user_subscriptions(self, user_id):
-        return Subscription.query.filter_by(user_id=user_id).all()
-
-    def get_subscriptions_by_status(self, status):
-        return (
-            Subscription.query
-            .filter_by(status=status)
-            .order_by(Subscription.created_at.desc())
+    @read_replica
+    def get_user_subscriptions(self, user_id, columns: Optional[FrozenSet[str]] = None):
+        """All of a user's subscriptions; `columns` limits the attributes loaded (None loads all)."""
+        query = Subscription.query.filter_by(user_id=user_id)
+        if columns is not None:
+            query = query.options(_load_only(Subscription, columns, _SUBSCRIPTION_REQUIRED))
+        return query.all()
+
+    @read_replica
+    def get_current_subscription(self, user_id):
+        """The user's active subscription from the stats summary: one primary-key read, no subscription rows."""
+        return subscription_stats.get_current(user_id)
+
+    @read_replica
+    def get_subscriptions_by_status(self, status, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                                    columns: Optional[FrozenSet[str]] = None) -> Tuple[List[Subscription], Optional[str]]:
+        """Return one keyset page ordered by (created_at, id) descending plus the cursor for the next page."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        # Plans are embedded from the catalog, so the relationship is never loaded
+        query = Subscription.query.filter_by(status=status)
+        if columns is not None:
+            query = query.options(_load_only(Subscription, columns, _SUBSCRIPTION_REQUIRED + ('created_at',)))
+
+        if cursor:
+            created_at, subscription_id = _decode_cursor(cursor)
+            query = query.filter(or_(
+                Subscription.created_at < created_at,
+                and_(Subscription.created_at == created_at, Subscription.id < subscription_id)
+            ))
+
+        # Fetch one extra row to learn whether another page exists
+        subscriptions = (
+            query
+            .order_by(Subscription.created_at.desc(), Subscription.id.desc())
+            .limit(limit + 1)
             .all()
         )
 
-    def get_subscription_by_id(self, subscription_id):
-        return Subscription.query.get(subscription_id)
+        next_cursor = None
+        if len(subscriptions) > limit:
+            subscriptions = subscriptions[:limit]
+            next_cursor = _encode_cursor(subscriptions[-1])
+        return subscriptions, next_cursor
 
-    def _record_subscription_history(self, subscription, change_type, old_plan_id=None, new_plan_id=None, old_status=None, new_status=None):
-        history = SubscriptionHistory(
-            subscription_id=subscription.id,
-            user_id=subscription.user_id,
-            old_plan_id=old_plan_id,
-            new_plan_id=new_plan_id,
-            old_status=old_status,
-            new_status=new_status,
-            change_type=change_type
+    @read_replica
+    def get_subscriptions_by_ids(self, subscription_ids: List[int], user_id,
+                                 columns: Optional[FrozenSet[str]] = None) -> Dict[int, Subscription]:
+        """The user's subscriptions among `subscription_ids`, keyed by id, from one IN query.
+
+        Ids that do not exist and ids owned by someone else are both simply absent.
+        """
+        query = Subscription.query.filter(
+            Subscription.id.in_(set(subscription_ids)),
+            Subscription.user_id == int(user_id)
         )
-        db.session.add(history)
-        db.session.commit()
+        if columns is not None:
+            query = query.options(_load_only(Subscription, columns, _SUBSCRIPTION_REQUIRED))
+        return {subscription.id: subscription for subscription in query}
+
+    def get_subscription_by_id(self, subscription_id, columns: Optional[FrozenSet[str]] = None):
+        if columns is None:
+            return Subscription.query.get(subscription_id)
+        # The ETag needs plan_id and version whatever the payload holds
+        return Subscription.query.options(
+            _load_only(Subscription, columns, _SUBSCRIPTION_REQUIRED + ('plan_id',))
+        ).get(subscription_id)
+
+    def get_subscription_version(self, subscription_id):
+        """(user_id, plan_id, version) of a subscription, enough to build its ETag without loading the row."""
+        return db.session.execute(
+            select(Subscription.user_id, Subscription.plan_id, Subscription.version)
+            .where(Subscription.id == subscription_id)
+        ).first()
+
+    def _record_subscription_history(self, subscription, change_type, old_plan_id=None, new_plan_id=None, old_status=None, new_status=None):
+        if subscription.id is None:
+            # The event carries the subscription id, so a new subscription is inserted first
+            db.session.flush()
+        history_writer.record([{
+            'subscription_id': subscription.id,
+            'user_id': subscription.user_id,
+            'old_plan_id': old_plan_id,
+            'new_plan_id': new_plan_id,
+            'old_status': old_status,
+            'new_status': new_status,
+            'change_type': change_type
+        }])
 
     def create_subscription(self, user_id, plan_id):
-        plan = SubscriptionPlan.query.get(plan_id)
+        plan = plan_catalog.get(plan_id)
         if not plan:
             raise ValueError("Plan not found")
 
-        # Check if user already has an active subscription
-        active_sub = Subscription.query.filter_by(
-            user_id=user_id,
-            status='active'
-        ).first()
-        
-        if active_sub:
-            raise ValueError("User already has an active subscription")
-
         start_date = datetime.utcnow()
         end_date = start_date + timedelta(days=plan.duration_days)
 
-        subscription = Subscription(
-            user_id=user_id,
-            plan_id=plan_id,
-            status='active',
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        db.session.add(subscription)
-        db.session.commit()
-        
-        self._record_subscription_history(
-            subscription=subscription,
-            change_type='create',
-            new_plan_id=plan_id,
-            new_status='active'
-        )
+        # No read-before-write: the one-active-per-user index rejects the insert instead
+        try:
+            with unit_of_work():
+                subscription = Subscription(
+                    user_id=user_id,
+                    plan_id=plan_id,
+                    status='active',
+                    start_date=start_date,
+                    end_date=end_date
+                )
+                db.session.add(subscription)
+            
+                self._record_subscription_history(
+                    subscription=subscription,
+                    change_type='create',
+                    new_plan_id=plan_id,
+                    new_status='active'
+                )
+                response_cache.invalidate_on_commit(user_tag(user_id))
+                subscription_stats.record_created([{
+                    'user_id': subscription.user_id,
+                    'subscription_id': subscription.id,
+                    'plan_id': plan_id,
+                    'created_at': subscription.created_at,
+                    'end_date': end_date,
+                    'price': plan.price
+                }])
+        except IntegrityError as err:
+            if not _violates_one_active(err):
+                raise
+            raise ValueError("User already has an active subscription")
         
         return subscription
 
-    def update_subscription(self, subscription_id, user_id, status=None, plan_id=None):
+    def update_subscription(self, subscription_id, user_id, status=None, plan_id=None, expected_etags=None):
         subscription = Subscription.query.get(subscription_id)
 
         if not subscription or subscription.user_id != int(user_id):
             raise ValueError("Subscription not found")
+        current_etag = subscription_etag(subscription.id, subscription.version, plan_catalog.get(subscription.plan_id))
+        if not matches_current(current_etag, expected_etags):
+            raise VersionConflictError("Subscription has been modified")
 
         old_status = subscription.status
         old_plan_id = subscription.plan_id
         change_type = None
 
-        if status:
-            subscription.status = status
-            change_type = 'cancel' if status == 'cancelled' else 'status_change'
-            
-        if plan_id:
-            plan = SubscriptionPlan.query.get(plan_id)
-            if not plan:
-                raise ValueError("Invalid subscription plan")
+        try:
+            with unit_of_work():
+                if status:
+                    subscription.status = status
+                    change_type = 'cancel' if status == 'cancelled' else 'status_change'
                 
-            subscription.plan_id = plan_id
-            subscription.updated_at = datetime.utcnow()
-            
-            # Determine if this is an upgrade or downgrade
-            old_plan = SubscriptionPlan.query.get(old_plan_id)
-            change_type = 'upgrade' if plan.price > old_plan.price else 'downgrade'
+                if plan_id:
+                    plan = plan_catalog.get(plan_id)
+                    if not plan:
+                        raise ValueError("Invalid subscription plan")
+                    
+                    subscription.plan_id = plan_id
+                    subscription.updated_at = datetime.utcnow()
+                
+                    # Determine if this is an upgrade or downgrade
+                    old_plan = plan_catalog.get(old_plan_id)
+                    change_type = 'upgrade' if plan.price > old_plan.price else 'downgrade'
             
-        db.session.commit()
-        
-        # Record the change in history
-        self._record_subscription_history(
-            subscription=subscription,
-            change_type=change_type,
-            old_plan_id=old_plan_id if plan_id else None,
-            new_plan_id=plan_id if plan_id else None,
-            old_status=old_status if status else None,
-            new_status=status if status else None
-        )
+                # Record the change in history
+                self._record_subscription_history(
+                    subscription=subscription,
+                    change_type=change_type,
+                    old_plan_id=old_plan_id if plan_id else None,
+                    new_plan_id=plan_id if plan_id else None,
+                    old_status=old_status if status else None,
+                    new_status=status if status else None
+                )
+
+                response_cache.invalidate_on_commit(user_tag(subscription.user_id))
+                if plan_id:
+                    subscription_stats.record_plan_change(subscription.user_id, subscription.id, plan_id, plan.price)
+                if status and (status == 'active') != (old_status == 'active'):
+                    if status == 'active':
+                        subscription_stats.record_activated(
+                            subscription.user_id, subscription.id, subscription.plan_id, subscription.end_date
+                        )
+                    else:
+                        subscription_stats.record_deactivated([subscription.id])
+        except StaleDataError:
+            # Another writer (or the expiry sweep) bumped the version since the row was loaded
+            raise VersionConflictError("Subscription has been modified")
+        except IntegrityError as err:
+            if not _violates_one_active(err):
+                raise
+            raise ValueError("User already has an active subscription")
         
         return subscription
 
@@ -116,44 +263,261 @@ class SubscriptionService:
         if not subscription or subscription.user_id != int(user_id):
             raise ValueError("Subscription not found")
 
-        subscription.status = 'cancelled'
-        db.session.commit()
-
-    def get_subscription_history_by_id(self, subscription_id: int) -> List[SubscriptionHistory]:
-        return (
-            SubscriptionHistory.query
-            .join(SubscriptionHistory.subscription)
-            .options(
-                contains_eager(SubscriptionHistory.subscription),
-                joinedload(SubscriptionHistory.old_plan),
-                joinedload(SubscriptionHistory.new_plan)
+        old_status = subscription.status
+        with unit_of_work():
+            subscription.status = 'cancelled'
+            self._record_subscription_history(
+                subscription=subscription,
+                change_type='cancel',
+                old_status=old_status,
+                new_status='cancelled'
+            )
+            subscription_stats.record_deactivated([subscription.id])
+            response_cache.invalidate_on_commit(user_tag(subscription.user_id))
+
+    def _existing_user_ids(self, user_ids: List[int], chunk_size: int) -> set:
+        found = set()
+        for i in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[i:i + chunk_size]
+            found.update(db.session.execute(select(User.id).where(User.id.in_(chunk))).scalars())
+        return found
+
+    def _active_user_ids(self, user_ids: List[int], chunk_size: int) -> set:
+        found = set()
+        for i in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[i:i + chunk_size]
+            found.update(db.session.execute(
+                select(Subscription.user_id).where(
+                    Subscription.user_id.in_(chunk),
+                    Subscription.status == 'active'
+                )
+            ).scalars())
+        return found
+
+    def _insert_bulk_chunk(self, chunk, start_date) -> List[int]:
+        with unit_of_work():
+            ids = db.session.execute(
+                insert(Subscription).returning(Subscription.id, sort_by_parameter_order=True),
+                [row for _, row in chunk]
+            ).scalars().all()
+            history_writer.record([
+                {
+                    'subscription_id': subscription_id,
+                    'user_id': row['user_id'],
+                    'new_plan_id': row['plan_id'],
+                    'new_status': 'active',
+                    'change_type': 'create',
+                    'changed_at': start_date
+                }
+                for subscription_id, (_, row) in zip(ids, chunk)
+            ])
+            response_cache.invalidate_on_commit(*{user_tag(row['user_id']) for _, row in chunk})
+            subscription_stats.record_created(
+                {
+                    'user_id': row['user_id'],
+                    'subscription_id': subscription_id,
+                    'plan_id': row['plan_id'],
+                    'created_at': row['created_at'],
+                    'end_date': row['end_date'],
+                    'price': plan_catalog.get(row['plan_id']).price
+                }
+                for subscription_id, (_, row) in zip(ids, chunk)
             )
+        return ids
+
+    def bulk_create_subscriptions(self, items: List[Dict], chunk_size: int = BULK_CHUNK_SIZE) -> List[Dict]:
+        """Provision many (user_id, plan_id) pairs with set-based checks and chunked multi-row inserts.
+
+        Returns one result dict per item, in input order. Each chunk of inserts and
+        its history rows commits as one unit of work, so the call is not atomic: if a
+        chunk fails unexpectedly it rolls back alone, its items come back with
+        status 'error', and the chunks before and after it still commit.
+        """
+        if len(items) > MAX_BULK_ITEMS:
+            raise ValueError(f"At most {MAX_BULK_ITEMS} items per request")
+
+        user_ids = sorted({int(item['user_id']) for item in items})
+        existing = self._existing_user_ids(user_ids, chunk_size)
+        active = self._active_user_ids(user_ids, chunk_size)
+
+        results: List[Dict] = []
+        pending = []
+        start_date = datetime.utcnow()
+        for index, item in enumerate(items):
+            user_id, plan_id = int(item['user_id']), int(item['plan_id'])
+            result = {'index': index, 'user_id': user_id, 'plan_id': plan_id}
+            results.append(result)
+
+            plan = plan_catalog.get(plan_id)
+            if not plan:
+                error = "Plan not found"
+            elif user_id not in existing:
+                error = "User not found"
+            elif user_id in active:
+                error = "User already has an active subscription"
+            else:
+                error = None
+
+            if error:
+                result.update(status='error', error=error)
+                continue
+
+            # Later items for the same user see this one as their active subscription
+            active.add(user_id)
+            pending.append((result, {
+                'user_id': user_id,
+                'plan_id': plan_id,
+                'status': 'active',
+                'start_date': start_date,
+                'end_date': start_date + timedelta(days=plan.duration_days),
+                'created_at': start_date
+            }))
+
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            try:
+                chunk, ids = self._insert_bulk_chunk_skipping_races(chunk, start_date, chunk_size)
+            except Exception:
+                logger.exception("Bulk provisioning chunk starting at item %d failed", chunk[0][0]['index'])
+                for result, _ in chunk:
+                    # Items already turned away as raced keep that error
+                    result.setdefault('status', 'error')
+                    result.setdefault('error', "Provisioning failed; retry this item")
+                continue
+            for subscription_id, (result, _) in zip(ids, chunk):
+                result.update(status='created', subscription_id=subscription_id)
+
+        return results
+
+    def _insert_bulk_chunk_skipping_races(self, chunk, start_date, chunk_size):
+        """Insert a chunk, dropping users another request activated meanwhile; returns (inserted, ids)."""
+        while chunk:
+            try:
+                return chunk, self._insert_bulk_chunk(chunk, start_date)
+            except IntegrityError as err:
+                if not _violates_one_active(err):
+                    raise
+                # Another request activated some of these users after the set-based check
+                raced = self._active_user_ids([row['user_id'] for _, row in chunk], chunk_size)
+                if not raced:
+                    raise
+                for result, row in chunk:
+                    if row['user_id'] in raced:
+                        result.update(status='error', error="User already has an active subscription")
+                chunk = [(result, row) for result, row in chunk if row['user_id'] not in raced]
+        return chunk, []
+
+    def _history_query(self, model, columns: Optional[FrozenSet[str]]):
+        """History query on `model` that joins the subscription only when the payload embeds it."""
+        query = model.query
+        if columns is None or 'subscription' in columns:
+            eager = contains_eager(model.subscription)
+            if columns is not None:
+                # The embedded subscription only shows its id and plan
+                eager = eager.load_only(Subscription.id, Subscription.plan_id)
+            query = query.join(model.subscription).options(eager)
+        else:
+            query = query.options(lazyload(model.subscription))
+        if model is SubscriptionHistory:
+            query = query.options(*_HISTORY_SKIPPED_JOINS)
+        if columns is not None:
+            query = query.options(_load_only(model, columns, _HISTORY_REQUIRED))
+        return query
+
+    @read_replica
+    def get_subscription_history_by_id(self, subscription_id: int,
+                                       columns: Optional[FrozenSet[str]] = None) -> List:
+        """Newest-first history of one subscription, across the hot and archive tables.
+
+        `columns` names the payload's attributes; None loads whole rows and their subscription.
+        """
+        entries = (
+            self._history_query(SubscriptionHistory, columns)
             .filter(SubscriptionHistory.subscription_id == subscription_id)
             .order_by(desc(SubscriptionHistory.changed_at))
             .all()
         )
+        # Archival moves a subscription's oldest rows first, so while its 'create'
+        # row is still hot nothing of it has been archived
+        if any(entry.change_type == 'create' for entry in entries):
+            return entries
+        archived = (
+            self._history_query(SubscriptionHistoryArchive, columns)
+            .filter(SubscriptionHistoryArchive.subscription_id == subscription_id)
+            .order_by(desc(SubscriptionHistoryArchive.changed_at))
+            .all()
+        )
+        if not archived:
+            return entries
+        return sorted(entries + archived, key=lambda entry: entry.changed_at, reverse=True)
 
-    def get_all_user_subscription_history(self, user_id: int) -> Dict[int, List[SubscriptionHistory]]:
+    @read_replica
+    def get_all_user_subscription_history(self, user_id: int,
+                                          columns: Optional[FrozenSet[str]] = None) -> Dict[int, List]:
+        """History grouped by subscription, newest first within each, across the hot and archive tables."""
         history_entries = (
-            SubscriptionHistory.query
-            .join(Subscription, and_(
-                Subscription.id == SubscriptionHistory.subscription_id,
-                Subscription.user_id == user_id
-            ))
-            .options(
-                joinedload(SubscriptionHistory.old_plan),
-                joinedload(SubscriptionHistory.new_plan),
-                joinedload(SubscriptionHistory.subscription)
-            )
+            self._history_query(SubscriptionHistory, columns)
+            # Walks the (user_id, subscription_id, changed_at) index
+            .filter(SubscriptionHistory.user_id == int(user_id))
             .order_by(
                 SubscriptionHistory.subscription_id,
                 desc(SubscriptionHistory.changed_at)
             )
             .all()
         )
+        archived = (
+            self._history_query(SubscriptionHistoryArchive, columns)
+            .filter(SubscriptionHistoryArchive.user_id == int(user_id))
+            .order_by(
+                SubscriptionHistoryArchive.subscription_id,
+                desc(SubscriptionHistoryArchive.changed_at)
+            )
+            .all()
+        )
+        if archived:
+            history_entries = sorted(history_entries + archived, key=lambda entry: entry.changed_at, reverse=True)
+            history_entries.sort(key=lambda entry: entry.subscription_id)
         
         return {
             subscription_id: list(entries)
             for subscription_id, entries in 
             groupby(history_entries, key=lambda x: x.subscription_id)
-        } 
\ No newline at end of file
+        } 
+
+    @read_replica
+    def iter_subscription_history(self, user_id: Optional[int] = None,
+                                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator:
+        """Stream history rows as plain column tuples, fetched `batch_size` at a time.
+
+        Selecting columns instead of entities skips the model's joined relationships
+        and the identity map, so memory stays flat however long the history is. The
+        hot and archive tables are streamed side by side and merged in order.
+        """
+        def stream(model):
+            stmt = select(
+                model.id,
+                model.subscription_id,
+                model.user_id,
+                model.old_plan_id,
+                model.new_plan_id,
+                model.old_status,
+                model.new_status,
+                model.change_type,
+                model.changed_at
+            )
+            if user_id is not None:
+                # Walks the (user_id, subscription_id, changed_at) index in order
+                stmt = stmt.where(model.user_id == int(user_id)).order_by(
+                    model.subscription_id,
+                    model.changed_at
+                )
+            else:
+                stmt = stmt.order_by(model.id)
+            return db.session.execute(stmt.execution_options(yield_per=batch_size))
+
+        if user_id is not None:
+            key = lambda row: (row.subscription_id, row.changed_at)
+        else:
+            key = lambda row: row.id
+        # Both cursors are opened here, while the read route is still in effect
+        return merge(stream(SubscriptionHistoryArchive), stream(SubscriptionHistory), key=key)
@@ -0,0 +1,288 @@
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List
+from sqlalchemy import and_, bindparam, case, delete, exists, func, insert, or_, select, update
+from app.models import (
+    Subscription, SubscriptionHistory, SubscriptionHistoryArchive, SubscriptionPlan, User, UserSubscriptionStats
+)
+from app.core.database import db
+from app.services.unit_of_work import unit_of_work
+
+# History change types that charge the price of their new plan
+BILLING_CHANGE_TYPES = ('create', 'upgrade', 'downgrade', 'renew')
+
+_stats = UserSubscriptionStats.__table__
+# Column order of _summary_select()
+SUMMARY_COLUMNS = ('user_id', 'subscription_count', 'last_subscription_date',
+                   'active_subscription_id', 'active_plan_id', 'active_end_date', 'lifetime_spend')
+CURRENT_COLUMNS = ('active_subscription_id', 'active_plan_id', 'active_end_date')
+
+
+@dataclass
+class CurrentIndexReport:
+    checked: int = 0
+    mismatched: int = 0
+    repaired: int = 0
+    # First few users whose summary disagrees with their active subscription
+    sample: List[int] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+class SubscriptionStatsService:
+    """Keeps user_subscription_stats in step with subscription writes.
+
+    The record_* methods only issue statements. Callers run them inside their own
+    unit of work, so the summary commits or rolls back together with the
+    subscription change. A user's row appears with their first subscription.
+
+    The active_* columns double as the index of each user's current
+    subscription, which GET /subscriptions/current reads by primary key.
+    """
+
+    def _ensure_rows(self, user_ids: List[int]):
+        existing = set(db.session.execute(
+            select(_stats.c.user_id).where(_stats.c.user_id.in_(user_ids))
+        ).scalars())
+        missing = [user_id for user_id in user_ids if user_id not in existing]
+        if missing:
+            db.session.execute(insert(_stats), [
+                {'user_id': user_id, 'subscription_count': 0, 'lifetime_spend': 0} for user_id in missing
+            ])
+
+    def record_created(self, rows: Iterable[Dict]):
+        """Count new active subscriptions; rows carry user_id, subscription_id, plan_id, created_at, end_date and price."""
+        rows = [dict(row, user_id=int(row['user_id'])) for row in rows]
+        if not rows:
+            return
+        # Update first: the common case is a returning user whose row already exists
+        result = db.session.execute(
+            update(_stats)
+            .where(_stats.c.user_id == bindparam('b_user_id'))
+            .values(
+                subscription_count=_stats.c.subscription_count + 1,
+                last_subscription_date=bindparam('b_created_at'),
+                active_subscription_id=bindparam('b_subscription_id'),
+                active_plan_id=bindparam('b_plan_id'),
+                active_end_date=bindparam('b_end_date'),
+                lifetime_spend=_stats.c.lifetime_spend + bindparam('b_price')
+            ),
+            [
+                {
+                    'b_user_id': row['user_id'],
+                    'b_created_at': row['created_at'],
+                    'b_subscription_id': row['subscription_id'],
+                    'b_plan_id': row['plan_id'],
+                    'b_end_date': row['end_date'],
+                    'b_price': row['price']
+                }
+                for row in rows
+            ]
+        )
+        if result.rowcount == len(rows):
+            return
+
+        missing = rows
+        if result.rowcount != 0:
+            existing = set(db.session.execute(
+                select(_stats.c.user_id).where(_stats.c.user_id.in_([row['user_id'] for row in rows]))
+            ).scalars())
+            missing = [row for row in rows if row['user_id'] not in existing]
+        if missing:
+            db.session.execute(insert(_stats), [
+                {
+                    'user_id': row['user_id'],
+                    'subscription_count': 1,
+                    'last_subscription_date': row['created_at'],
+                    'active_subscription_id': row['subscription_id'],
+                    'active_plan_id': row['plan_id'],
+                    'active_end_date': row['end_date'],
+                    'lifetime_spend': row['price']
+                }
+                for row in missing
+            ])
+
+    def record_plan_change(self, user_id: int, subscription_id: int, plan_id: int, price: float):
+        db.session.execute(
+            update(_stats)
+            .where(_stats.c.user_id == int(user_id))
+            .values(
+                lifetime_spend=_stats.c.lifetime_spend + price,
+                active_plan_id=case(
+                    (_stats.c.active_subscription_id == subscription_id, plan_id),
+                    else_=_stats.c.active_plan_id
+                )
+            )
+        )
+
+    def record_renewed(self, rows: Iterable[Dict]):
+        """Charge renewals; rows carry user_id, subscription_id, end_date and price."""
+        rows = list(rows)
+        if rows:
+            db.session.execute(
+                update(_stats)
+                .where(_stats.c.user_id == bindparam('b_user_id'))
+                .values(
+                    lifetime_spend=_stats.c.lifetime_spend + bindparam('b_price'),
+                    active_end_date=case(
+                        (_stats.c.active_subscription_id == bindparam('b_subscription_id'), bindparam('b_end_date')),
+                        else_=_stats.c.active_end_date
+                    )
+                ),
+                [
+                    {
+                        'b_user_id': int(row['user_id']),
+                        'b_subscription_id': row['subscription_id'],
+                        'b_end_date': row['end_date'],
+                        'b_price': row['price']
+                    }
+                    for row in rows
+                ]
+            )
+
+    def record_activated(self, user_id: int, subscription_id: int, plan_id: int, end_date: datetime):
+        user_id = int(user_id)
+        self._ensure_rows([user_id])
+        db.session.execute(
+            update(_stats)
+            .where(_stats.c.user_id == user_id)
+            .values(active_subscription_id=subscription_id, active_plan_id=plan_id, active_end_date=end_date)
+        )
+
+    def record_deactivated(self, subscription_ids: List[int]):
+        if subscription_ids:
+            db.session.execute(
+                update(_stats)
+                .where(_stats.c.active_subscription_id.in_(subscription_ids))
+                .values(active_subscription_id=None, active_plan_id=None, active_end_date=None)
+            )
+
+    def _spend(self, history):
+        return (
+            select(func.coalesce(func.sum(SubscriptionPlan.price), 0))
+            .select_from(history)
+            .join(SubscriptionPlan, SubscriptionPlan.id == history.new_plan_id)
+            .where(
+                history.user_id == User.id,
+                history.change_type.in_(BILLING_CHANGE_TYPES)
+            )
+            .scalar_subquery()
+        )
+
+    def _summary_select(self):
+        owned = Subscription.user_id == User.id
+        latest_active = (
+            select(Subscription.id, Subscription.plan_id, Subscription.end_date)
+            .where(owned, Subscription.status == 'active')
+            .order_by(Subscription.created_at.desc(), Subscription.id.desc())
+            .limit(1)
+        )
+        return select(
+            User.id,
+            select(func.count(Subscription.id)).where(owned).scalar_subquery(),
+            select(func.max(Subscription.created_at)).where(owned).scalar_subquery(),
+            latest_active.with_only_columns(Subscription.id).scalar_subquery(),
+            latest_active.with_only_columns(Subscription.plan_id).scalar_subquery(),
+            latest_active.with_only_columns(Subscription.end_date).scalar_subquery(),
+            self._spend(SubscriptionHistory) + self._spend(SubscriptionHistoryArchive)
+        ).where(exists().where(owned))
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Recompute every summary from subscriptions and history, one committed batch of users at a time.
+
+        Spend covers hot and archived history, re-priced at the plans' current prices.
+        """
+        rebuilt, after = 0, 0
+        while True:
+            user_ids = db.session.execute(
+                select(User.id).where(User.id > after).order_by(User.id).limit(batch_size)
+            ).scalars().all()
+            if not user_ids:
+                return rebuilt
+            first, last = user_ids[0], user_ids[-1]
+            with unit_of_work():
+                db.session.execute(delete(_stats).where(_stats.c.user_id.between(first, last)))
+                result = db.session.execute(insert(_stats).from_select(
+                    SUMMARY_COLUMNS, self._summary_select().where(User.id.between(first, last))
+                ))
+            rebuilt += max(result.rowcount, 0)
+            after = last
+
+    def get_current(self, user_id: int):
+        """(active_subscription_id, active_plan_id, active_end_date) for a user, or None if nothing is active."""
+        row = db.session.execute(
+            select(*(_stats.c[column] for column in CURRENT_COLUMNS)).where(_stats.c.user_id == int(user_id))
+        ).first()
+        return row if row is not None and row.active_subscription_id is not None else None
+
+    def _current_mismatches(self, first: int, last: int) -> List[int]:
+        return db.session.execute(
+            select(User.id)
+            .outerjoin(_stats, _stats.c.user_id == User.id)
+            .outerjoin(Subscription, and_(Subscription.user_id == User.id, Subscription.status == 'active'))
+            .where(
+                User.id.between(first, last),
+                or_(
+                    _stats.c.active_subscription_id.is_distinct_from(Subscription.id),
+                    _stats.c.active_plan_id.is_distinct_from(Subscription.plan_id),
+                    _stats.c.active_end_date.is_distinct_from(Subscription.end_date)
+                )
+            )
+            .order_by(User.id)
+        ).scalars().all()
+
+    def _repair_current(self, user_ids: List[int]) -> int:
+        """Copy the active subscription onto existing summaries; users without one get a full summary row."""
+        def active(column):
+            return select(column).where(
+                Subscription.user_id == _stats.c.user_id, Subscription.status == 'active'
+            ).scalar_subquery()
+
+        with unit_of_work():
+            updated = db.session.execute(
+                update(_stats)
+                .where(_stats.c.user_id.in_(user_ids))
+                .values(
+                    active_subscription_id=active(Subscription.id),
+                    active_plan_id=active(Subscription.plan_id),
+                    active_end_date=active(Subscription.end_date)
+                )
+            ).rowcount
+            existing = set(db.session.execute(
+                select(_stats.c.user_id).where(_stats.c.user_id.in_(user_ids))
+            ).scalars())
+            missing = [user_id for user_id in user_ids if user_id not in existing]
+            inserted = 0
+            if missing:
+                inserted = db.session.execute(insert(_stats).from_select(
+                    SUMMARY_COLUMNS, self._summary_select().where(User.id.in_(missing))
+                )).rowcount
+        return updated + max(inserted, 0)
+
+    def check_current(self, batch_size: int = 1000, repair: bool = False) -> CurrentIndexReport:
+        """Compare every user's active_* columns with their active subscription, optionally fixing mismatches.
+
+        Only the current-subscription columns are repaired; counts and spend are
+        left to rebuild().
+        """
+        report = CurrentIndexReport()
+        started = time.perf_counter()
+        after = 0
+        while True:
+            user_ids = db.session.execute(
+                select(User.id).where(User.id > after).order_by(User.id).limit(batch_size)
+            ).scalars().all()
+            if not user_ids:
+                break
+            report.checked += len(user_ids)
+            mismatched = self._current_mismatches(user_ids[0], user_ids[-1])
+            report.mismatched += len(mismatched)
+            report.sample.extend(mismatched[:10 - len(report.sample)])
+            if repair and mismatched:
+                report.repaired += self._repair_current(mismatched)
+            after = user_ids[-1]
+        report.elapsed = time.perf_counter() - started
+        return report
+
+
+subscription_stats = SubscriptionStatsService()
@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+from app.core.database import db
+
+_STATE_KEY = 'unit_of_work'
+
+
+def _state():
+    # Session.info lives as long as the scoped session, i.e. one app context/thread
+    return db.session.info.setdefault(_STATE_KEY, {'depth': 0})
+
+
+@contextmanager
+def unit_of_work():
+    """Flush and commit everything added inside the block in a single transaction.
+
+    Nested units join the outermost one, so service methods can call each other
+    without committing halfway. Any exception rolls the whole unit back.
+    """
+    state = _state()
+    state['depth'] += 1
+    try:
+        yield db.session
+        if state['depth'] == 1:
+            db.session.commit()
+    except Exception:
+        if state['depth'] == 1:
+            db.session.rollback()
+        raise
+    finally:
+        state['depth'] -= 1
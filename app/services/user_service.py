@@ -1,22 +1,26 @@
 from app.models import User
 from app.core.database import db
+from app.core.replicas import read_replica
 from sqlalchemy import text
 
 class UserService:
+    @read_replica
     def get_user_by_email(self, email):
+        # Point lookup: users.email is unique and the summary is keyed by user_id
         query = text("""
             SELECT u.id, u.email, u.is_admin, u.created_at,
-                   COUNT(s.id) as subscription_count,
-                   MAX(s.created_at) as last_subscription_date
+                   COALESCE(st.subscription_count, 0) as subscription_count,
+                   st.last_subscription_date,
+                   st.active_plan_id,
+                   COALESCE(st.lifetime_spend, 0) as lifetime_spend
             FROM users u
-            LEFT JOIN subscriptions s ON u.id = s.user_id
+            LEFT JOIN user_subscription_stats st ON st.user_id = u.id
             WHERE u.email = :email
-            GROUP BY u.id, u.email, u.is_admin, u.created_at
-        """)
+        """).columns(created_at=db.DateTime, last_subscription_date=db.DateTime)
         
         result = db.session.execute(query, {'email': email}).first()
         if result:
-            return dict(result)
+            return dict(result._mapping)
         return None
 
     def get_user_by_id(self, user_id):
@@ -0,0 +1,117 @@
+"""Compare the marshmallow + flask-restx response path with the compiled serializers.
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from flask_restx import marshal
+from app.core.config import config
+from app.core.database import db
+from app.models import Subscription, SubscriptionPlan, SubscriptionHistory
+from app.api.plans import plan_model
+from app.api.subscriptions import subscription_model
+from app.schemas.plan_schema import PlanResponseSchema
+from app.schemas.subscription_schema import SubscriptionResponseSchema, SubscriptionHistoryResponseSchema
+from app.schemas.serializers import (
+    dumps,
+    serialize_many,
+    serialize_plan,
+    serialize_subscription,
+    serialize_subscription_history
+)
+
+
+def _best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def build_rows(count):
+    plan = SubscriptionPlan(name='bench', price=9.99, duration_days=30, features={'seats': '5', 'support': 'email'})
+    db.session.add(plan)
+    db.session.commit()
+    # Rows are built detached so assigning relationships doesn't cascade them into the session
+    db.session.refresh(plan)
+    db.session.expunge(plan)
+
+    now = datetime.utcnow()
+    subscriptions = [
+        Subscription(
+            id=i, user_id=i, plan_id=plan.id, plan=plan, status='active',
+            start_date=now, end_date=now + timedelta(days=30), created_at=now
+        )
+        for i in range(1, count + 1)
+    ]
+    history = [
+        SubscriptionHistory(
+            id=i, subscription_id=sub.id, subscription=sub, user_id=sub.user_id,
+            new_plan_id=plan.id, new_plan=plan, new_status='active',
+            change_type='create', changed_at=now
+        )
+        for i, sub in enumerate(subscriptions, start=1)
+    ]
+    return [plan] * count, subscriptions, history
+
+
+def run(rows, repeat):
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    db.init_app(app)
+
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        plans, subscriptions, history = build_rows(rows)
+        subscription_schema = SubscriptionResponseSchema()
+        plan_schema = PlanResponseSchema()
+        history_schema = SubscriptionHistoryResponseSchema(many=True)
+
+        shapes = {
+            'plan': (
+                lambda: json.dumps(marshal([plan_schema.dump(p) for p in plans], plan_model)).encode(),
+                lambda: dumps(serialize_many(serialize_plan, plans)),
+            ),
+            'subscription': (
+                lambda: json.dumps(marshal([subscription_schema.dump(s) for s in subscriptions], subscription_model)).encode(),
+                lambda: dumps(serialize_many(serialize_subscription, subscriptions)),
+            ),
+            'subscription_history': (
+                lambda: json.dumps(history_schema.dump(history)).encode(),
+                lambda: dumps(serialize_many(serialize_subscription_history, history)),
+            ),
+        }
+
+        results = {}
+        for name, (before, after) in shapes.items():
+            if json.loads(before()) != json.loads(after()):
+                raise AssertionError(f"{name}: compiled output differs from marshmallow/restx output")
+            before_s = _best_of(before, repeat)
+            after_s = _best_of(after, repeat)
+            results[name] = {
+                'rows': rows,
+                'before_ms': round(before_s * 1000, 1),
+                'after_ms': round(after_s * 1000, 1),
+                'speedup': round(before_s / after_s, 1)
+            }
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, result in run(args.rows, args.repeat).items():
+        print(f"{name:22} {result['rows']} rows  before {result['before_ms']:8.1f} ms  "
+              f"after {result['after_ms']:7.1f} ms  x{result['speedup']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Concurrency check for the one-active-subscription-per-user guarantee.
+
+Each round releases many threads at once, all creating a subscription for the
+same user through the test client of create_app('testing'). Exactly one request
+per round must get 201, the rest must get 400, and the user must end the round
+with exactly one active subscription, which is then cancelled for the next round:
+
+    python -m benchmarks.hammer_active_subscription --threads 16 --rounds 50
+
+Exits non-zero if any round lets a duplicate through or fails with a 5xx.
+tests/test_one_active_subscription.py runs a small version of this on every test run.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hammer subscription creation for one user from many threads.')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    database_path = os.path.join(tempfile.mkdtemp(prefix='hammer-'), 'hammer.db')
+    os.environ['TEST_DATABASE_URL'] = f"sqlite:///{database_path}"
+    os.environ.setdefault('SQL_INSTRUMENTATION', 'false')
+    os.environ.setdefault('RESPONSE_CACHE_BACKEND', 'none')
+
+    from benchmarks.seed import seed_database
+    seed_database(database_path, '1k')
+
+    from app import create_app
+    from app.core.database import db
+    from app.models import Subscription, User
+    from app.services.auth_service import AuthService
+
+    app = create_app('testing')
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    with app.app_context():
+        user = db.session.get(User, 1)
+        headers = {'Authorization': f"Bearer {AuthService().create_token(user)}"}
+        db.session.query(Subscription).filter_by(user_id=user.id, status='active').update({'status': 'cancelled'})
+        db.session.commit()
+        db.session.remove()
+
+    clients = [app.test_client() for _ in range(args.threads)]
+    totals = Counter()
+    duplicates = 0
+
+    for _ in range(args.rounds):
+        barrier = threading.Barrier(args.threads)
+        statuses = []
+        lock = threading.Lock()
+
+        def create(client):
+            barrier.wait()
+            status = client.post('/subscriptions/', json={'plan_id': 1}, headers=headers).status_code
+            with lock:
+                statuses.append(status)
+
+        threads = [threading.Thread(target=create, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        totals.update(statuses)
+
+        with app.app_context():
+            active = db.session.query(Subscription).filter_by(user_id=1, status='active').all()
+            if len(active) != 1 or statuses.count(201) != 1:
+                duplicates += 1
+            for subscription in active:
+                subscription.status = 'cancelled'
+            db.session.commit()
+            db.session.remove()
+
+    print(f"{args.rounds} rounds x {args.threads} threads: "
+          + ', '.join(f"{status}: {count}" for status, count in sorted(totals.items())))
+    print(f"rounds with other than exactly one active subscription: {duplicates}")
+    failed = duplicates or any(status >= 500 for status in totals)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
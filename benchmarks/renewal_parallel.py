@@ -0,0 +1,130 @@
+"""Multi-process renewal throughput and correctness check.
+
+For each worker count, a subprocess seeds a fresh SQLite database in which every
+active subscription is moved into the renewal window, then runs the renewal
+engine in that many processes at once. The script reports throughput and lease conflicts,
+and fails if any subscription was renewed twice or left unrenewed:
+
+    python -m benchmarks.renewal_parallel --scale 100k --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WINDOW = timedelta(hours=24)
+
+
+def _verify(app, due: int):
+    from sqlalchemy import func, select
+    from app.core.database import db
+    from app.models import Subscription, SubscriptionHistory
+
+    with app.app_context():
+        renew_rows = db.session.execute(
+            select(func.count()).select_from(SubscriptionHistory).where(SubscriptionHistory.change_type == 'renew')
+        ).scalar()
+        doubled = db.session.execute(
+            select(func.count()).select_from(
+                select(SubscriptionHistory.subscription_id)
+                .where(SubscriptionHistory.change_type == 'renew')
+                .group_by(SubscriptionHistory.subscription_id)
+                .having(func.count() > 1)
+                .subquery()
+            )
+        ).scalar()
+        still_due = db.session.execute(
+            select(func.count()).select_from(Subscription).where(
+                Subscription.status == 'active', Subscription.end_date <= datetime.utcnow() + WINDOW
+            )
+        ).scalar()
+        db.session.remove()
+    return {'renew_rows': renew_rows, 'doubled': doubled, 'still_due': still_due, 'due': due}
+
+
+def run(scale: str, workers: int, batch_size: int) -> dict:
+    """Run inside the subprocess; TEST_DATABASE_URL is already set."""
+    from benchmarks.seed import seed_database
+    seed_database(os.environ['TEST_DATABASE_URL'][len('sqlite:///'):], scale)
+
+    from sqlalchemy import bindparam, select, update
+    from app import create_app
+    from app.core.database import db
+    from app.models import Subscription
+    from app.services.renewal_service import renew_in_parallel
+
+    app = create_app('testing')
+    with app.app_context():
+        now = datetime.utcnow()
+        # Spread the due dates over the next ten hours, all inside the window
+        ids = db.session.execute(select(Subscription.id).where(Subscription.status == 'active')).scalars().all()
+        db.session.connection().execute(
+            update(Subscription.__table__)
+            .where(Subscription.__table__.c.id == bindparam('b_id'))
+            .values(end_date=bindparam('b_end_date')),
+            [{'b_id': subscription_id, 'b_end_date': now + timedelta(minutes=1 + subscription_id % 600)}
+             for subscription_id in ids]
+        )
+        db.session.commit()
+        due = len(ids)
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+    started = time.perf_counter()
+    reports = renew_in_parallel('testing', workers, WINDOW, batch_size, lease_seconds=60)
+    elapsed = time.perf_counter() - started
+    failed = [report['error'] for report in reports if 'error' in report]
+    if failed:
+        raise SystemExit(f"{len(failed)} renewal workers failed: {'; '.join(failed)}")
+
+    renewed = sum(report['renewed'] for report in reports)
+    return {
+        'workers': workers,
+        'renewed': renewed,
+        'seconds': round(elapsed, 2),
+        'per_second': round(renewed / elapsed, 1) if elapsed else 0.0,
+        'conflicts': sum(report['conflicts'] for report in reports),
+        'lost_leases': sum(report['lost_leases'] for report in reports),
+        **_verify(app, due)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Renewal throughput and lease conflicts per worker count.')
+    parser.add_argument('--scale', choices=('1k', '100k', '1m'), default='100k')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4])
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--child', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(run(args.scale, args.child, args.batch_size)))
+        return 0
+
+    failed = False
+    print(f"{'workers':>7} {'renewed':>8} {'seconds':>8} {'rows/s':>8} {'conflicts':>9} {'lost':>5} "
+          f"{'doubled':>7} {'unrenewed':>9}")
+    for workers in args.workers:
+        database_path = os.path.join(tempfile.mkdtemp(prefix='renewal-'), 'renewal.db')
+        env = dict(os.environ, TEST_DATABASE_URL=f"sqlite:///{database_path}",
+                   SQL_INSTRUMENTATION='false', RESPONSE_CACHE_BACKEND='none')
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.renewal_parallel', '--child', str(workers),
+             '--scale', args.scale, '--batch-size', str(args.batch_size)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        unrenewed = result['still_due']
+        failed |= bool(result['doubled'] or unrenewed or result['renew_rows'] != result['due'])
+        print(f"{result['workers']:7d} {result['renewed']:8d} {result['seconds']:8.2f} {result['per_second']:8.1f} "
+              f"{result['conflicts']:9d} {result['lost_leases']:5d} {result['doubled']:7d} {unrenewed:9d}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
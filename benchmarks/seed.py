@@ -0,0 +1,118 @@
+"""Deterministic dataset seeding for the benchmark suite.
+
+Rows are written with chunked executemany inserts against a file-backed SQLite
+database whose schema is created from the models, so seeding a million
+subscriptions takes seconds rather than going through the API.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+import bcrypt
+from flask import Flask
+from sqlalchemy import insert
+from app.core.database import db
+from app.models import User, SubscriptionPlan, Subscription, SubscriptionHistory
+from app.services.subscription_stats import subscription_stats
+
+SCALES = {
+    '1k': {'users': 1000, 'plans': 10, 'history_per_subscription': 3},
+    '100k': {'users': 100000, 'plans': 25, 'history_per_subscription': 3},
+    '1m': {'users': 1000000, 'plans': 50, 'history_per_subscription': 3},
+}
+
+SEED = 20240101
+CHUNK_SIZE = 5000
+BENCH_PASSWORD = 'bench-pass'
+BENCH_HASH_ROUNDS = 4
+
+
+def bench_email(index: int) -> str:
+    return f"user{index}@bench.local"
+
+
+def _insert(model, rows):
+    if rows:
+        db.session.execute(insert(model), rows)
+
+
+def seed_database(database_path: str, scale: str) -> dict:
+    """Create the schema in `database_path` and fill it for `scale`. Returns the row counts."""
+    params = SCALES[scale]
+    if os.path.exists(database_path):
+        os.remove(database_path)
+
+    rng = random.Random(SEED)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        # One shared hash keeps seeding fast while still letting any user log in
+        password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(BENCH_HASH_ROUNDS)).decode('utf-8')
+
+        _insert(SubscriptionPlan, [
+            {
+                'id': plan_id,
+                'name': f"plan-{plan_id}",
+                'price': round(5 + plan_id * 2.5, 2),
+                'duration_days': rng.choice((30, 90, 365)),
+                'features': {'seats': str(plan_id), 'support': 'email'},
+                'created_at': now - timedelta(days=400)
+            }
+            for plan_id in range(1, params['plans'] + 1)
+        ])
+
+        counts = {'users': 0, 'plans': params['plans'], 'subscriptions': 0, 'history': 0}
+        # Generated and inserted chunk by chunk so the 1m scale never holds the dataset in memory
+        for chunk_start in range(1, params['users'] + 1, CHUNK_SIZE):
+            users, subscriptions, history = [], [], []
+            for user_id in range(chunk_start, min(chunk_start + CHUNK_SIZE, params['users'] + 1)):
+                created_at = now - timedelta(minutes=rng.randrange(0, 525600))
+                users.append({
+                    'id': user_id,
+                    'email': bench_email(user_id),
+                    'password_hash': password_hash,
+                    'is_admin': False,
+                    'created_at': created_at,
+                    'updated_at': created_at
+                })
+                plan_id = rng.randrange(1, params['plans'] + 1)
+                status = rng.choices(('active', 'cancelled', 'expired'), weights=(70, 20, 10))[0]
+                start_date = created_at + timedelta(minutes=5)
+                subscriptions.append({
+                    'id': user_id,
+                    'user_id': user_id,
+                    'plan_id': plan_id,
+                    'status': status,
+                    'start_date': start_date,
+                    'end_date': start_date + timedelta(days=365),
+                    'created_at': start_date
+                })
+                for step in range(params['history_per_subscription']):
+                    history.append({
+                        'subscription_id': user_id,
+                        'user_id': user_id,
+                        'old_plan_id': None if step == 0 else plan_id,
+                        'new_plan_id': rng.randrange(1, params['plans'] + 1),
+                        'old_status': None,
+                        'new_status': 'active' if step == 0 else None,
+                        'change_type': 'create' if step == 0 else rng.choice(('upgrade', 'downgrade')),
+                        'changed_at': start_date + timedelta(days=step),
+                        'recorded_at': start_date + timedelta(days=step)
+                    })
+
+            _insert(User, users)
+            _insert(Subscription, subscriptions)
+            _insert(SubscriptionHistory, history)
+            db.session.commit()
+            counts['users'] += len(users)
+            counts['subscriptions'] += len(subscriptions)
+            counts['history'] += len(history)
+
+        db.session.commit()
+        subscription_stats.rebuild(batch_size=CHUNK_SIZE)
+        db.engine.dispose()
+
+    return counts
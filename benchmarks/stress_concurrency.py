@@ -0,0 +1,142 @@
+"""Concurrent read/write stress test for the database engine profile.
+
+Each profile runs in a fresh subprocess against a freshly seeded SQLite file,
+because the journal mode is persisted in the database file. Reader threads
+list and page subscriptions while writer threads switch plans, all through the
+test client of create_app('testing'). The script reports throughput, p95
+latency and failures per profile:
+
+    python -m benchmarks.stress_concurrency --readers 8 --writers 4 --duration 10
+
+--history-mode outbox runs the writers against the history outbox, drained by
+the in-process writer thread, instead of synchronous history inserts.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.suite import percentile
+
+PROFILES = ('default', 'tuned')
+
+
+def _worker(client, token, paths, body_fn, method, deadline, stats, lock):
+    headers = {'Authorization': f"Bearer {token}"}
+    latencies, failures, i = [], 0, 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        started = time.perf_counter()
+        response = client.open(path, method=method, headers=headers, json=body_fn(i) if body_fn else None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 500:
+            failures += 1
+        i += 1
+    with lock:
+        stats['latencies'].extend(latencies)
+        stats['failures'] += failures
+
+
+def run_profile(scale: str, readers: int, writers: int, duration: float) -> dict:
+    """Run inside the subprocess; DB_ENGINE_PROFILE and TEST_DATABASE_URL are already set."""
+    from benchmarks.seed import seed_database, bench_email
+    database_path = os.environ['TEST_DATABASE_URL'][len('sqlite:///'):]
+    seed_database(database_path, scale)
+
+    from app import create_app
+    from app.core.database import db
+    from app.models import Subscription, User
+    from app.services.auth_service import AuthService
+
+    app = create_app('testing')
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    with app.app_context():
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        # Writers each own one active subscription so they never conflict on rows, only on the database lock
+        owners = (
+            db.session.query(Subscription.id, Subscription.user_id)
+            .filter(Subscription.status == 'active')
+            .order_by(Subscription.id)
+            .limit(writers)
+            .all()
+        )
+        auth = AuthService()
+        writer_jobs = [(auth.create_token(db.session.get(User, user_id)), subscription_id)
+                       for subscription_id, user_id in owners]
+        reader_tokens = [auth.create_token(db.session.get(User, user_id + 1))
+                         for user_id in range(readers)]
+        db.session.remove()
+
+    read_paths = ['/subscriptions/', '/subscriptions/status/active?limit=50',
+                  '/subscriptions/history', f"/users/email/{bench_email(1)}"]
+    reads = {'latencies': [], 'failures': 0}
+    writes = {'latencies': [], 'failures': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(app.test_client(), token, read_paths, None, 'GET',
+                                               deadline, reads, lock))
+        for token in reader_tokens
+    ] + [
+        threading.Thread(target=_worker, args=(app.test_client(), token, [f"/subscriptions/{subscription_id}"],
+                                               lambda i: {'plan_id': 1 + i % 2}, 'PUT', deadline, writes, lock))
+        for token, subscription_id in writer_jobs
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    def summarize(stats):
+        latencies = stats['latencies'] or [0.0]
+        return {
+            'requests': len(stats['latencies']),
+            'per_second': round(len(stats['latencies']) / duration, 1),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'failures': stats['failures']
+        }
+
+    return {'journal_mode': journal_mode, 'reads': summarize(reads), 'writes': summarize(writes)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent read/write throughput per engine profile.')
+    parser.add_argument('--scale', choices=('1k', '100k', '1m'), default='1k')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile')
+    parser.add_argument('--profiles', nargs='*', default=list(PROFILES), choices=PROFILES)
+    parser.add_argument('--history-mode', choices=('sync', 'outbox'), default='sync')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_profile(args.scale, args.readers, args.writers, args.duration)))
+        return 0
+
+    results = {}
+    for profile in args.profiles:
+        database_path = os.path.join(tempfile.mkdtemp(prefix='stress-'), 'stress.db')
+        env = dict(os.environ, DB_ENGINE_PROFILE=profile, TEST_DATABASE_URL=f"sqlite:///{database_path}",
+                   SQL_INSTRUMENTATION='false', TEST_HISTORY_WRITE_MODE=args.history_mode)
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.stress_concurrency', '--child', '--scale', args.scale,
+             '--readers', str(args.readers), '--writers', str(args.writers), '--duration', str(args.duration)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results[profile] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'profile':10} {'journal':8} {'reads/s':>9} {'read p95':>9} {'read err':>9} "
+          f"{'writes/s':>9} {'write p95':>10} {'write err':>10}")
+    for profile, r in results.items():
+        print(f"{profile:10} {r['journal_mode']:8} {r['reads']['per_second']:9.1f} {r['reads']['p95_ms']:9.2f} "
+              f"{r['reads']['failures']:9d} {r['writes']['per_second']:9.1f} {r['writes']['p95_ms']:10.2f} "
+              f"{r['writes']['failures']:10d}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
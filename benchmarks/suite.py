@@ -0,0 +1,346 @@
+"""Endpoint benchmark suite.
+
+Seeds a file-backed SQLite database at the chosen scale, drives every route
+through the Flask test client of create_app('testing') and reports p50/p95/p99
+latency, queries per request and peak traced memory per route. Cold startup
+(import, create_app and first request in a fresh interpreter) is measured too.
+Results are written as JSON and compared against a stored baseline:
+
+    python -m benchmarks.suite --scale 1k
+    python -m benchmarks.suite --scale 1k --save-baseline
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+ADMIN_EMAIL = 'admin@gmail.com'
+ADMIN_PASSWORD = 'Pass@123'
+STARTUP_RUNS = 5
+
+# Runs in a fresh interpreter so module imports are cold
+_STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app('testing')
+created = time.perf_counter()
+status = app.test_client().get('/plans/').status_code
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - created) * 1000, 'status': status}))
+"""
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    path: str
+    auth: Optional[str] = 'user'  # 'user', 'admin' or None
+    json: Optional[Callable[[int], dict]] = None
+    # Untimed per-iteration setup; may return overrides for path/json/headers
+    prepare: Optional[Callable[['BenchContext', int], dict]] = None
+
+
+@dataclass
+class BenchContext:
+    app: object
+    client: object
+    tokens: Dict[str, str]
+    spare_user_ids: List[int] = field(default_factory=list)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _prepare_plan_delete(ctx: BenchContext, i: int) -> dict:
+    from app.services.plan_service import PlanService
+    with ctx.app.app_context():
+        plan = PlanService().create_plan(name=f"bench-delete-{i}-{time.time_ns()}", price=1, duration_days=1)
+        return {'path': f"/plans/{plan.id}"}
+
+
+def _prepare_subscription_create(ctx: BenchContext, i: int) -> dict:
+    from app.core.database import db
+    from app.services.auth_service import AuthService
+    from app.models import User
+    with ctx.app.app_context():
+        user = db.session.get(User, ctx.spare_user_ids.pop())
+        return {'headers': {'Authorization': f"Bearer {AuthService().create_token(user)}"}}
+
+
+def _conditional(path: str) -> Callable[[BenchContext, int], dict]:
+    """Revalidate with the ETag of an untimed plain GET, as a polling client would."""
+    def prepare(ctx: BenchContext, i: int) -> dict:
+        headers = {'Authorization': f"Bearer {ctx.tokens['user']}"}
+        etag = ctx.client.get(path, headers=headers).headers.get('ETag', '')
+        return {'headers': {'If-None-Match': etag}}
+    return prepare
+
+
+def build_routes() -> List[Route]:
+    from benchmarks.seed import bench_email, BENCH_PASSWORD
+
+    counter = itertools.count()
+    return [
+        Route('auth_register', 'POST', '/auth/register', auth=None,
+              json=lambda i: {'email': f"new{next(counter)}-{time.time_ns()}@bench.local", 'password': 'secret123'}),
+        Route('auth_login', 'POST', '/auth/login', auth=None,
+              json=lambda i: {'email': bench_email(1), 'password': BENCH_PASSWORD}),
+        Route('plans_list', 'GET', '/plans/'),
+        Route('plans_get', 'GET', '/plans/1'),
+        Route('plans_batch', 'GET', '/plans/?ids=' + ','.join(map(str, range(1, 21)))),
+        Route('plans_list_not_modified', 'GET', '/plans/', prepare=_conditional('/plans/')),
+        Route('plans_create', 'POST', '/plans/', auth='admin',
+              json=lambda i: {'name': f"bench-{i}-{time.time_ns()}", 'price': 9.5, 'duration_days': 30}),
+        Route('plans_update', 'PUT', '/plans/1', auth='admin', json=lambda i: {'price': 10 + i % 5}),
+        Route('plans_delete', 'DELETE', '/plans/0', auth='admin', prepare=_prepare_plan_delete),
+        Route('subscriptions_list', 'GET', '/subscriptions/'),
+        Route('subscriptions_current', 'GET', '/subscriptions/current'),
+        Route('subscriptions_batch', 'GET', '/subscriptions/?ids=' + ','.join(map(str, range(1, 51)))),
+        Route('subscriptions_get', 'GET', '/subscriptions/1'),
+        Route('subscriptions_get_not_modified', 'GET', '/subscriptions/1', prepare=_conditional('/subscriptions/1')),
+        Route('subscriptions_status', 'GET', '/subscriptions/status/active?limit=50'),
+        Route('subscriptions_status_sparse', 'GET', '/subscriptions/status/active?limit=50&fields=status,end_date'),
+        Route('subscriptions_history', 'GET', '/subscriptions/history'),
+        Route('subscriptions_history_detail', 'GET', '/subscriptions/history/1'),
+        Route('subscriptions_history_detail_sparse', 'GET', '/subscriptions/history/1?fields=change_type,changed_at'),
+        Route('users_by_email', 'GET', f"/users/email/{bench_email(1)}"),
+        Route('subscriptions_create', 'POST', '/subscriptions/', json=lambda i: {'plan_id': 1},
+              prepare=_prepare_subscription_create),
+        Route('subscriptions_update', 'PUT', '/subscriptions/1', json=lambda i: {'plan_id': 1 + i % 2}),
+    ]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self.enabled = False
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        if self.enabled:
+            self.count += 1
+
+
+def _request(ctx: BenchContext, route: Route, i: int):
+    headers = {}
+    if route.auth:
+        headers['Authorization'] = f"Bearer {ctx.tokens[route.auth]}"
+    overrides = route.prepare(ctx, i) if route.prepare else {}
+    headers.update(overrides.get('headers', {}))
+    body = route.json(i) if route.json else None
+    return overrides.get('path', route.path), headers, overrides.get('json', body)
+
+
+def bench_route(ctx: BenchContext, counter: QueryCounter, route: Route, iterations: int, warmup: int) -> dict:
+    latencies, queries, statuses = [], [], {}
+
+    for i in range(warmup + iterations):
+        path, headers, body = _request(ctx, route, i)
+        counter.count = 0
+        counter.enabled = True
+        started = time.perf_counter()
+        response = ctx.client.open(path, method=route.method, headers=headers, json=body)
+        elapsed = time.perf_counter() - started
+        counter.enabled = False
+        if i < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(counter.count)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    peak = 0
+    for i in range(3):
+        path, headers, body = _request(ctx, route, warmup + iterations + i)
+        tracemalloc.start()
+        ctx.client.open(path, method=route.method, headers=headers, json=body)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'status_codes': statuses
+    }
+
+
+def measure_startup(database_path: str, runs: int = STARTUP_RUNS) -> dict:
+    """Median cold-start timings over `runs` fresh interpreters."""
+    env = dict(os.environ, TEST_DATABASE_URL=f"sqlite:///{database_path}")
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _STARTUP_PROBE], env=env, cwd=os.path.dirname(BENCH_DIR),
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    startup = {
+        key: round(statistics.median(sample[key] for sample in samples), 2)
+        for key in ('import_ms', 'create_app_ms', 'first_request_ms')
+    }
+    startup['total_ms'] = round(startup['import_ms'] + startup['create_app_ms'] + startup['first_request_ms'], 2)
+    return startup
+
+
+def run_suite(scale: str, database_path: str, iterations: int, warmup: int, only: Optional[List[str]] = None) -> dict:
+    # The testing config reads its URL at import time, so set it before importing the app
+    os.environ['TEST_DATABASE_URL'] = f"sqlite:///{database_path}"
+    from benchmarks.seed import seed_database
+
+    seed_started = time.perf_counter()
+    counts = seed_database(database_path, scale)
+    seed_seconds = time.perf_counter() - seed_started
+
+    from app import create_app
+    from app.core.database import db
+    from app.models import Subscription
+    from benchmarks.seed import bench_email, BENCH_PASSWORD
+
+    startup = measure_startup(database_path)
+
+    app = create_app('testing')
+    # Record failing routes as 500s instead of aborting the run
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    app.test_cli_runner().invoke(args=['seed-admin', '--email', ADMIN_EMAIL, '--password', ADMIN_PASSWORD])
+    client = app.test_client()
+    tokens = {}
+    for role, email, password in (('admin', ADMIN_EMAIL, ADMIN_PASSWORD), ('user', bench_email(1), BENCH_PASSWORD)):
+        response = client.post('/auth/login', json={'email': email, 'password': password})
+        tokens[role] = response.get_json()['access_token']
+
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        spare_user_ids = [
+            user_id for (user_id,) in
+            db.session.query(Subscription.user_id).filter(Subscription.status != 'active').limit(warmup + iterations + 3)
+        ]
+
+    ctx = BenchContext(app=app, client=client, tokens=tokens, spare_user_ids=spare_user_ids)
+    routes = {}
+    for route in build_routes():
+        if only and route.name not in only:
+            continue
+        routes[route.name] = bench_route(ctx, counter, route, iterations, warmup)
+
+    return {
+        'meta': {
+            'scale': scale,
+            'dataset': counts,
+            'seed_seconds': round(seed_seconds, 2),
+            'iterations': iterations,
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'startup': startup,
+        'routes': routes
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """Return a description of every metric that regressed beyond the tolerance."""
+    regressions = []
+    current_startup, base_startup = results.get('startup'), baseline.get('startup')
+    if current_startup and base_startup:
+        # Interpreter start-up is noisy at the millisecond scale, so allow ten times the route delta
+        for metric in ('total_ms', 'create_app_ms'):
+            if (current_startup[metric] > base_startup[metric] * (1 + tolerance)
+                    and current_startup[metric] - base_startup[metric] > min_delta_ms * 10):
+                regressions.append(f"startup: {metric} {base_startup[metric]} -> {current_startup[metric]}")
+    for name, current in results['routes'].items():
+        base = baseline.get('routes', {}).get(name)
+        if not base:
+            continue
+        # p99 is reported but not gated: at suite sample sizes it is close to the max
+        for metric in ('p50_ms', 'p95_ms'):
+            if current[metric] > base[metric] * (1 + tolerance) and current[metric] - base[metric] > min_delta_ms:
+                regressions.append(f"{name}: {metric} {base[metric]} -> {current[metric]}")
+        # Periodic cache checks add fractional queries; a real N+1 adds whole ones
+        if current['queries_per_request'] >= base['queries_per_request'] + 0.5:
+            regressions.append(f"{name}: queries/request {base['queries_per_request']} -> {current['queries_per_request']}")
+        if current['peak_memory_kb'] > base['peak_memory_kb'] * (1 + tolerance) + 64:
+            regressions.append(f"{name}: peak memory {base['peak_memory_kb']}KB -> {current['peak_memory_kb']}KB")
+    return regressions
+
+
+def print_table(results: dict):
+    startup = results.get('startup')
+    if startup:
+        print(f"startup: import {startup['import_ms']:.1f}ms, create_app {startup['create_app_ms']:.1f}ms, "
+              f"first request {startup['first_request_ms']:.1f}ms, total {startup['total_ms']:.1f}ms\n")
+    print(f"{'route':30} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'peak KB':>9}  status")
+    for name, r in results['routes'].items():
+        print(f"{name:30} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+              f"{r['queries_per_request']:8.1f} {r['peak_memory_kb']:9.1f}  {r['status_codes']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every API route against a seeded dataset.')
+    parser.add_argument('--scale', choices=('1k', '100k', '1m'), default='1k')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--routes', nargs='*', help='Only run these routes')
+    parser.add_argument('--database', help='SQLite file to seed (defaults to a temporary file)')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='Baseline JSON (defaults to benchmarks/baselines/<scale>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore latency changes smaller than this')
+    args = parser.parse_args(argv)
+
+    database_path = args.database or os.path.join(tempfile.mkdtemp(prefix='bench-'), f"bench-{args.scale}.db")
+    results = run_suite(args.scale, database_path, args.iterations, args.warmup, args.routes)
+    print_table(results)
+
+    with open(args.output, 'w') as fh:
+        json.dump(results, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    baseline_path = args.baseline or os.path.join(DEFAULT_BASELINE_DIR, f"{args.scale}.json")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
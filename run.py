@@ -1,10 +1,11 @@
 from dotenv import load_dotenv
 import os
-from app import create_app
 
-# Load environment variables from .env file
+# Load environment variables from .env file before the config classes read them
 load_dotenv()
 
+from app import create_app
+
 # Get the environment from FLASK_ENV, default to development
 env = os.getenv('FLASK_ENV', 'development')
 app = create_app(env)
@@ -0,0 +1,46 @@
+import pytest
+from app import create_app
+from app.core.config import TestingConfig
+from app.core.database import db
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build create_app('testing') apps on one file-backed SQLite database.
+
+    Keyword arguments override TestingConfig settings. Every app built in a
+    test shares the database, like several workers of one deployment.
+    """
+    apps = []
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(TestingConfig, 'SQL_INSTRUMENTATION', False, raising=False)
+
+    def build(**overrides):
+        for key, value in overrides.items():
+            monkeypatch.setattr(TestingConfig, key, value, raising=False)
+        app = create_app('testing')
+        with app.app_context():
+            # Replica binds from earlier tests linger in db.metadatas; models all live on the primary
+            db.create_all(bind_key=None)
+        apps.append(app)
+        return app
+
+    yield build
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def register(client, email='user@example.com', password='secret123'):
+    """Register a user and return Authorization headers for them."""
+    response = client.post('/auth/register', json={'email': email, 'password': password})
+    assert response.status_code == 201, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def create_plan(app, name='basic', price=10.0, duration_days=30):
+    from app.services.plan_service import PlanService
+    with app.app_context():
+        return PlanService().create_plan(name=name, price=price, duration_days=duration_days).id
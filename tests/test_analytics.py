@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from conftest import create_plan, register
+from app.core.database import db, seed_admin
+from app.models import HistoryOutbox, SubscriptionHistory
+from app.services.analytics_service import AnalyticsService
+from app.services.history_writer import EVENT_COLUMNS
+
+
+def test_drains_committed_out_of_id_order_are_not_skipped(make_app):
+    app = make_app(HISTORY_WRITE_MODE='outbox', HISTORY_OUTBOX_INTERVAL=None)
+    client = app.test_client()
+    plan_id = create_plan(app)
+    for email in ('a@example.com', 'b@example.com'):
+        assert client.post('/subscriptions/', json={'plan_id': plan_id}, headers=register(client, email=email)).status_code == 201
+
+    with app.app_context():
+        # Both events waited an hour in the outbox, so their changed_at is long settled
+        events = [
+            {column: getattr(event, column) for column in EVENT_COLUMNS}
+            for event in HistoryOutbox.query.order_by(HistoryOutbox.id)
+        ]
+        for event in events:
+            event['changed_at'] -= timedelta(hours=1)
+        HistoryOutbox.query.delete()
+        now = datetime.utcnow()
+        service = AnalyticsService(settle_seconds=30)
+
+        # The drainer that took id 1 has not committed yet; the one that took id 2 has
+        db.session.execute(insert(SubscriptionHistory), [dict(events[1], id=2, recorded_at=now)])
+        db.session.commit()
+        assert service.refresh(now=now).rows == 0
+
+        db.session.execute(insert(SubscriptionHistory), [dict(events[0], id=1, recorded_at=now)])
+        db.session.commit()
+        report = service.refresh(now=now + timedelta(seconds=31))
+        assert (report.rows, report.last_history_id) == (2, 2)
+
+
+def _admin_headers(app, client):
+    with app.app_context():
+        seed_admin('admin@example.com', 'admin-secret')
+    login = client.post('/auth/login', json={'email': 'admin@example.com', 'password': 'admin-secret'})
+    return {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+
+def test_rollup_counts_movements_and_mrr(make_app):
+    app = make_app()
+    client = app.test_client()
+    basic_id = create_plan(app, name='basic', price=10.0, duration_days=30)
+    pro_id = create_plan(app, name='pro', price=20.0, duration_days=30)
+    # No positive duration, so no monthly rate; it must not break the report
+    lifetime_id = create_plan(app, name='lifetime', price=50.0, duration_days=0)
+
+    upgrader, canceller, lifer = (register(client, email=f"{name}@example.com") for name in ('a', 'b', 'c'))
+    upgraded = client.post('/subscriptions/', json={'plan_id': basic_id}, headers=upgrader).get_json()['id']
+    cancelled = client.post('/subscriptions/', json={'plan_id': basic_id}, headers=canceller).get_json()['id']
+    assert client.post('/subscriptions/', json={'plan_id': lifetime_id}, headers=lifer).status_code == 201
+    assert client.put(f"/subscriptions/{upgraded}", json={'plan_id': pro_id}, headers=upgrader).status_code == 200
+    assert client.delete(f"/subscriptions/{cancelled}", headers=canceller).status_code == 200
+
+    with app.app_context():
+        report = AnalyticsService(settle_seconds=0).refresh(now=datetime.utcnow() + timedelta(seconds=1))
+    assert report.rows == 5
+
+    today = datetime.utcnow().date()
+    admin = _admin_headers(app, client)
+    response = client.get(f"/analytics/daily?start={today}&end={today + timedelta(days=1)}", headers=admin)
+    assert response.status_code == 200, response.get_json()
+    day, next_day = response.get_json()['days']
+
+    assert {key: day[key] for key in ('active_subscribers', 'mrr', 'new_subscriptions', 'upgrades',
+                                      'cancellations', 'revenue')} == {
+        'active_subscribers': 2, 'mrr': 20.0, 'new_subscriptions': 3, 'upgrades': 1,
+        'cancellations': 1, 'revenue': 90.0
+    }
+    plans = {entry['plan_id']: entry for entry in day['plans']}
+    assert {pid: (entry['active_subscribers'], entry['mrr']) for pid, entry in plans.items()} == {
+        basic_id: (0, 0.0), pro_id: (1, 20.0), lifetime_id: (1, 0.0)
+    }
+
+    # Subscribers carry over to days without movements
+    assert (next_day['active_subscribers'], next_day['mrr'], next_day['new_subscriptions']) == (2, 20.0, 0)
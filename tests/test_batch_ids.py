@@ -0,0 +1,60 @@
+import pytest
+from conftest import create_plan, register
+from app.schemas.serializers import MAX_BATCH_IDS
+
+
+def _subscribe(client, plan_id, email):
+    headers = register(client, email=email)
+    return headers, client.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers).get_json()['id']
+
+
+def test_subscriptions_by_ids_keep_request_order_and_hide_others(make_app):
+    app = make_app()
+    client = app.test_client()
+    plan_id = create_plan(app)
+    headers, own = _subscribe(client, plan_id, 'a@example.com')
+    _, foreign = _subscribe(client, plan_id, 'b@example.com')
+
+    response = client.get(f"/subscriptions/?ids=999,{foreign},{own}", headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    # Someone else's subscription is indistinguishable from a missing one
+    assert body['not_found'] == [999, foreign]
+    assert body['items'][:2] == [{'id': 999, 'error': 'not_found'}, {'id': foreign, 'error': 'not_found'}]
+    assert (body['items'][2]['id'], body['items'][2]['plan']['id']) == (own, plan_id)
+
+    sparse = client.get(f"/subscriptions/?ids={own},{own}&fields=status", headers=headers).get_json()
+    assert sparse == {'items': [{'id': own, 'status': 'active'}] * 2, 'not_found': []}
+
+
+def test_plans_by_ids_keep_request_order(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    basic_id = create_plan(app, name='basic')
+    pro_id = create_plan(app, name='pro', price=20.0)
+
+    body = client.get(f"/plans/?ids={pro_id},404,{basic_id}", headers=headers).get_json()
+    assert [item.get('name', item.get('error')) for item in body['items']] == ['pro', 'not_found', 'basic']
+    assert body['not_found'] == [404]
+
+
+@pytest.mark.parametrize('path', ['/subscriptions/', '/plans/'])
+@pytest.mark.parametrize('ids', [
+    ','.join(map(str, range(1, MAX_BATCH_IDS + 2))),
+    '1,two',
+    ' , ',
+])
+def test_bad_or_oversized_id_lists_are_rejected(make_app, path, ids):
+    app = make_app()
+    client = app.test_client()
+    response = client.get(f"{path}?ids={ids}", headers=register(client))
+    assert response.status_code == 400
+
+
+def test_id_list_at_the_cap_is_served(make_app):
+    app = make_app()
+    client = app.test_client()
+    ids = ','.join(map(str, range(1, MAX_BATCH_IDS + 1)))
+    body = client.get(f"/plans/?ids={ids}", headers=register(client)).get_json()
+    assert len(body['not_found']) == MAX_BATCH_IDS
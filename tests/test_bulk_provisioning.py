@@ -0,0 +1,32 @@
+from conftest import create_plan, register
+from app.models import Subscription, User
+from app.services.subscription_service import SubscriptionService
+from app.services.subscription_stats import subscription_stats
+
+
+def test_failed_chunk_reports_its_items_and_keeps_the_others(make_app, monkeypatch):
+    app = make_app()
+    client = app.test_client()
+    for index in range(6):
+        register(client, email=f"user{index}@example.com")
+    plan_id = create_plan(app)
+
+    record_created = subscription_stats.record_created
+    calls = []
+
+    def fail_second_chunk(rows):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("stats table unavailable")
+        return record_created(rows)
+
+    monkeypatch.setattr(subscription_stats, 'record_created', fail_second_chunk)
+    with app.app_context():
+        user_ids = sorted(user.id for user in User.query.all())
+        results = SubscriptionService().bulk_create_subscriptions(
+            [{'user_id': user_id, 'plan_id': plan_id} for user_id in user_ids], chunk_size=2
+        )
+        assert [result['status'] for result in results] == ['created', 'created', 'error', 'error', 'created', 'created']
+        assert results[2]['error'] == "Provisioning failed; retry this item"
+        stored = {row.user_id for row in Subscription.query.filter_by(status='active')}
+        assert stored == {user_ids[0], user_ids[1], user_ids[4], user_ids[5]}
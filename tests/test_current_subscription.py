@@ -0,0 +1,62 @@
+from conftest import create_plan, register
+from app.core.database import db
+from app.models import UserSubscriptionStats
+
+
+def test_current_follows_subscribe_upgrade_and_cancel(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    basic_id = create_plan(app, name='basic')
+    pro_id = create_plan(app, name='pro', price=20.0)
+
+    assert client.get('/subscriptions/current', headers=headers).status_code == 404
+
+    subscription = client.post('/subscriptions/', json={'plan_id': basic_id}, headers=headers).get_json()
+    current = client.get('/subscriptions/current', headers=headers).get_json()
+    assert current == {
+        'subscription_id': subscription['id'],
+        'plan_id': basic_id,
+        'end_date': subscription['end_date'],
+        'plan': subscription['plan']
+    }
+
+    assert client.put(f"/subscriptions/{subscription['id']}", json={'plan_id': pro_id},
+                      headers=headers).status_code == 200
+    current = client.get('/subscriptions/current', headers=headers).get_json()
+    assert (current['plan_id'], current['plan']['name']) == (pro_id, 'pro')
+
+    assert client.delete(f"/subscriptions/{subscription['id']}", headers=headers).status_code == 200
+    assert client.get('/subscriptions/current', headers=headers).status_code == 404
+
+
+def test_check_current_subscriptions_reports_and_repairs_drift(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    plan_id = create_plan(app)
+    subscription_id = client.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers).get_json()['id']
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['check-current-subscriptions'])
+    assert result.exit_code == 0, result.output
+    assert 'Checked 1 users' in result.output and '0 mismatched' in result.output
+
+    with app.app_context():
+        stats = UserSubscriptionStats.query.one()
+        stats.active_subscription_id = stats.active_plan_id = stats.active_end_date = None
+        db.session.commit()
+
+    result = runner.invoke(args=['check-current-subscriptions'])
+    assert result.exit_code == 1
+    assert '1 mismatched' in result.output
+    assert 'First mismatched users: 1' in result.output
+
+    result = runner.invoke(args=['check-current-subscriptions', '--repair'])
+    assert result.exit_code == 0, result.output
+    assert '1 repaired' in result.output
+    with app.app_context():
+        stats = UserSubscriptionStats.query.one()
+        assert (stats.active_subscription_id, stats.active_plan_id) == (subscription_id, plan_id)
+
+    assert runner.invoke(args=['check-current-subscriptions']).exit_code == 0
@@ -0,0 +1,44 @@
+from conftest import create_plan, register
+from app.core.database import seed_admin
+
+
+def _subscription(app):
+    client = app.test_client()
+    headers = register(client)
+    plan_id = create_plan(app, name='basic', price=10.0)
+    create_plan(app, name='pro', price=20.0)
+    created = client.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers).get_json()
+    etag = client.get(f"/subscriptions/{created['id']}", headers=headers).headers['ETag']
+    return client, headers, created['id'], plan_id, etag
+
+
+def test_if_match_rejects_tags_of_other_resources(make_app):
+    app = make_app()
+    client, headers, subscription_id, plan_id, etag = _subscription(app)
+    version = etag.strip('"').split('-')[0].split('.')[1]
+
+    for foreign in (f'"s999.{version}-p{plan_id}.1"', f'"p{plan_id}.{version}"'):
+        response = client.put(f"/subscriptions/{subscription_id}", json={'plan_id': plan_id + 1},
+                              headers={**headers, 'If-Match': foreign})
+        assert response.status_code == 412, foreign
+
+    response = client.put(f"/subscriptions/{subscription_id}", json={'plan_id': plan_id + 1},
+                          headers={**headers, 'If-Match': etag})
+    assert response.status_code == 200
+    # The old tag names a version that no longer exists
+    response = client.put(f"/subscriptions/{subscription_id}", json={'plan_id': plan_id},
+                          headers={**headers, 'If-Match': etag})
+    assert response.status_code == 412
+
+
+def test_plan_if_match_rejects_a_subscription_tag(make_app):
+    app = make_app()
+    client, _, subscription_id, plan_id, etag = _subscription(app)
+    with app.app_context():
+        seed_admin('admin@example.com', 'admin-secret')
+    login = client.post('/auth/login', json={'email': 'admin@example.com', 'password': 'admin-secret'})
+    admin = {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+    plan_tag = client.get(f"/plans/{plan_id}", headers=admin).headers['ETag']
+    assert client.put(f"/plans/{plan_id}", json={'price': 12.0}, headers={**admin, 'If-Match': etag}).status_code == 412
+    assert client.put(f"/plans/{plan_id}", json={'price': 12.0}, headers={**admin, 'If-Match': plan_tag}).status_code == 200
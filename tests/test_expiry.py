@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from conftest import create_plan, register
+from app.models import Subscription, SubscriptionHistory
+from app.services.expiry_service import ExpiryService
+
+
+def test_sweep_expires_due_rows_in_batches_and_records_history(make_app):
+    app = make_app()
+    client = app.test_client()
+    monthly = create_plan(app, name='monthly', duration_days=30)
+    yearly = create_plan(app, name='yearly', duration_days=365)
+    headers = {}
+    for index, plan_id in enumerate((monthly, monthly, monthly, yearly)):
+        headers[index] = register(client, email=f"user{index}@example.com")
+        assert client.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers[index]).status_code == 201
+
+    # Cache user 0's current subscription before the sweep
+    assert client.get('/subscriptions/current', headers=headers[0]).status_code == 200
+
+    with app.app_context():
+        report = ExpiryService(batch_size=2).expire_due_subscriptions(now=datetime.utcnow() + timedelta(days=31))
+        assert (report.expired, report.batches) == (3, 2)
+        statuses = {row.plan_id: set() for row in Subscription.query}
+        for row in Subscription.query:
+            statuses[row.plan_id].add(row.status)
+        assert statuses == {monthly: {'expired'}, yearly: {'active'}}
+        expired = SubscriptionHistory.query.filter_by(change_type='expire').all()
+        assert len(expired) == 3
+        assert {(row.old_status, row.new_status) for row in expired} == {('active', 'expired')}
+
+        # A second sweep finds nothing left to do
+        assert ExpiryService(batch_size=2).expire_due_subscriptions(now=datetime.utcnow() + timedelta(days=31)).expired == 0
+
+    # The sweep invalidated the users' cached subscription and cleared their current one
+    assert client.get('/subscriptions/current', headers=headers[0]).status_code == 404
+    assert client.get('/subscriptions/current', headers=headers[3]).status_code == 200
@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timedelta
+from conftest import create_plan, register
+from app.core.database import db
+from app.models import SubscriptionHistory, SubscriptionHistoryArchive
+
+
+def _subscription_with_old_create(app):
+    """A subscription whose 'create' row is past the archive horizon and whose 'upgrade' row is not."""
+    client = app.test_client()
+    headers = register(client)
+    basic_id = create_plan(app, name='basic')
+    pro_id = create_plan(app, name='pro', price=20.0)
+    subscription_id = client.post('/subscriptions/', json={'plan_id': basic_id}, headers=headers).get_json()['id']
+    assert client.put(f"/subscriptions/{subscription_id}", json={'plan_id': pro_id},
+                      headers=headers).status_code == 200
+    with app.app_context():
+        created = SubscriptionHistory.query.filter_by(change_type='create').one()
+        created.changed_at = datetime.utcnow() - timedelta(days=400)
+        db.session.commit()
+    return client, headers, subscription_id
+
+
+def test_archive_moves_only_rows_past_the_horizon(make_app):
+    app = make_app()
+    _subscription_with_old_create(app)
+    with app.app_context():
+        before = {row.id: (row.change_type, row.recorded_at) for row in SubscriptionHistory.query}
+
+    result = app.test_cli_runner().invoke(args=['archive-subscription-history', '--older-than-days', '30'])
+    assert result.exit_code == 0, result.output
+    assert 'Archived 1 history rows in 1 batches' in result.output
+
+    with app.app_context():
+        assert [row.change_type for row in SubscriptionHistory.query] == ['upgrade']
+        archived = SubscriptionHistoryArchive.query.one()
+        # Same id and insert time, so the rollup watermark and settle window still line up
+        assert before[archived.id] == ('create', archived.recorded_at)
+
+    # A second run finds nothing left to move
+    result = app.test_cli_runner().invoke(args=['archive-subscription-history', '--older-than-days', '30'])
+    assert 'Archived 0 history rows' in result.output
+
+
+def test_history_reads_merge_hot_and_archived_rows(make_app):
+    app = make_app()
+    client, headers, subscription_id = _subscription_with_old_create(app)
+    assert app.test_cli_runner().invoke(args=['archive-subscription-history', '--older-than-days', '30']).exit_code == 0
+
+    detail = client.get(f"/subscriptions/history/{subscription_id}", headers=headers)
+    assert detail.status_code == 200
+    assert [(row['change_type'], row['new_plan']['name']) for row in detail.get_json()] == [
+        ('upgrade', 'pro'), ('create', 'basic')
+    ]
+
+    grouped = client.get('/subscriptions/history', headers=headers).get_json()['subscriptions']
+    assert [row['change_type'] for row in grouped[str(subscription_id)]] == ['upgrade', 'create']
+
+    export = client.get('/subscriptions/history/export', headers=headers)
+    rows = [json.loads(line) for line in export.get_data(as_text=True).splitlines()]
+    assert [row['change_type'] for row in rows] == ['create', 'upgrade']
@@ -0,0 +1,32 @@
+import json
+from conftest import create_plan, register
+from app.services.subscription_service import SubscriptionService
+
+
+def test_invalid_format_is_rejected_before_the_export_query(make_app, monkeypatch):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    opened = []
+    monkeypatch.setattr(SubscriptionService, 'iter_subscription_history',
+                        lambda self, user_id=None: opened.append(user_id) or iter(()))
+
+    response = client.get('/subscriptions/history/export?format=xml', headers=headers)
+    assert response.status_code == 400
+    assert opened == []
+
+
+def test_export_streams_ndjson_and_json(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    plan_id = create_plan(app)
+    assert client.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers).status_code == 201
+
+    ndjson = client.get('/subscriptions/history/export', headers=headers)
+    assert ndjson.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()]
+    assert [(row['change_type'], row['new_plan_name']) for row in rows] == [('create', 'basic')]
+
+    as_json = client.get('/subscriptions/history/export?format=json', headers=headers)
+    assert as_json.get_json() == rows
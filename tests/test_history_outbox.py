@@ -0,0 +1,29 @@
+from conftest import create_plan, register
+from app.services.history_writer import history_writer
+
+
+def _drain(app):
+    with app.app_context():
+        history_writer.drain()
+
+
+def test_drain_invalidates_cached_history(make_app):
+    app = make_app(HISTORY_WRITE_MODE='outbox', HISTORY_OUTBOX_INTERVAL=0, RESPONSE_CACHE_BACKEND='memory')
+    basic, pro = create_plan(app, 'basic', 10), create_plan(app, 'pro', 20)
+    client = app.test_client()
+    headers = register(client)
+
+    subscription_id = client.post('/subscriptions/', json={'plan_id': basic}, headers=headers).get_json()['id']
+    _drain(app)
+    assert len(client.get('/subscriptions/history', headers=headers).get_json()['subscriptions'][str(subscription_id)]) == 1
+
+    assert client.put(f'/subscriptions/{subscription_id}', json={'plan_id': pro}, headers=headers).status_code == 200
+    # Cached while the upgrade event still waits in the outbox
+    response = client.get('/subscriptions/history', headers=headers)
+    assert len(response.get_json()['subscriptions'][str(subscription_id)]) == 1
+
+    _drain(app)
+    response = client.get('/subscriptions/history', headers=headers)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [entry['change_type'] for entry in response.get_json()['subscriptions'][str(subscription_id)]] == ['upgrade', 'create']
+    assert len(client.get(f'/subscriptions/history/{subscription_id}', headers=headers).get_json()) == 2
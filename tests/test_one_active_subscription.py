@@ -0,0 +1,39 @@
+import threading
+from conftest import create_plan, register
+from app.core.database import db
+from app.models import Subscription
+
+THREADS = 8
+ROUNDS = 5
+
+
+def test_concurrent_creates_leave_exactly_one_active_subscription(make_app):
+    app = make_app(PROPAGATE_EXCEPTIONS=False, RESPONSE_CACHE_BACKEND='none')
+    headers = register(app.test_client())
+    plan_id = create_plan(app)
+    clients = [app.test_client() for _ in range(THREADS)]
+
+    for _ in range(ROUNDS):
+        barrier = threading.Barrier(THREADS)
+        statuses = []
+        lock = threading.Lock()
+
+        def create(client):
+            barrier.wait()
+            status = client.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers).status_code
+            with lock:
+                statuses.append(status)
+
+        threads = [threading.Thread(target=create, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # The partial unique index lets one insert through; the rest map to 400, never 500
+        assert sorted(statuses) == [201] + [400] * (THREADS - 1)
+        with app.app_context():
+            active = Subscription.query.filter_by(status='active').all()
+            assert len(active) == 1
+            active[0].status = 'cancelled'
+            db.session.commit()
@@ -0,0 +1,74 @@
+import threading
+import bcrypt
+from werkzeug.security import generate_password_hash
+from conftest import register
+from app.core.database import db
+from app.models import User
+
+
+def _block_hashing_of(password, monkeypatch):
+    """Hold bcrypt on `password` until `release` is set; `started` fires once it holds a pool slot."""
+    started, release = threading.Event(), threading.Event()
+    hashpw = bcrypt.hashpw
+
+    def slow_hashpw(value, salt):
+        if value == password.encode('utf-8'):
+            started.set()
+            release.wait(10)
+        return hashpw(value, salt)
+
+    monkeypatch.setattr(bcrypt, 'hashpw', slow_hashpw)
+    return started, release
+
+
+def test_saturated_hasher_answers_503(make_app, monkeypatch):
+    app = make_app(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_QUEUE=0)
+    started, release = _block_hashing_of('slow-password', monkeypatch)
+    first = threading.Thread(target=lambda: app.test_client().post(
+        '/auth/register', json={'email': 'slow@example.com', 'password': 'slow-password'}
+    ))
+    first.start()
+    try:
+        assert started.wait(5)
+        response = app.test_client().post('/auth/register', json={'email': 'fast@example.com', 'password': 'secret123'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        release.set()
+        first.join()
+
+
+def test_each_app_sizes_its_own_pool(make_app, monkeypatch):
+    saturated = make_app(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_QUEUE=0)
+    roomy = make_app(PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_MAX_QUEUE=0)
+    started, release = _block_hashing_of('slow-password', monkeypatch)
+    first = threading.Thread(target=lambda: saturated.test_client().post(
+        '/auth/register', json={'email': 'slow@example.com', 'password': 'slow-password'}
+    ))
+    first.start()
+    try:
+        assert started.wait(5)
+        # The other app's pool is separate and still has room
+        register(roomy.test_client(), email='other@example.com')
+    finally:
+        release.set()
+        first.join()
+
+
+def test_login_rehashes_legacy_and_outdated_hashes(make_app):
+    app = make_app(BCRYPT_LOG_ROUNDS=5)
+    with app.app_context():
+        db.session.add(User(email='legacy@example.com', password_hash=generate_password_hash('secret123')))
+        db.session.add(User(email='cheap@example.com',
+                            password_hash=bcrypt.hashpw(b'secret123', bcrypt.gensalt(4)).decode('utf-8')))
+        db.session.commit()
+
+    client = app.test_client()
+    for email in ('legacy@example.com', 'cheap@example.com'):
+        assert client.post('/auth/login', json={'email': email, 'password': 'secret123'}).status_code == 200
+
+    with app.app_context():
+        stored = {user.email: user.password_hash for user in User.query}
+    assert all(value.startswith('$2b$05$') for value in stored.values())
+    # The rehashed passwords still log in
+    assert client.post('/auth/login', json={'email': 'legacy@example.com', 'password': 'secret123'}).status_code == 200
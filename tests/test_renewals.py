@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from conftest import create_plan, register
+from app.models import Subscription, SubscriptionHistory, UserSubscriptionStats
+from app.services.plan_catalog import plan_catalog
+from app.services.renewal_service import RenewalService, renew_in_parallel
+
+
+def _subscribe(app, duration_days):
+    plan_id = create_plan(app, price=10.0, duration_days=duration_days)
+    client = app.test_client()
+    response = client.post('/subscriptions/', json={'plan_id': plan_id}, headers=register(client))
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def test_plan_shorter_than_window_is_renewed_once_per_run(make_app):
+    app = make_app()
+    subscription_id = _subscribe(app, duration_days=1)
+    with app.app_context():
+        original_end = Subscription.query.get(subscription_id).end_date
+        report = RenewalService(batch_size=10).renew_due(timedelta(days=3))
+
+        assert (report.renewed, report.batches, report.lost_leases) == (1, 1, 0)
+        subscription = Subscription.query.get(subscription_id)
+        assert subscription.end_date == original_end + timedelta(days=1)
+        assert subscription.lease_token is None
+        assert SubscriptionHistory.query.filter_by(change_type='renew').count() == 1
+        assert UserSubscriptionStats.query.one().lifetime_spend == 20.0
+
+
+def test_unpriced_rows_are_skipped_without_spinning(make_app, monkeypatch):
+    app = make_app()
+    subscription_id = _subscribe(app, duration_days=1)
+    with app.app_context():
+        plan_id = Subscription.query.get(subscription_id).plan_id
+        lookup = plan_catalog.get
+        monkeypatch.setattr(plan_catalog, 'get', lambda pid: None if int(pid) == plan_id else lookup(pid))
+        report = RenewalService(batch_size=10).renew_due(timedelta(days=3))
+
+        assert (report.renewed, report.batches, report.lost_leases) == (0, 1, 0)
+        # Released at the end of the run for the next one to retry
+        assert Subscription.query.get(subscription_id).lease_token is None
+
+
+def test_leased_rows_are_renewed_once_across_workers(make_app):
+    app = make_app()
+    subscription_id = _subscribe(app, duration_days=30)
+    window_end = datetime.utcnow() + timedelta(days=31)
+    with app.app_context():
+        first, second = RenewalService(batch_size=10), RenewalService(batch_size=10)
+        claimed, _ = first.claim_batch(window_end)
+        assert [row.id for row in claimed] == [subscription_id]
+        # The lease hides the row from other workers
+        assert second.claim_batch(window_end) == ([], 0)
+        assert second.renew_due(timedelta(days=31)).renewed == 0
+
+        assert first.renew_claimed(claimed, window_end)[0] == 1
+        assert Subscription.query.get(subscription_id).lease_token is None
+        assert SubscriptionHistory.query.filter_by(change_type='renew').count() == 1
+
+
+def test_lapsed_lease_passes_to_another_worker(make_app):
+    app = make_app()
+    subscription_id = _subscribe(app, duration_days=30)
+    window_end = datetime.utcnow() + timedelta(days=31)
+    with app.app_context():
+        stalled, second = RenewalService(batch_size=10, lease_seconds=-1), RenewalService(batch_size=10)
+        claimed, _ = stalled.claim_batch(window_end)
+        reclaimed, _ = second.claim_batch(window_end)
+        assert [row.id for row in reclaimed] == [subscription_id]
+
+        # The stalled worker no longer holds the token, so only the new holder renews
+        assert stalled.renew_claimed(claimed, window_end)[0] == 0
+        assert second.renew_claimed(reclaimed, window_end)[0] == 1
+        assert SubscriptionHistory.query.filter_by(change_type='renew').count() == 1
+
+def test_parallel_renewal_reports_workers_that_fail_to_start():
+    reports = renew_in_parallel('no-such-config', 2, timedelta(days=1), batch_size=10, lease_seconds=60,
+                                poll_seconds=0.2)
+    assert [report['worker'] for report in reports] == [0, 1]
+    assert all(report['error'].startswith('KeyError') for report in reports)
@@ -0,0 +1,23 @@
+from conftest import create_plan, register
+from app.core.replicas import STICKY_COOKIE
+
+
+def test_sticky_cookie_keeps_own_writes_visible_on_other_workers(make_app, tmp_path):
+    config = {'REPLICA_DATABASE_URLS': [f"sqlite:///{tmp_path / 'replica.db'}"], 'RESPONSE_CACHE_BACKEND': 'none'}
+    worker_a, worker_b = make_app(**config), make_app(**config)
+    client_a, client_b = worker_a.test_client(), worker_b.test_client()
+
+    headers = register(client_a)
+    plan_id = create_plan(worker_a)
+    assert worker_a.test_cli_runner().invoke(args=['sync-sqlite-replicas']).exit_code == 0
+
+    # The replica is now behind the primary by this write
+    created = client_a.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers)
+    assert created.status_code == 201
+    cookie = client_a.get_cookie(STICKY_COOKIE)
+    assert cookie is not None
+
+    assert client_b.get('/subscriptions/', headers=headers).get_json() == []
+    client_b.set_cookie(STICKY_COOKIE, cookie.value)
+    sticky = client_b.get('/subscriptions/', headers=headers)
+    assert [row['id'] for row in sticky.get_json()] == [created.get_json()['id']]
@@ -0,0 +1,44 @@
+import logging
+from app.core.response_cache import MemoryBackend
+
+
+def test_generations_stay_bounded_under_distinct_tag_bumps():
+    backend = MemoryBackend(max_entries=10, max_bytes=1 << 20)
+    for user_id in range(1000):
+        backend.bump([f"user:{user_id}"])
+    assert len(backend._generations) <= 10
+
+
+def test_pruning_keeps_live_entries_and_never_revives_old_generations():
+    backend = MemoryBackend(max_entries=10, max_bytes=1 << 20)
+    live = backend.generations(['user:live'])
+    backend.set('live', (b'{}', {}), ttl=60, tags=('user:live',))
+    before_bump = backend.generations(['user:gone'])
+    backend.bump(['user:gone'])
+
+    for user_id in range(100):
+        backend.bump([f"user:{user_id}"])
+
+    # The live entry still matches; a key built before the bump never matches again
+    assert backend.generations(['user:live']) == live
+    assert backend.get('live') is not None
+    assert backend.generations(['user:gone'])[0] > before_bump[0]
+    backend.bump(['user:gone'])
+    assert backend.generations(['user:gone'])[0] > before_bump[0]
+
+
+def test_evicted_entries_release_their_tags():
+    backend = MemoryBackend(max_entries=2, max_bytes=1 << 20)
+    for user_id in range(5):
+        backend.set(f"key{user_id}", (b'{}', {}), ttl=60, tags=(f"user:{user_id}",))
+    assert set(backend._refs) == {'user:3', 'user:4'}
+
+
+def test_memory_backend_with_several_workers_warns_at_startup(make_app, tmp_path, caplog):
+    with caplog.at_level(logging.WARNING, logger='app.core.response_cache'):
+        make_app(WEB_WORKERS=1)
+        make_app(WEB_WORKERS=4, RESPONSE_CACHE_BACKEND='sqlite', RESPONSE_CACHE_PATH=str(tmp_path / 'cache.db'))
+        assert not caplog.records
+        make_app(WEB_WORKERS=4, RESPONSE_CACHE_BACKEND='memory')
+    assert [record.levelname for record in caplog.records] == ['WARNING']
+    assert 'RESPONSE_CACHE_BACKEND=sqlite' in caplog.records[0].getMessage()
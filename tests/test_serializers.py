@@ -0,0 +1,61 @@
+import json
+from flask_restx import marshal
+from conftest import create_plan, register
+from app.api.plans import plan_model
+from app.api.subscriptions import subscription_model
+from app.models import Subscription, SubscriptionHistory, SubscriptionPlan, User
+from app.schemas.plan_schema import PlanResponseSchema
+from app.schemas.serializers import (
+    dumps,
+    serialize_plan,
+    serialize_subscription,
+    serialize_subscription_history,
+    serialize_user_summary
+)
+from app.schemas.subscription_schema import SubscriptionHistoryResponseSchema, SubscriptionResponseSchema
+from app.schemas.user_schema import UserResponseSchema
+from app.services.plan_service import PlanService
+
+
+def _as_json(payload):
+    # Compare what goes over the wire, not the Python objects
+    return json.loads(dumps(payload))
+
+
+def _upgraded_subscription(app):
+    client = app.test_client()
+    headers = register(client)
+    basic_id = create_plan(app, name='basic', price=9.99)
+    with app.app_context():
+        pro_id = PlanService().create_plan(
+            name='pro', price=19.5, duration_days=365, features={'seats': '5', 'support': 'email'}
+        ).id
+    subscription = client.post('/subscriptions/', json={'plan_id': basic_id}, headers=headers).get_json()
+    response = client.put(f"/subscriptions/{subscription['id']}", json={'plan_id': pro_id}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return subscription['id']
+
+
+def test_compiled_serializers_match_the_response_schemas(make_app):
+    app = make_app()
+    subscription_id = _upgraded_subscription(app)
+
+    with app.app_context():
+        plans = SubscriptionPlan.query.order_by(SubscriptionPlan.id).all()
+        subscription = Subscription.query.get(subscription_id)
+        history = SubscriptionHistory.query.order_by(SubscriptionHistory.id).all()
+        user = User.query.one()
+        assert [row.change_type for row in history] == ['create', 'upgrade']
+
+        for plan in plans:
+            expected = PlanResponseSchema().dump(plan)
+            assert _as_json(serialize_plan(plan)) == _as_json(expected)
+            assert _as_json(serialize_plan(plan)) == _as_json(marshal(expected, plan_model))
+
+        expected = SubscriptionResponseSchema().dump(subscription)
+        assert _as_json(serialize_subscription(subscription)) == _as_json(expected)
+        assert _as_json(serialize_subscription(subscription)) == _as_json(marshal(expected, subscription_model))
+
+        assert _as_json([serialize_subscription_history(row) for row in history]) == \
+            _as_json(SubscriptionHistoryResponseSchema(many=True).dump(history))
+        assert _as_json(serialize_user_summary(user)) == _as_json(UserResponseSchema().dump(user))
@@ -0,0 +1,71 @@
+import pytest
+from conftest import create_plan, register
+
+SUBSCRIPTION_SCALARS = {'id', 'user_id', 'plan_id', 'status', 'start_date', 'end_date', 'created_at'}
+HISTORY_SCALARS = {'id', 'subscription_id', 'user_id', 'old_status', 'new_status', 'change_type', 'changed_at'}
+
+
+@pytest.fixture
+def subscribed(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    subscription = client.post('/subscriptions/', json={'plan_id': create_plan(app)}, headers=headers).get_json()
+    return client, headers, subscription
+
+
+@pytest.mark.parametrize('path', ['/subscriptions/', '/subscriptions/{id}', '/subscriptions/history/{id}'])
+# Nested objects are embedded with ?include=, not picked with ?fields=
+@pytest.mark.parametrize('query', ['fields=status,secret', 'include=owner', 'fields=plan'])
+def test_unknown_fields_and_includes_are_rejected(subscribed, path, query):
+    client, headers, subscription = subscribed
+    response = client.get(f"{path.format(id=subscription['id'])}?{query}", headers=headers)
+    assert response.status_code == 400
+    assert 'Must be among' in response.get_json()['error']
+
+
+def test_subscription_payload_shapes(subscribed):
+    client, headers, subscription = subscribed
+    path = f"/subscriptions/{subscription['id']}"
+
+    assert set(client.get(path, headers=headers).get_json()) == SUBSCRIPTION_SCALARS | {'plan'}
+    # `id` always comes along; nothing is embedded unless included
+    assert client.get(f"{path}?fields=status", headers=headers).get_json() == {
+        'id': subscription['id'], 'status': 'active'
+    }
+    assert set(client.get(f"{path}?include=plan", headers=headers).get_json()) == SUBSCRIPTION_SCALARS | {'plan'}
+    sparse = client.get(f"{path}?fields=plan_id&include=plan", headers=headers).get_json()
+    assert sparse == {'id': subscription['id'], 'plan_id': subscription['plan_id'], 'plan': subscription['plan']}
+
+    listed = client.get('/subscriptions/?fields=status', headers=headers).get_json()
+    assert listed == [{'id': subscription['id'], 'status': 'active'}]
+
+
+def test_sparse_variants_have_their_own_etags(subscribed):
+    client, headers, subscription = subscribed
+    path = f"/subscriptions/{subscription['id']}"
+    full = client.get(path, headers=headers).headers['ETag']
+    sparse = client.get(f"{path}?fields=status", headers=headers).headers['ETag']
+    # Parameter order and duplicates don't change the representation
+    reordered = client.get(f"{path}?fields=status,id,status", headers=headers).headers['ETag']
+    assert full != sparse == reordered
+
+
+def test_history_payload_shapes(subscribed):
+    client, headers, subscription = subscribed
+    path = f"/subscriptions/history/{subscription['id']}"
+
+    assert set(client.get(path, headers=headers).get_json()[0]) == \
+        HISTORY_SCALARS | {'old_plan', 'new_plan', 'subscription'}
+    # Plan ids are only served when asked for
+    assert client.get(f"{path}?fields=change_type,new_plan_id", headers=headers).get_json() == [
+        {'id': 1, 'change_type': 'create', 'new_plan_id': subscription['plan_id']}
+    ]
+    [entry] = client.get(f"{path}?include=subscription", headers=headers).get_json()
+    assert set(entry) == HISTORY_SCALARS | {'subscription'}
+    assert entry['subscription'] == {'id': subscription['id'], 'plan': subscription['plan']}
+
+    grouped = client.get('/subscriptions/history?fields=change_type&include=plan', headers=headers).get_json()
+    [entry] = grouped['subscriptions'][str(subscription['id'])]
+    assert set(entry) == {'id', 'change_type', 'old_plan', 'new_plan'}
+    assert (entry['old_plan'], entry['new_plan']) == (None, subscription['plan'])
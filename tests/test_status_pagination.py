@@ -0,0 +1,43 @@
+from datetime import datetime
+from conftest import create_plan, register
+from app.core.database import db
+from app.models import Subscription
+
+
+def test_keyset_pages_cover_every_row_once_in_stable_order(make_app):
+    app = make_app()
+    client = app.test_client()
+    plan_id = create_plan(app)
+    headers = None
+    for index in range(5):
+        headers = register(client, email=f"user{index}@example.com")
+        assert client.post('/subscriptions/', json={'plan_id': plan_id}, headers=headers).status_code == 201
+
+    with app.app_context():
+        # Three rows share a created_at, so the id tie-breaker has to keep the order stable
+        tied = datetime(2026, 1, 1, 12, 0, 0)
+        for subscription in Subscription.query.filter(Subscription.id.in_([1, 2, 4])):
+            subscription.created_at = tied
+        db.session.commit()
+        expected = [row.id for row in Subscription.query.order_by(Subscription.created_at.desc(), Subscription.id.desc())]
+
+    seen, cursor = [], None
+    while True:
+        url = '/subscriptions/status/active?limit=2' + (f"&cursor={cursor}" if cursor else '')
+        page = client.get(url, headers=headers).get_json()
+        assert len(page['items']) <= 2
+        seen.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert seen[-3:] == [4, 2, 1]
+
+
+def test_malformed_cursor_is_rejected(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    assert client.get('/subscriptions/status/active?cursor=not-a-cursor', headers=headers).status_code == 400
+    assert client.get('/subscriptions/status/unknown', headers=headers).status_code == 400
@@ -0,0 +1,21 @@
+from conftest import register
+
+
+def test_new_token_accepted_by_worker_with_stale_versions(make_app):
+    worker_a = make_app(TOKEN_VERSION_CACHE_TTL=60)
+    worker_b = make_app(TOKEN_VERSION_CACHE_TTL=60)
+    client_a, client_b = worker_a.test_client(), worker_b.test_client()
+
+    old_headers = register(client_a)
+    # Warm worker B's version cache before the revocation
+    assert client_b.get('/subscriptions/', headers=old_headers).status_code == 200
+
+    assert client_a.post('/auth/logout', headers=old_headers).status_code == 200
+    login = client_a.post('/auth/login', json={'email': 'user@example.com', 'password': 'secret123'})
+    new_headers = {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+    assert client_a.get('/subscriptions/', headers=new_headers).status_code == 200
+    assert client_b.get('/subscriptions/', headers=new_headers).status_code == 200
+    # Seeing the newer token made B reload, so the revoked one is now refused there too
+    assert client_b.get('/subscriptions/', headers=old_headers).status_code == 401
+    assert client_a.get('/subscriptions/', headers=old_headers).status_code == 401
@@ -0,0 +1,25 @@
+from sqlalchemy import select
+from conftest import create_plan, register
+from app.core.database import db
+from app.models import TokenVersion, User
+from app.services.plan_catalog import plan_catalog
+
+
+def test_catalog_version_is_created_then_incremented(make_app):
+    app = make_app()
+    create_plan(app, name='basic')
+    create_plan(app, name='pro')
+    with app.app_context():
+        assert plan_catalog.current_version() == 2
+
+
+def test_token_version_is_created_then_incremented(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = register(client)
+    assert client.post('/auth/logout', headers=headers).status_code == 200
+    login = client.post('/auth/login', json={'email': 'user@example.com', 'password': 'secret123'})
+    assert client.post('/auth/logout', headers={'Authorization': f"Bearer {login.get_json()['access_token']}"}).status_code == 200
+    with app.app_context():
+        user_id = db.session.execute(select(User.id)).scalar_one()
+        assert db.session.get(TokenVersion, user_id).version == 2